@@ -0,0 +1,28 @@
+"""job next_run_at for durable schedules
+
+Revision ID: 0001a_job_next_run_at
+Revises: 0001_baseline
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001a_job_next_run_at"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The app may already have added this on startup (see core/db.py).
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("job")}
+    if "next_run_at" not in columns:
+        with op.batch_alter_table("job") as batch:
+            batch.add_column(sa.Column("next_run_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("job") as batch:
+        batch.drop_column("next_run_at")
@@ -0,0 +1,35 @@
+"""job list and schedule indexes
+
+Revision ID: 0002_job_list_indexes
+Revises: 0001a_job_next_run_at
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002_job_list_indexes"
+down_revision = "0001a_job_next_run_at"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    "ix_job_status_next_run_at": ["status", "next_run_at"],
+    "ix_job_status_id": ["status", "id"],
+    "ix_job_script_id_id": ["script_id", "id"],
+    "ix_job_agent_id_id": ["agent_id", "id"],
+    "ix_job_last_run_at_id": ["last_run_at", "id"],
+}
+
+
+def upgrade() -> None:
+    # The app may already have created these on startup (see core/db.py).
+    for name, columns in INDEXES.items():
+        op.create_index(name, "job", columns, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.drop_index(name, table_name="job", if_exists=True)
@@ -0,0 +1,54 @@
+"""workflows and job dependencies
+
+Revision ID: 0003_workflows
+Revises: 0002_job_list_indexes
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_workflows"
+down_revision = "0002_job_list_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The app may already have created these on startup (see core/db.py).
+    op.create_table(
+        "workflow",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_index("ix_workflow_status", "workflow", ["status"], if_not_exists=True)
+    op.create_table(
+        "jobdependency",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("workflow_id", sa.Integer(), sa.ForeignKey("workflow.id"), nullable=False),
+        sa.Column("job_id", sa.Integer(), sa.ForeignKey("job.id"), nullable=False),
+        sa.Column("depends_on_id", sa.Integer(), sa.ForeignKey("job.id"), nullable=False),
+        sa.Column("policy", sa.String(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_index("ix_jobdependency_workflow_id", "jobdependency", ["workflow_id"], if_not_exists=True)
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("job")}
+    if "workflow_id" not in columns:
+        with op.batch_alter_table("job") as batch:
+            batch.add_column(
+                sa.Column("workflow_id", sa.Integer(), sa.ForeignKey("workflow.id", name="fk_job_workflow_id"))
+            )
+    op.create_index("ix_job_workflow_id", "job", ["workflow_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_job_workflow_id", table_name="job", if_exists=True)
+    with op.batch_alter_table("job") as batch:
+        batch.drop_column("workflow_id")
+    op.drop_table("jobdependency")
+    op.drop_table("workflow")
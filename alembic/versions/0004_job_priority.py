@@ -0,0 +1,31 @@
+"""job priority class and owner
+
+Revision ID: 0004_job_priority
+Revises: 0003_workflows
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_job_priority"
+down_revision = "0003_workflows"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The app may already have added these on startup (see core/db.py).
+    columns = {c["name"] for c in sa.inspect(op.get_bind()).get_columns("job")}
+    with op.batch_alter_table("job") as batch:
+        if "priority" not in columns:
+            batch.add_column(sa.Column("priority", sa.String(), nullable=False, server_default="normal"))
+        if "owner_id" not in columns:
+            batch.add_column(sa.Column("owner_id", sa.Integer(), sa.ForeignKey("user.id", name="fk_job_owner_id")))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("job") as batch:
+        batch.drop_column("owner_id")
+        batch.drop_column("priority")
@@ -0,0 +1,46 @@
+"""job artifacts and content-addressed blobs
+
+Revision ID: 0005_artifacts
+Revises: 0004_job_priority
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_artifacts"
+down_revision = "0004_job_priority"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The app may already have created these on startup (see core/db.py).
+    op.create_table(
+        "blob",
+        sa.Column("digest", sa.String(), primary_key=True),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("refcount", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "artifact",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("job_id", sa.Integer(), sa.ForeignKey("job.id"), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("digest", sa.String(), sa.ForeignKey("blob.digest"), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("content_type", sa.String(), nullable=True),
+        sa.Column("run_key", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("job_id", "name", name="uq_artifact_job_id_name"),
+        if_not_exists=True,
+    )
+    op.create_index("ix_artifact_digest", "artifact", ["digest"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table("artifact")
+    op.drop_table("blob")
@@ -0,0 +1,41 @@
+"""job run history
+
+Revision ID: 0006_job_runs
+Revises: 0005_artifacts
+Create Date: 2026-10-18
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006_job_runs"
+down_revision = "0005_artifacts"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The app may already have created this on startup (see core/db.py).
+    op.create_table(
+        "jobrun",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("run_key", sa.String(), nullable=False),
+        sa.Column("job_id", sa.Integer(), sa.ForeignKey("job.id"), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("exit_code", sa.Integer(), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("stdout_bytes", sa.Integer(), nullable=True),
+        sa.Column("stderr_bytes", sa.Integer(), nullable=True),
+        sa.Column("duration_ms", sa.Integer(), nullable=True),
+        sa.Column("log_path", sa.String(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_index("ix_jobrun_run_key", "jobrun", ["run_key"], unique=True, if_not_exists=True)
+    op.create_index("ix_jobrun_job_id", "jobrun", ["job_id"], if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table("jobrun")
@@ -1,21 +1,32 @@
 import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
 from starlette.staticfiles import StaticFiles
 
+from ..core.audit import get_audit_writer, shutdown_audit_writer
+from ..core.artifacts import get_artifact_store
+from ..core.audit_archive import start_archiver, stop_archiver
 from ..core.config import settings
-from ..core.db import init_db, get_session
+from ..core.db import dispose_async_engines, engine, get_async_session, get_session, init_db
+from ..core.events import get_event_bus
+from ..core.hashing import HasherBusy, shutdown_hasher
+from ..core.profiling import ProfiledTemplate
+from ..core.ratelimit import RateLimited
 from ..domain.repo import ensure_bootstrap_admin
-from ..scheduler.manager import scheduler_start, scheduler_shutdown
+from ..scheduler.manager import scheduler_start, scheduler_shutdown, scheduler_rehydrate
 
-from .routes import health, auth, users, agents, scripts, jobs, ui
+from .audit import AuditMiddleware
+from .metrics import MetricsMiddleware
+from .profiling import ProfilingMiddleware
+from .routes import health, auth, users, agents, scripts, jobs, workflows, audit, debug, metrics, ui
 from .routes.ui import _get_user_from_cookie
 
 
 app = FastAPI(title=settings.app_name)
 templates = Jinja2Templates(directory="automa/web/templates")
+templates.env.template_class = ProfiledTemplate
 
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +35,29 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+if settings.audit_enabled:
+    app.add_middleware(AuditMiddleware, reads=settings.audit_reads)
+app.add_middleware(ProfilingMiddleware)  # a pass-through until switched on at runtime
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)  # outermost, so it times the other middleware too
+
+
+@app.exception_handler(HasherBusy)
+async def hasher_busy_handler(request: Request, exc: HasherBusy) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": "Too many concurrent authentication requests"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(RateLimited)
+async def rate_limited_handler(request: Request, exc: RateLimited) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.on_event("startup")
@@ -39,19 +73,30 @@ def on_startup() -> None:
         import traceback
         traceback.print_exc()
         raise
+    if settings.audit_enabled:
+        get_audit_writer().start()
+        start_archiver(engine)
+    if settings.artifacts_enabled:
+        get_artifact_store().collect(engine)  # no run is in progress yet
     if os.getenv("AUTOMA_DISABLE_SCHED", "0") != "1":
+        scheduler_rehydrate()
         scheduler_start()
 
 
 @app.on_event("shutdown")
-def on_shutdown() -> None:
+async def on_shutdown() -> None:
+    get_event_bus().close()  # end open /ui/stream/jobs responses
     scheduler_shutdown()
+    shutdown_hasher()
+    shutdown_audit_writer()
+    stop_archiver()
+    await dispose_async_engines()
 
 
 @app.get("/")
-def root(request: Request):
-    with get_session() as s:
-        user = _get_user_from_cookie(request, s)
+async def root(request: Request):
+    async with get_async_session(readonly=True) as s:
+        user = await _get_user_from_cookie(request, s)
     return templates.TemplateResponse("index.html", {"request": request, "app_name": settings.app_name, "user": user})
 
 
@@ -81,4 +126,9 @@ app.include_router(users.router)
 app.include_router(agents.router)
 app.include_router(scripts.router)
 app.include_router(jobs.router)
+app.include_router(workflows.router)
+app.include_router(audit.router)
+app.include_router(debug.router)
+if settings.metrics_enabled:
+    app.include_router(metrics.router)
 app.include_router(ui.router)
@@ -0,0 +1,91 @@
+"""Audit middleware.
+
+Every state-changing request (and reads too with ``AUDIT_READS``) that
+matched a route becomes one audit event, named after the route's endpoint
+(``create_job``, ``cancel_job``, ``ui_login``…). The event is queued on
+:class:`~automa.core.audit.AuditWriter` after the response has been sent,
+so auditing adds no database work to the request itself.
+
+The actor is whoever the route authenticated (``get_current_user`` or the
+UI cookie). The target defaults to the route's ``*_id`` path parameter;
+routes that create something name it with :func:`audit_target`.
+"""
+
+from typing import Any, Optional
+import time
+
+from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.audit import get_audit_writer
+
+
+_READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def _state(request: Request) -> dict[str, Any]:
+    return request.scope.setdefault("state", {}).setdefault("audit", {})
+
+
+def audit_actor(request: Request, user_id: Optional[int]) -> None:
+    _state(request)["actor_user_id"] = user_id
+
+
+def audit_target(request: Request, target_type: str, target_id: Optional[int] = None) -> None:
+    state = _state(request)
+    state["target_type"] = target_type
+    state["target_id"] = target_id
+
+
+class AuditMiddleware:
+    def __init__(self, app: ASGIApp, reads: bool = False) -> None:
+        self.app = app
+        self.reads = reads
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or (not self.reads and scope["method"] in _READ_METHODS):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._record(scope, status, time.perf_counter() - started)
+
+    @staticmethod
+    def _record(scope: Scope, status: int, elapsed: float) -> None:
+        route = scope.get("route")
+        if route is None:
+            return  # 404s and mounts (static files) are not actions
+        state = scope.get("state", {}).get("audit", {})
+        target_type = state.get("target_type")
+        target_id = state.get("target_id")
+        if target_type is None:
+            for name, value in scope.get("path_params", {}).items():
+                if name.endswith("_id"):
+                    target_type = name[:-3]
+                    target_id = int(value) if str(value).isdigit() else None
+                    break
+        client = scope.get("client")
+        get_audit_writer().submit(
+            route.name,
+            actor_user_id=state.get("actor_user_id"),
+            target_type=target_type,
+            target_id=target_id,
+            detail={
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "ms": round(elapsed * 1000, 1),
+                "ip": client[0] if client else None,
+            },
+        )
@@ -1,8 +1,13 @@
-from typing import Generator
-from ..core.db import get_session
+from typing import AsyncIterator
+from fastapi import Request
+from sqlmodel.ext.asyncio.session import AsyncSession
+from ..core.db import get_async_session
 
 
-def get_db() -> Generator:
-    with get_session() as session:
-        yield session
+_READ_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
 
+async def get_db(request: Request) -> AsyncIterator[AsyncSession]:
+    # Safe methods never write, so they are served from the read-only pool.
+    async with get_async_session(readonly=request.method in _READ_METHODS) as session:
+        yield session
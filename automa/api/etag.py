@@ -0,0 +1,42 @@
+"""Conditional GET for list endpoints and partials.
+
+The ETag is derived from the in-process table versions
+(:mod:`automa.core.versions`), so a matching ``If-None-Match`` is answered
+with 304 before the route runs a single query.
+"""
+
+from typing import Optional
+
+from fastapi import Request, Response
+
+from ..core.versions import get_versions
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    *tables: str,
+    variant: str = "",
+    private: bool = False,
+) -> Optional[Response]:
+    """
+    Return a 304 response when the client's copy is current; otherwise set
+    ``ETag`` on ``response`` and return None. Call it before querying.
+    ``variant`` separates representations of the same data (e.g. per role).
+    """
+    etag = get_versions().etag(*tables, variant=variant)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache" if private else "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,49 @@
+"""Request latency middleware.
+
+Times every HTTP request until its response starts and records it in
+:data:`~automa.core.metrics.HTTP_REQUEST_DURATION`, labelled with the
+route template (``/api/v1/jobs/{job_id}``) rather than the raw path, so the
+number of series stays bounded. Requests that matched no route share one
+label. Streaming responses (``follow=true`` logs, the UI event stream) are
+timed to their first byte, not to the end of the stream.
+"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.metrics import HTTP_REQUEST_DURATION
+
+
+UNMATCHED = "<unmatched>"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        recorded = False
+
+        def record(status: int) -> None:
+            nonlocal recorded
+            recorded = True
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED
+            HTTP_REQUEST_DURATION.labels(scope["method"], path, status).observe(time.perf_counter() - started)
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start" and not recorded:
+                record(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if not recorded:
+                record(500)  # raised before a response was started
@@ -0,0 +1,80 @@
+"""Keyset (cursor) pagination for list endpoints.
+
+A page is fetched with ``WHERE (sort_key, id) > (last_sort_key, last_id)
+ORDER BY sort_key, id LIMIT n`` (``<`` for descending order), which an index
+on the same columns answers without scanning skipped rows, so page N costs
+the same as page 1. The response body stays a plain JSON list; the cursor
+for the next page is returned in ``X-Next-Cursor`` and as a ``Link: <…>;
+rel="next"`` header and is absent on the last page.
+"""
+
+from datetime import datetime
+from typing import Any, Optional, Sequence
+import base64
+import json
+
+from fastapi import HTTPException, Request, Response
+from sqlalchemy import DateTime, tuple_
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..core.config import settings
+
+
+def clamp_limit(limit: Optional[int]) -> int:
+    if limit is None:
+        return settings.api_page_size_default
+    return max(1, min(limit, settings.api_page_size_max))
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> list[Any]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor does not match the sort order")
+        return [
+            datetime.fromisoformat(v) if isinstance(col.type, DateTime) and v is not None else v
+            for v, col in zip(values, columns)
+        ]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def paginate(
+    session: AsyncSession,
+    stmt,
+    request: Request,
+    response: Response,
+    *,
+    columns: Sequence,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    descending: bool = False,
+) -> list:
+    """Run ``stmt`` keyset-paginated on ``columns`` (the last one must be unique)."""
+    limit = clamp_limit(limit)
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        if len(columns) == 1:
+            key, after = columns[0], values[0]
+        else:
+            key, after = tuple_(*columns), tuple_(*values)
+        stmt = stmt.where(key < after if descending else key > after)
+    stmt = stmt.order_by(*(c.desc() if descending else c.asc() for c in columns)).limit(limit + 1)
+
+    rows = (await session.exec(stmt)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        set_next_cursor(request, response, [getattr(rows[-1], c.key) for c in columns])
+    return rows
+
+
+def set_next_cursor(request: Request, response: Response, values: Sequence[Any]) -> None:
+    next_cursor = encode_cursor(values)
+    response.headers["X-Next-Cursor"] = next_cursor
+    response.headers["Link"] = f'<{request.url.include_query_params(cursor=next_cursor)}>; rel="next"'
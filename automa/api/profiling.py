@@ -0,0 +1,42 @@
+"""Request profiling middleware.
+
+Passes requests straight through unless profiling or the slow-query log is
+switched on (see :mod:`automa.core.profiling`). Then every request gets a
+current profile, and a sampled one answers with a ``Server-Timing`` header::
+
+    Server-Timing: jwt;dur=0.21;desc="1x", db;dur=3.90;desc="4x", render;dur=1.75;desc="1x", app;dur=7.02
+
+The durations cover the time until the response starts, like ``app``.
+"""
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..core.profiling import get_profiler
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        profiler = get_profiler()
+        if scope["type"] != "http" or not profiler.active:
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.start(scope)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if profile.sampled:
+                    MutableHeaders(scope=message).append("Server-Timing", profile.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.finish(profile, status)
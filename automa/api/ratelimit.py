@@ -0,0 +1,35 @@
+"""Admission control for endpoints that create jobs.
+
+Called once the route has validated the request and before anything is
+written, so a request refused as invalid costs no token: first global
+backpressure (the executor queue is too deep), then the caller's token
+bucket for the endpoint (:mod:`automa.core.ratelimit`). Both count the jobs
+the request would create, so a batch weighs as much as its items sent one
+by one. Either refusal is
+raised as :class:`~automa.core.ratelimit.RateLimited`, i.e. ``429`` with
+``Retry-After``. Backpressure is checked first so a refused request does not
+also spend one of the user's tokens.
+"""
+
+import asyncio
+from typing import Optional
+
+from ..core.config import settings
+from ..core.ratelimit import RateLimited, get_rate_limiter
+from ..scheduler.manager import get_executor
+
+
+async def admit_jobs(endpoint: str, user_id: Optional[int], n: int = 1) -> None:
+    limit = settings.backpressure_max_pending
+    if limit:
+        executor = get_executor()
+        pending = executor.pending_count()
+        if pending + n > limit:
+            raise RateLimited(executor.drain_seconds(pending + n - limit), "Job queue is full, retry later")
+    limiter = get_rate_limiter()
+    if limiter.blocking:
+        wait = await asyncio.to_thread(limiter.check, endpoint, user_id, n)
+    else:
+        wait = limiter.check(endpoint, user_id, n)
+    if wait:
+        raise RateLimited(wait)
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from ...api.audit import audit_target
 from ...api.deps import get_db
+from ...api.etag import check_not_modified
+from ...api.pagination import paginate
 from ...core.security import get_current_user
+from ...core.versions import bump
 from ...domain.models import Agent, User
 
 
@@ -10,18 +16,44 @@ router = APIRouter(prefix="/api/v1/agents", tags=["agents"])
 
 
 @router.get("")
-def list_agents(session: Session = Depends(get_db)):
-    agents = session.exec(select(Agent)).all()
-    return agents
+async def list_agents(
+    request: Request,
+    response: Response,
+    status: str | None = None,
+    name: str | None = Query(default=None, description="Name prefix"),
+    order: Literal["asc", "desc"] = "asc",
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    session: AsyncSession = Depends(get_db),
+):
+    not_modified = check_not_modified(request, response, "agent")
+    if not_modified is not None:
+        return not_modified
+    stmt = select(Agent)
+    if status:
+        stmt = stmt.where(Agent.status == status)
+    if name:
+        stmt = stmt.where(Agent.name.startswith(name, autoescape=True))
+    return await paginate(
+        session, stmt, request, response,
+        columns=[Agent.id], cursor=cursor, limit=limit, descending=order == "desc",
+    )
 
 
 @router.post("")
-def create_agent(agent: Agent, session: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def create_agent(
+    request: Request,
+    agent: Agent,
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admin required")
     agent.id = None
     session.add(agent)
-    session.commit()
-    session.refresh(agent)
+    await session.commit()
+    bump("agent")
+    audit_target(request, "agent", agent.id)
+    await session.refresh(agent)
     return agent
 
@@ -0,0 +1,86 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ...api.deps import get_db
+from ...api.pagination import clamp_limit, decode_cursor, set_next_cursor
+from ...core.audit_archive import get_audit_archive
+from ...core.security import get_current_user
+from ...domain.models import AuditLog, User
+from .jobs import _naive_utc
+
+
+router = APIRouter(prefix="/api/v1/audit", tags=["audit"])
+
+_FIELDS = ("id", "created_at", "actor_user_id", "action", "target_type", "target_id", "detail")
+
+
+def _event(row: dict[str, Any]) -> dict[str, Any]:
+    if isinstance(row["detail"], str):
+        row["detail"] = json.loads(row["detail"])
+    return row
+
+
+@router.get("")
+async def list_audit(
+    request: Request,
+    response: Response,
+    actor: int | None = Query(default=None, description="actor_user_id"),
+    action: str | None = None,
+    target_type: str | None = None,
+    since: datetime | None = Query(default=None, description="created_at >= since"),
+    until: datetime | None = Query(default=None, description="created_at < until"),
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Audit events, newest first, keyset-paginated (see ``X-Next-Cursor``).
+
+    Reads the ``auditlog`` table first and continues into the archived
+    segments once it runs out, so a page can span both.
+    """
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+    limit = clamp_limit(limit)
+    since = _naive_utc(since) if since is not None else None
+    until = _naive_utc(until) if until is not None else None
+    before_id = decode_cursor(cursor, [AuditLog.id])[0] if cursor else None
+
+    stmt = select(AuditLog)
+    if before_id is not None:
+        stmt = stmt.where(AuditLog.id < before_id)
+    if actor is not None:
+        stmt = stmt.where(AuditLog.actor_user_id == actor)
+    if action is not None:
+        stmt = stmt.where(AuditLog.action == action)
+    if target_type is not None:
+        stmt = stmt.where(AuditLog.target_type == target_type)
+    if since is not None:
+        stmt = stmt.where(AuditLog.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(AuditLog.created_at < until)
+    stmt = stmt.order_by(AuditLog.id.desc()).limit(limit + 1)
+    rows = [{f: getattr(r, f) for f in _FIELDS} for r in (await session.exec(stmt)).all()]
+
+    if len(rows) <= limit:
+        # archived ids are all older than anything still in the table
+        rows += await asyncio.to_thread(
+            get_audit_archive().query,
+            before_id=rows[-1]["id"] if rows else before_id,
+            actor_user_id=actor,
+            action=action,
+            target_type=target_type,
+            since=since,
+            until=until,
+            limit=limit + 1 - len(rows),
+        )
+    if len(rows) > limit:
+        rows = rows[:limit]
+        set_next_cursor(request, response, [rows[-1]["id"]])
+    return [_event(r) for r in rows]
@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+from ...core.profiling import get_profiler
+from ...core.security import get_current_user
+from ...domain.models import User
+
+
+router = APIRouter(prefix="/api/v1/debug", tags=["debug"])
+
+
+class ProfilingUpdate(BaseModel):
+    requests: bool | None = None
+    sample_rate: float | None = Field(default=None, ge=0.0, le=1.0)
+    paths: list[str] | None = None
+    slow_queries: bool | None = None
+    slow_query_ms: float | None = Field(default=None, ge=0.0)
+
+
+@router.get("/profiling")
+async def read_profiling(user: User = Depends(get_current_user)) -> dict:
+    """Profiling switches, the latest request profiles and slow queries (newest first)."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+    profiler = get_profiler()
+    return {
+        **profiler.config(),
+        "profiles": list(reversed(profiler.profiles)),
+        "slow_queries": list(reversed(profiler.queries)),
+    }
+
+
+@router.patch("/profiling")
+async def update_profiling(payload: ProfilingUpdate, user: User = Depends(get_current_user)) -> dict:
+    """Switch request profiling and the slow-query log at runtime; omitted fields stay as they are."""
+    if not user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin required")
+    return get_profiler().configure(**payload.model_dump(exclude_none=True))
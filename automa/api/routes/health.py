@@ -1,9 +1,60 @@
 from fastapi import APIRouter
 
+from ...core.artifacts import get_artifact_store
+from ...core.audit import get_audit_writer
+from ...core.audit_archive import get_audit_archive
+from ...core.events import get_event_bus
+from ...core.fragment_cache import get_fragment_cache
+from ...core.ratelimit import get_rate_limiter
+from ...sandbox.pool import get_pool, pool_enabled
+
 router = APIRouter(prefix="/api/v1/health", tags=["health"])
 
 
 @router.get("")
-def health() -> dict:
+async def health() -> dict:
     return {"status": "ok"}
 
+
+@router.get("/sandbox")
+async def sandbox_pool() -> dict:
+    """Warm sandbox pool counters (hits/misses, recycling, evictions)."""
+    if not pool_enabled():
+        return {"enabled": False}
+    return {"enabled": True, **get_pool().stats()}
+
+
+@router.get("/artifacts")
+async def artifact_store() -> dict:
+    """Artifact store counters: blobs stored, deduplicated, deleted; files over the limits."""
+    return get_artifact_store().stats
+
+
+@router.get("/events")
+async def event_stream() -> dict:
+    """Job event bus counters (published, dropped, open subscribers)."""
+    return get_event_bus().stats()
+
+
+@router.get("/fragments")
+async def fragment_cache() -> dict:
+    """UI fragment cache: hit ratio and memory held by cached bodies."""
+    return get_fragment_cache().stats()
+
+
+@router.get("/audit")
+async def audit_writer() -> dict:
+    """Audit pipeline counters (submitted, written, dropped), queue depth and archive size."""
+    writer = get_audit_writer()
+    return {
+        "running": writer.running,
+        "pending": writer.pending(),
+        **writer.stats,
+        "archive": get_audit_archive().stats(),
+    }
+
+
+@router.get("/ratelimit")
+async def rate_limit() -> dict:
+    """Job-creation limits: configured buckets, allowed/refused counts per endpoint."""
+    return get_rate_limiter().stats()
@@ -1,51 +1,420 @@
+import asyncio
 from datetime import datetime, timezone
-from fastapi import APIRouter, Depends, HTTPException
+from pathlib import Path, PurePosixPath
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from sqlmodel import Session, select
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from ...api.audit import audit_target
 from ...api.deps import get_db
+from ...api.etag import check_not_modified, etag_matches
+from ...api.pagination import paginate
+from ...api.ratelimit import admit_jobs
+from ...core.artifacts import get_artifact_store
+from ...core.config import settings
+from ...core.db import engine, release_connection
+from ...core.events import publish_job
 from ...core.security import get_current_user
-from ...domain.models import Job, User, Script
-from ...scheduler.manager import scheduler_add_once
+from ...core.versions import bump
+from ...domain.models import Agent, Artifact, Job, JobRun, User, Script
+from ...sandbox.logs import LogIndex, line_offset, tail_offset
+from ...scheduler.manager import (
+    apply_transition,
+    get_executor,
+    get_workflow_engine,
+    scheduler_add_many,
+    scheduler_cancel,
+)
+from ...scheduler.triggers import next_fire_time, parse_schedule
 
 
 class JobCreate(BaseModel):
     script_id: int | None = None
-    when: datetime | None = None  # if None, run asap
+    agent_id: int | None = None
+    when: datetime | None = None  # if None, run asap (recurring: not before this time)
+    schedule: str | None = None  # cron "*/5 * * * *" or interval "@every 30s"
+    priority: str = "normal"  # one of settings.executor_class_weights
 
 
 router = APIRouter(prefix="/api/v1/jobs", tags=["jobs"])
 
 
+def _naive_utc(value: datetime) -> datetime:
+    # timestamps are stored as naive UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
 @router.get("")
-def list_jobs(session: Session = Depends(get_db)):
-    return session.exec(select(Job)).all()
+async def list_jobs(
+    request: Request,
+    response: Response,
+    status: str | None = Query(default=None, description="Comma-separated statuses"),
+    script_id: int | None = None,
+    agent_id: int | None = None,
+    since: datetime | None = Query(default=None, description="last_run_at >= since"),
+    until: datetime | None = Query(default=None, description="last_run_at < until"),
+    sort: Literal["id", "last_run_at"] = "id",
+    order: Literal["asc", "desc"] = "desc",
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    session: AsyncSession = Depends(get_db),
+):
+    """Jobs, newest first by default, keyset-paginated (see ``X-Next-Cursor``).
 
+    Sorting by ``last_run_at`` or filtering by ``since``/``until`` only
+    returns jobs that have run at least once.
+    """
+    not_modified = check_not_modified(request, response, "job")
+    if not_modified is not None:
+        return not_modified
+    stmt = select(Job)
+    if status:
+        stmt = stmt.where(Job.status.in_([s.strip() for s in status.split(",") if s.strip()]))
+    if script_id is not None:
+        stmt = stmt.where(Job.script_id == script_id)
+    if agent_id is not None:
+        stmt = stmt.where(Job.agent_id == agent_id)
+    if since is not None:
+        stmt = stmt.where(Job.last_run_at >= _naive_utc(since))
+    if until is not None:
+        stmt = stmt.where(Job.last_run_at < _naive_utc(until))
+
+    columns = [Job.id]
+    if sort == "last_run_at":
+        stmt = stmt.where(Job.last_run_at.is_not(None))
+        columns = [Job.last_run_at, Job.id]
+    return await paginate(
+        session, stmt, request, response,
+        columns=columns, cursor=cursor, limit=limit, descending=order == "desc",
+    )
 
-@router.post("")
-def create_job(payload: JobCreate, session: Session = Depends(get_db), user: User = Depends(get_current_user)):
-    if payload.script_id is not None:
-        if session.get(Script, payload.script_id) is None:
-            raise HTTPException(status_code=404, detail="Script not found")
+
+@router.get("/queue")
+async def job_queue(
+    limit: int = Query(default=100, ge=0, le=1000, description="Waiting jobs to list"),
+    user: User = Depends(get_current_user),
+):
+    """Inspect the execution engine: running jobs and the head of the pending
+    queue (``pending_count`` and ``pending_by_class`` cover all of it)."""
+    return get_executor().snapshot(pending_limit=limit)
+
+
+def _new_job(payload: JobCreate, owner: User, now: datetime) -> Job:
+    """Build the (unsaved) job for ``payload``."""
+    if payload.priority not in settings.executor_class_weights:
+        raise HTTPException(status_code=422, detail=f"Unknown priority {payload.priority!r}")
+    trigger = None
+    if payload.schedule:
+        try:
+            trigger = parse_schedule(payload.schedule)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid schedule: {e}")
 
     run_at = payload.when
     if run_at is not None and run_at.tzinfo is None:
         run_at = run_at.replace(tzinfo=timezone.utc)
 
-    job = Job(script_id=payload.script_id, status="scheduled")
-    if run_at is not None:
+    first_run = (run_at or now).astimezone(timezone.utc)
+    if trigger is not None:
+        first_run = next_fire_time(trigger, max(first_run, now))
+        if first_run is None:
+            raise HTTPException(status_code=422, detail="Schedule never fires")
+
+    job = Job(
+        script_id=payload.script_id,
+        agent_id=payload.agent_id,
+        status="scheduled",
+        next_run_at=first_run,
+        priority=payload.priority,
+        owner_id=owner.id,
+    )
+    if trigger is not None:
+        job.schedule = payload.schedule
+    elif run_at is not None:
         job.schedule = run_at.isoformat()
+    return job
+
+
+async def _existing_ids(session: AsyncSession, model, ids: set[int]) -> set[int]:
+    if not ids:
+        return set()
+    return set((await session.exec(select(model.id).where(model.id.in_(ids)))).all())
+
+
+@router.post("")
+async def create_job(
+    request: Request,
+    payload: JobCreate,
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    job = _new_job(payload, user, datetime.now(timezone.utc))
+    if payload.script_id is not None:
+        if await session.get(Script, payload.script_id) is None:
+            raise HTTPException(status_code=404, detail="Script not found")
+    if payload.agent_id is not None:
+        if await session.get(Agent, payload.agent_id) is None:
+            raise HTTPException(status_code=404, detail="Agent not found")
+    await admit_jobs("create_job", user.id)
+
     session.add(job)
-    session.commit()
-    session.refresh(job)
+    await session.commit()
+    bump("job")
+    audit_target(request, "job", job.id)
+    await session.refresh(job)
+    # before arming it, so "created" can't arrive after the first run's events
+    publish_job(job.id, status=job.status, next_run_at=job.next_run_at)
 
-    # schedule a one-off execution (stub)
     try:
-        scheduler_add_once(job_id=job.id, when=run_at)
+        scheduler_add_many([job])
     except Exception as e:
         job.status = "failed"
         job.last_error = f"Scheduler error: {e}"
         session.add(job)
-        session.commit()
+        await session.commit()
+        bump("job")
+        publish_job(job.id, status=job.status, last_error=job.last_error)
         raise HTTPException(status_code=500, detail=f"Scheduler error: {e}")
     return job
+
+
+class JobBatch(BaseModel):
+    jobs: list[JobCreate]
+
+
+@router.post("/batch")
+async def create_jobs(
+    request: Request,
+    payload: JobBatch,
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Create many jobs in one transaction.
+
+    Items are validated independently: the valid ones are created, and
+    ``results`` reports each item by its index, either with the job or
+    with the status code and detail that ``POST /api/v1/jobs`` would have
+    returned for it.
+    """
+    if len(payload.jobs) > settings.api_batch_max_jobs:
+        raise HTTPException(status_code=422, detail=f"At most {settings.api_batch_max_jobs} jobs per batch")
+    scripts = await _existing_ids(session, Script, {p.script_id for p in payload.jobs if p.script_id is not None})
+    agents = await _existing_ids(session, Agent, {p.agent_id for p in payload.jobs if p.agent_id is not None})
+
+    now = datetime.now(timezone.utc)
+    results: list[dict] = []
+    created: list[Job] = []
+    for index, item in enumerate(payload.jobs):
+        try:
+            job = _new_job(item, user, now)
+            if item.script_id is not None and item.script_id not in scripts:
+                raise HTTPException(status_code=404, detail="Script not found")
+            if item.agent_id is not None and item.agent_id not in agents:
+                raise HTTPException(status_code=404, detail="Agent not found")
+        except HTTPException as e:
+            results.append({"index": index, "ok": False, "status_code": e.status_code, "detail": e.detail})
+            continue
+        created.append(job)
+        results.append({"index": index, "ok": True, "job": job})
+
+    if created:
+        await admit_jobs("create_jobs", user.id, len(created))
+        session.add_all(created)
+        await session.commit()  # ids come back from the one multi-row INSERT
+        bump("job")
+        audit_target(request, "job")
+        for job in created:
+            publish_job(job.id, status=job.status, next_run_at=job.next_run_at)
+        try:
+            scheduler_add_many(created)
+        except Exception as e:
+            error = f"Scheduler error: {e}"
+            ids = [job.id for job in created]
+            await session.execute(update(Job).where(Job.id.in_(ids)).values(status="failed", last_error=error))
+            await session.commit()
+            bump("job")
+            for job_id in ids:
+                publish_job(job_id, status="failed", last_error=error)
+            raise HTTPException(status_code=500, detail=error)
+    return {"created": len(created), "failed": len(results) - len(created), "results": results}
+
+
+@router.get("/{job_id}/runs")
+async def list_job_runs(
+    job_id: int,
+    limit: int = Query(default=50, ge=1, le=500),
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Execution history of a job, newest first."""
+    if await session.get(Job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    stmt = select(JobRun).where(JobRun.job_id == job_id).order_by(JobRun.id.desc()).limit(limit)
+    return (await session.exec(stmt)).all()
+
+
+_LOG_CHUNK = 64 * 1024
+
+
+def _log_start(path: Path, tail: int | None, line: int | None, offset: int | None) -> tuple[int, int, bool]:
+    """``(start offset, size, complete)``; the size is taken after the start
+    is found, so it never ends before it."""
+    complete = LogIndex(path).closed
+    if tail is not None:
+        start = tail_offset(path, tail)
+    elif line is not None:
+        start = line_offset(path, line)
+    else:
+        start = offset or 0
+    size = path.stat().st_size
+    return min(start, size), size, complete
+
+
+async def _stream_log(request: Request, path: Path, start: int, end: int | None, follow: bool):
+    idle = 0.0
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        pos = start
+        while True:
+            want = _LOG_CHUNK if end is None else min(_LOG_CHUNK, end - pos)
+            data = await asyncio.to_thread(fh.read, want) if want > 0 else b""
+            if data:
+                pos += len(data)
+                idle = 0.0
+                yield data
+                continue
+            if not follow:
+                return
+            if (await asyncio.to_thread(LogIndex, path)).closed:
+                follow = False  # the sink closed after its last write: drain and stop
+                continue
+            if idle >= settings.log_follow_max_idle_seconds or await request.is_disconnected():
+                return
+            await asyncio.sleep(settings.log_follow_poll_seconds)
+            idle += settings.log_follow_poll_seconds
+
+
+@router.get("/{job_id}/log")
+async def job_log(
+    job_id: int,
+    request: Request,
+    run_id: int | None = Query(default=None, description="Default: the latest run"),
+    tail: int | None = Query(default=None, ge=1, le=100_000, description="Start at the last N lines"),
+    line: int | None = Query(default=None, ge=0, description="Start at this line (0-based)"),
+    offset: int | None = Query(default=None, ge=0, description="Start at this byte"),
+    length: int | None = Query(default=None, ge=0, description="Return at most this many bytes"),
+    follow: bool = Query(default=False, description="Keep streaming output until the run ends"),
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """A run's output, read from the requested region of its log file only.
+
+    The start is one of ``tail``, ``line`` or ``offset`` (default: the
+    beginning). ``X-Log-Offset`` is the first byte returned, ``X-Log-Size``
+    the file size at the time of the request and ``X-Log-Complete`` whether
+    the run had finished writing, so a client can also poll with
+    ``offset`` = previous offset + bytes received.
+    """
+    if sum(p is not None for p in (tail, line, offset)) > 1:
+        raise HTTPException(status_code=422, detail="Use only one of tail, line and offset")
+    stmt = select(JobRun).where(JobRun.job_id == job_id)
+    if run_id is not None:
+        stmt = stmt.where(JobRun.id == run_id)
+    run = (await session.exec(stmt.order_by(JobRun.id.desc()).limit(1))).first()
+    await release_connection(session)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    path = Path(run.log_path) if run.log_path else None
+    if path is None or not path.is_file():
+        raise HTTPException(status_code=404, detail="Run has no log")
+
+    start, size, complete = await asyncio.to_thread(_log_start, path, tail, line, offset)
+    headers = {"X-Log-Offset": str(start), "X-Log-Size": str(size), "X-Log-Complete": str(complete).lower()}
+    end = None
+    if not follow:
+        end = size if length is None else min(size, start + length)
+        headers["Content-Length"] = str(end - start)
+    return StreamingResponse(
+        _stream_log(request, path, start, end, follow and not complete),
+        media_type="text/plain; charset=utf-8",
+        headers=headers,
+    )
+
+
+@router.get("/{job_id}/artifacts")
+async def list_job_artifacts(
+    job_id: int,
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Files stored by the job's runs (the latest file of each name)."""
+    if await session.get(Job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    stmt = select(Artifact).where(Artifact.job_id == job_id).order_by(Artifact.name)
+    return (await session.exec(stmt)).all()
+
+
+@router.get("/{job_id}/artifacts/{name:path}")
+async def download_artifact(
+    job_id: int,
+    name: str,
+    request: Request,
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Stream an artifact from disk; supports ``Range``, the ETag is its SHA-256."""
+    stmt = select(Artifact).where(Artifact.job_id == job_id, Artifact.name == name)
+    artifact = (await session.exec(stmt)).first()
+    await release_connection(session)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    etag = f'"{artifact.digest}"'
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    path = get_artifact_store().blob_path(artifact.digest)
+    if not path.is_file():
+        raise HTTPException(status_code=404, detail="Artifact content missing")
+    return FileResponse(
+        path,
+        media_type=artifact.content_type or "application/octet-stream",
+        filename=PurePosixPath(artifact.name).name,
+        headers={"ETag": etag},
+    )
+
+
+@router.delete("/{job_id}/artifacts/{name:path}", status_code=204)
+async def delete_artifact(job_id: int, name: str, user: User = Depends(get_current_user)):
+    """Delete an artifact; its blob goes once nothing else references it."""
+    if not await asyncio.to_thread(get_artifact_store().delete, engine, job_id, [name]):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return Response(status_code=204)
+
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: int, session: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+    """Stop future runs of a job (one-off or recurring); a run in progress finishes."""
+    job = await session.get(Job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status in ("succeeded", "failed"):
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    scheduler_cancel(job_id)
+    job.status = "cancelled"
+    job.next_run_at = None
+    session.add(job)
+    await session.commit()
+    bump("job")
+    await session.refresh(job)
+    publish_job(job_id, status="cancelled", next_run_at=None)
+    if job.workflow_id is not None:
+        # settle the node so its dependents are decided and the workflow can end;
+        # the refresh above began a write transaction, end it before the writer thread needs the lock
+        await release_connection(session)
+        await asyncio.to_thread(apply_transition, get_workflow_engine().job_finished(job_id, None))
+    return job
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from ...api.audit import audit_target
 from ...api.deps import get_db
+from ...api.etag import check_not_modified
+from ...api.pagination import paginate
 from ...core.security import get_current_user
+from ...core.versions import bump
 from ...domain.models import Script, User
 
 
@@ -10,17 +16,41 @@ router = APIRouter(prefix="/api/v1/scripts", tags=["scripts"])
 
 
 @router.get("")
-def list_scripts(session: Session = Depends(get_db)):
-    return session.exec(select(Script)).all()
+async def list_scripts(
+    request: Request,
+    response: Response,
+    name: str | None = Query(default=None, description="Name prefix"),
+    order: Literal["asc", "desc"] = "asc",
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    session: AsyncSession = Depends(get_db),
+):
+    not_modified = check_not_modified(request, response, "script")
+    if not_modified is not None:
+        return not_modified
+    stmt = select(Script)
+    if name:
+        stmt = stmt.where(Script.name.startswith(name, autoescape=True))
+    return await paginate(
+        session, stmt, request, response,
+        columns=[Script.id], cursor=cursor, limit=limit, descending=order == "desc",
+    )
 
 
 @router.post("")
-def create_script(script: Script, session: Session = Depends(get_db), user: User = Depends(get_current_user)):
+async def create_script(
+    request: Request,
+    script: Script,
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
     if not user.is_admin:
         raise HTTPException(status_code=403, detail="Admin required")
     script.id = None
     session.add(script)
-    session.commit()
-    session.refresh(script)
+    await session.commit()
+    bump("script")
+    audit_target(request, "script", script.id)
+    await session.refresh(script)
     return script
 
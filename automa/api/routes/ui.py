@@ -1,48 +1,103 @@
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Optional
+import json
 
 from fastapi import APIRouter, Depends, Form, Request, Response, HTTPException
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from ..audit import audit_actor, audit_target
 from ..deps import get_db
-from ...core.security import authenticate_user, create_access_token
+from ..etag import check_not_modified
+from ..ratelimit import admit_jobs
+from ...core.config import settings
+from ...core.db import get_async_session
+from ...core.events import CLOSED, EventBus, get_event_bus, publish_job
+from ...core.principal_cache import invalidate_user
+from ...core.profiling import ProfiledTemplate
+from ...core.ratelimit import RateLimited
+from ...core.fragment_cache import get_fragment_cache
+from ...core.versions import bump, get_versions
+from ...core.security import (
+    authenticate_user_async,
+    check_password,
+    create_access_token,
+    hash_password,
+    user_from_token,
+)
 from ...domain.models import Agent, Script, Job, User
-from ...scheduler.manager import scheduler_add_once
+from ...scheduler.manager import scheduler_add_once, scheduler_add_recurring
+from ...scheduler.triggers import next_fire_time, parse_schedule
 
 
 templates = Jinja2Templates(directory="automa/web/templates")
+templates.env.template_class = ProfiledTemplate  # "render" span of profiled requests
 router = APIRouter(prefix="/ui", tags=["ui"])
 
 
-def _get_user_from_cookie(request: Request, session: Session) -> Optional[User]:
+async def _get_user_from_cookie(request: Request, session: AsyncSession) -> Optional[User]:
     token = request.cookies.get("automa_access_token")
     if not token:
         return None
-    from jose import JWTError, jwt
-    from ...core.config import settings
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
-        email = payload.get("sub")
-        if not email:
-            return None
-        return session.exec(select(User).where(User.email == email)).first()
-    except JWTError:
-        return None
+    user = await user_from_token(token, session)
+    if user is not None:
+        audit_actor(request, user.id)
+    return user
+
+
+def _audience(user: Optional[User]) -> str:
+    # partials differ only by whether (and as what) the viewer is logged in
+    if user is None:
+        return "anon"
+    return "admin" if user.is_admin else "user"
+
+
+async def _render_list(
+    session: AsyncSession, user: Optional[User], template: str, table: str, name: str, load
+) -> bytes:
+    """
+    Render a list partial; the body is served from the fragment cache until
+    ``table`` changes (per viewer bucket).
+    """
+    cache = get_fragment_cache()
+    slot = (template, _audience(user))
+    # read before querying: the render is at least as new as this version
+    version = get_versions().get(table)
+    body = cache.get(slot, version)
+    if body is None:
+        items = await load(session) if user else []
+        body = templates.get_template(template).render({name: items}).encode()
+        cache.put(slot, version, body)
+    return body
+
+
+async def _all_agents(session: AsyncSession) -> list[Agent]:
+    return list((await session.exec(select(Agent))).all())
+
+
+async def _all_scripts(session: AsyncSession) -> list[Script]:
+    return list((await session.exec(select(Script))).all())
+
+
+async def _recent_jobs(session: AsyncSession) -> list[Job]:
+    stmt = select(Job).order_by(Job.id.desc()).limit(settings.api_page_size_default)
+    return list((await session.exec(stmt)).all())
 
 
 @router.post("/auth/login", response_class=HTMLResponse)
-def ui_login(
+async def ui_login(
     request: Request,
     response: Response,
     email: str = Form(...),
     password: str = Form(...),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_db),
 ):
-    user = authenticate_user(session, email, password)
+    user = await authenticate_user_async(session, email, password)
     if not user:
         return HTMLResponse("<span class='err'>Invalid credentials</span>", status_code=401)
+    audit_actor(request, user.id)
     token = create_access_token({"sub": user.email})
     resp = templates.TemplateResponse("partials/login_status.html", {"request": request, "user": user})
     resp.set_cookie("automa_access_token", token, httponly=True, samesite="lax")
@@ -52,7 +107,7 @@ def ui_login(
 
 
 @router.post("/auth/logout", response_class=HTMLResponse)
-def ui_logout(request: Request, response: Response):
+async def ui_logout(request: Request, response: Response):
     resp = HTMLResponse("<span>Logged out</span>")
     resp.delete_cookie("automa_access_token")
     resp.headers["HX-Refresh"] = "true"
@@ -61,20 +116,21 @@ def ui_logout(request: Request, response: Response):
 
 
 @router.post("/auth/register", response_class=HTMLResponse)
-def ui_register(
+async def ui_register(
     request: Request,
     response: Response,
     email: str = Form(...),
     password: str = Form(...),
     full_name: str | None = Form(None),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_db),
 ):
-    from ...core.security import get_password_hash
-    if session.exec(select(User).where(User.email == email)).first():
+    if (await session.exec(select(User).where(User.email == email))).first():
         return HTMLResponse("<span class='err'>Email already registered</span>", status_code=400)
-    user = User(email=email, hashed_password=get_password_hash(password), full_name=full_name, is_active=True)
+    user = User(email=email, hashed_password=await hash_password(password, session), full_name=full_name, is_active=True)
     session.add(user)
-    session.commit()
+    await session.commit()
+    audit_actor(request, user.id)
+    audit_target(request, "user", user.id)
     token = create_access_token({"sub": user.email})
     resp = templates.TemplateResponse("partials/login_status.html", {"request": request, "user": user})
     resp.set_cookie("automa_access_token", token, httponly=True, samesite="lax")
@@ -84,133 +140,219 @@ def ui_register(
 
 
 @router.get("/partials/login_status", response_class=HTMLResponse)
-def login_status(request: Request, session: Session = Depends(get_db)):
-    user = _get_user_from_cookie(request, session)
+async def login_status(request: Request, session: AsyncSession = Depends(get_db)):
+    user = await _get_user_from_cookie(request, session)
     return templates.TemplateResponse("partials/login_status.html", {"request": request, "user": user})
 
 
 @router.get("/partials/agents", response_class=HTMLResponse)
-def partial_agents(request: Request, session: Session = Depends(get_db)):
-    user = _get_user_from_cookie(request, session)
-    agents = session.exec(select(Agent)).all() if user else []
-    return templates.TemplateResponse("partials/agents_list.html", {"request": request, "agents": agents})
+async def partial_agents(request: Request, response: Response, session: AsyncSession = Depends(get_db)):
+    user = await _get_user_from_cookie(request, session)
+    not_modified = check_not_modified(request, response, "agent", variant=_audience(user), private=True)
+    if not_modified is not None:
+        return not_modified
+    body = await _render_list(session, user, "partials/agents_list.html", "agent", "agents", _all_agents)
+    return HTMLResponse(body, headers=response.headers)
 
 
 @router.post("/agents", response_class=HTMLResponse)
-def create_agent_ui(
+async def create_agent_ui(
     request: Request,
     name: str = Form(...),
     description: Optional[str] = Form(None),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_db),
 ):
-    user = _get_user_from_cookie(request, session)
+    user = await _get_user_from_cookie(request, session)
     if not user or not user.is_admin:
         raise HTTPException(status_code=403, detail="Admin required")
     agent = Agent(name=name, description=description)
     session.add(agent)
-    session.commit()
-    agents = session.exec(select(Agent)).all()
-    return templates.TemplateResponse("partials/agents_list.html", {"request": request, "agents": agents})
+    await session.commit()
+    bump("agent")
+    audit_target(request, "agent", agent.id)
+    return HTMLResponse(await _render_list(session, user, "partials/agents_list.html", "agent", "agents", _all_agents))
 
 
 @router.get("/partials/scripts", response_class=HTMLResponse)
-def partial_scripts(request: Request, session: Session = Depends(get_db)):
-    user = _get_user_from_cookie(request, session)
-    scripts = session.exec(select(Script)).all() if user else []
-    return templates.TemplateResponse("partials/scripts_list.html", {"request": request, "scripts": scripts})
+async def partial_scripts(request: Request, response: Response, session: AsyncSession = Depends(get_db)):
+    user = await _get_user_from_cookie(request, session)
+    not_modified = check_not_modified(request, response, "script", variant=_audience(user), private=True)
+    if not_modified is not None:
+        return not_modified
+    body = await _render_list(session, user, "partials/scripts_list.html", "script", "scripts", _all_scripts)
+    return HTMLResponse(body, headers=response.headers)
 
 
 @router.post("/scripts", response_class=HTMLResponse)
-def create_script_ui(
+async def create_script_ui(
     request: Request,
     name: str = Form(...),
     path: str = Form(...),
     description: Optional[str] = Form(None),
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_db),
 ):
-    user = _get_user_from_cookie(request, session)
+    user = await _get_user_from_cookie(request, session)
     if not user or not user.is_admin:
         raise HTTPException(status_code=403, detail="Admin required")
     script = Script(name=name, path=path, description=description)
     session.add(script)
-    session.commit()
-    scripts = session.exec(select(Script)).all()
-    return templates.TemplateResponse("partials/scripts_list.html", {"request": request, "scripts": scripts})
+    await session.commit()
+    bump("script")
+    audit_target(request, "script", script.id)
+    return HTMLResponse(
+        await _render_list(session, user, "partials/scripts_list.html", "script", "scripts", _all_scripts)
+    )
 
 
 @router.get("/partials/jobs", response_class=HTMLResponse)
-def partial_jobs(request: Request, session: Session = Depends(get_db)):
-    user = _get_user_from_cookie(request, session)
-    jobs = session.exec(select(Job)).all() if user else []
-    return templates.TemplateResponse("partials/jobs_list.html", {"request": request, "jobs": jobs})
+async def partial_jobs(request: Request, response: Response, session: AsyncSession = Depends(get_db)):
+    user = await _get_user_from_cookie(request, session)
+    not_modified = check_not_modified(request, response, "job", variant=_audience(user), private=True)
+    if not_modified is not None:
+        return not_modified
+    body = await _render_list(session, user, "partials/jobs_list.html", "job", "jobs", _recent_jobs)
+    return HTMLResponse(body, headers=response.headers)
+
+
+def _sse(event: dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n"
+
+
+async def _job_events(bus: EventBus, keepalive: float) -> AsyncIterator[str]:
+    # subscribe inside the generator so the subscription ends with the response
+    sub = bus.subscribe()
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            event = await sub.get(timeout=keepalive)
+            if event is CLOSED:
+                return
+            # a comment line keeps proxies from timing out an idle stream
+            yield ": keep-alive\n\n" if event is None else _sse(event)
+    finally:
+        sub.close()
+
+
+@router.get("/stream/jobs")
+async def stream_jobs(request: Request):
+    """Job state deltas as server-sent events (``job``; ``resync`` = re-fetch the list)."""
+    # no get_db: the session must not stay checked out for the life of the stream
+    async with get_async_session(readonly=True) as session:
+        user = await _get_user_from_cookie(request, session)
+    if not user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return StreamingResponse(
+        _job_events(get_event_bus(), settings.event_stream_keepalive_seconds),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.get("/partials/profile", response_class=HTMLResponse)
-def partial_profile(request: Request, session: Session = Depends(get_db)):
-    user = _get_user_from_cookie(request, session)
+async def partial_profile(request: Request, session: AsyncSession = Depends(get_db)):
+    user = await _get_user_from_cookie(request, session)
     return templates.TemplateResponse("partials/profile.html", {"request": request, "user": user})
 
 
 @router.post("/profile", response_class=HTMLResponse)
-def update_profile(
+async def update_profile(
     request: Request,
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_db),
     email: str | None = Form(None),
     full_name: str | None = Form(None),
 ):
-    user = _get_user_from_cookie(request, session)
+    principal = await _get_user_from_cookie(request, session)
+    user = await session.get(User, principal.id) if principal else None
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
     if email and email != user.email:
-        if session.exec(select(User).where(User.email == email)).first():
+        if (await session.exec(select(User).where(User.email == email))).first():
             return HTMLResponse("<span class='err'>Email already in use</span>", status_code=400)
         user.email = email
     if full_name is not None:
         user.full_name = full_name
     session.add(user)
-    session.commit()
+    await session.commit()
+    invalidate_user(user.id)
     return templates.TemplateResponse("partials/profile.html", {"request": request, "user": user})
 
 
 @router.post("/profile/change_password", response_class=HTMLResponse)
-def update_password(
+async def update_password(
     request: Request,
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_db),
     old_password: str = Form(...),
     new_password: str = Form(...),
 ):
-    user = _get_user_from_cookie(request, session)
+    principal = await _get_user_from_cookie(request, session)
+    user = await session.get(User, principal.id) if principal else None
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    from ...core.security import verify_password, get_password_hash
-    if not verify_password(old_password, user.hashed_password):
+    if not await check_password(session, user, old_password):
         return HTMLResponse("<span class='err'>Invalid current password</span>", status_code=400)
-    user.hashed_password = get_password_hash(new_password)
+    user.hashed_password = await hash_password(new_password, session)
     session.add(user)
-    session.commit()
+    await session.commit()
+    invalidate_user(user.id)
     return HTMLResponse("<span class='ok'>Password changed</span>")
 
 
 @router.post("/jobs", response_class=HTMLResponse)
-def create_job_ui(
+async def create_job_ui(
     request: Request,
     script_id: Optional[int] = Form(None),
     when: Optional[str] = Form(None),
-    session: Session = Depends(get_db),
+    schedule: Optional[str] = Form(None),
+    session: AsyncSession = Depends(get_db),
 ):
-    user = _get_user_from_cookie(request, session)
+    user = await _get_user_from_cookie(request, session)
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    job = Job(script_id=script_id, status="scheduled")
-    session.add(job)
-    session.commit()
+    trigger = None
+    if schedule:
+        try:
+            trigger = parse_schedule(schedule)
+        except ValueError:
+            return HTMLResponse("<span class='err'>Invalid schedule</span>", status_code=400)
     dt = None
     if when:
         try:
             dt = datetime.fromisoformat(when)
         except ValueError:
             dt = None
-    scheduler_add_once(job_id=job.id, when=dt)
-
-    jobs = session.exec(select(Job)).all()
-    return templates.TemplateResponse("partials/jobs_list.html", {"request": request, "jobs": jobs})
+    if dt is not None and dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    now = datetime.now(timezone.utc)
+    first_run = dt or now
+    if trigger is not None:
+        first_run = next_fire_time(trigger, max(first_run, now))
+        if first_run is None:
+            return HTMLResponse("<span class='err'>Invalid schedule</span>", status_code=400)
+    try:
+        await admit_jobs("create_job_ui", user.id)
+    except RateLimited as e:
+        return HTMLResponse(
+            f"<span class='err'>{e.detail} (retry in {e.retry_after}s)</span>",
+            status_code=429,
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    job = Job(
+        script_id=script_id,
+        status="scheduled",
+        next_run_at=first_run,
+        schedule=schedule if trigger is not None else None,
+        owner_id=user.id,
+    )
+    session.add(job)
+    await session.commit()
+    bump("job")
+    audit_target(request, "job", job.id)
+    publish_job(job.id, status=job.status, next_run_at=job.next_run_at)
+    if trigger is not None:
+        scheduler_add_recurring(
+            job_id=job.id, schedule=schedule, first_run=first_run, script_id=job.script_id, owner_id=user.id
+        )
+    else:
+        scheduler_add_once(job_id=job.id, when=dt, script_id=job.script_id, owner_id=user.id)
+
+    return HTMLResponse(await _render_list(session, user, "partials/jobs_list.html", "job", "jobs", _recent_jobs))
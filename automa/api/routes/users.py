@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from ..deps import get_db
+from ...core.principal_cache import invalidate_user
 from ...core.security import (
+    check_password,
     get_current_user,
-    verify_password,
-    get_password_hash,
+    hash_password,
 )
 from ...domain.models import User
 
@@ -15,7 +17,7 @@ router = APIRouter(prefix="/api/v1/users", tags=["users"])
 
 
 @router.get("/me", response_model=None)
-def read_me(current_user: User = Depends(get_current_user)):
+async def read_me(current_user: User = Depends(get_current_user)):
     return {"email": current_user.email, "is_admin": current_user.is_admin}
 
 
@@ -25,21 +27,26 @@ class UserUpdate(BaseModel):
 
 
 @router.patch("/me")
-def update_me(
+async def update_me(
     payload: UserUpdate,
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    if payload.email and payload.email != current_user.email:
-        if session.exec(select(User).where(User.email == payload.email)).first():
+    # current_user may be a cached snapshot; modify the persistent row
+    user = await session.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if payload.email and payload.email != user.email:
+        if (await session.exec(select(User).where(User.email == payload.email))).first():
             raise HTTPException(status_code=400, detail="Email already in use")
-        current_user.email = payload.email
+        user.email = payload.email
     if payload.full_name is not None:
-        current_user.full_name = payload.full_name
-    session.add(current_user)
-    session.commit()
-    session.refresh(current_user)
-    return {"email": current_user.email, "full_name": current_user.full_name}
+        user.full_name = payload.full_name
+    session.add(user)
+    await session.commit()
+    invalidate_user(user.id)
+    await session.refresh(user)
+    return {"email": user.email, "full_name": user.full_name}
 
 
 class PasswordChange(BaseModel):
@@ -48,14 +55,18 @@ class PasswordChange(BaseModel):
 
 
 @router.post("/me/change_password")
-def change_password(
+async def change_password(
     payload: PasswordChange,
-    session: Session = Depends(get_db),
+    session: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    if not verify_password(payload.old_password, current_user.hashed_password):
+    user = await session.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if not await check_password(session, user, payload.old_password):
         raise HTTPException(status_code=400, detail="Invalid current password")
-    current_user.hashed_password = get_password_hash(payload.new_password)
-    session.add(current_user)
-    session.commit()
+    user.hashed_password = await hash_password(payload.new_password, session)
+    session.add(user)
+    await session.commit()
+    invalidate_user(user.id)
     return {"status": "ok"}
@@ -0,0 +1,215 @@
+from datetime import datetime, timezone
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import BaseModel, Field
+from sqlalchemy import update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ...api.audit import audit_target
+from ...api.deps import get_db
+from ...api.etag import check_not_modified
+from ...api.pagination import paginate
+from ...api.ratelimit import admit_jobs
+from ...core.config import settings
+from ...core.events import publish_job
+from ...core.security import get_current_user
+from ...core.versions import bump
+from ...domain.models import Agent, Job, JobDependency, Script, User, Workflow
+from ...scheduler.manager import get_workflow_engine, scheduler_add_many, scheduler_cancel
+
+
+class Dependency(BaseModel):
+    key: str
+    policy: Literal["on_success", "on_failure", "always"] = "on_success"
+
+
+class WorkflowNode(BaseModel):
+    key: str
+    script_id: int | None = None
+    agent_id: int | None = None
+    priority: str = "normal"
+    depends_on: list[str | Dependency] = Field(default_factory=list)
+
+
+class WorkflowCreate(BaseModel):
+    name: str
+    when: datetime | None = None  # start of the root jobs; None = now
+    nodes: list[WorkflowNode]
+
+
+router = APIRouter(prefix="/api/v1/workflows", tags=["workflows"])
+
+
+def _edges(payload: WorkflowCreate) -> list[tuple[str, str, str]]:
+    """``(key, depends_on_key, policy)`` edges; raises 422 on unknown keys or cycles."""
+    keys = [n.key for n in payload.nodes]
+    if len(set(keys)) != len(keys):
+        raise HTTPException(status_code=422, detail="Node keys must be unique")
+    edges = []
+    for node in payload.nodes:
+        for dep in node.depends_on:
+            dep = Dependency(key=dep) if isinstance(dep, str) else dep
+            if dep.key not in keys:
+                raise HTTPException(status_code=422, detail=f"Node {node.key!r} depends on unknown node {dep.key!r}")
+            edges.append((node.key, dep.key, dep.policy))
+
+    # Kahn's algorithm: every node must be reachable from the roots
+    indegree = {key: 0 for key in keys}
+    children: dict[str, list[str]] = {key: [] for key in keys}
+    for key, dep, _ in edges:
+        indegree[key] += 1
+        children[dep].append(key)
+    queue = [key for key, n in indegree.items() if n == 0]
+    for key in queue:
+        for child in children[key]:
+            indegree[child] -= 1
+            if indegree[child] == 0:
+                queue.append(child)
+    if len(queue) != len(keys):
+        raise HTTPException(status_code=422, detail="Workflow dependencies contain a cycle")
+    return edges
+
+
+async def _check_refs(session: AsyncSession, model, ids: set[int], label: str) -> None:
+    if not ids:
+        return
+    found = set((await session.exec(select(model.id).where(model.id.in_(ids)))).all())
+    if found != ids:
+        raise HTTPException(status_code=404, detail=f"{label} not found: {sorted(ids - found)}")
+
+
+async def _detail(session: AsyncSession, workflow: Workflow) -> dict:
+    jobs = (await session.exec(select(Job).where(Job.workflow_id == workflow.id).order_by(Job.id))).all()
+    edges = (await session.exec(select(JobDependency).where(JobDependency.workflow_id == workflow.id))).all()
+    return {
+        **workflow.model_dump(),
+        "jobs": jobs,
+        "dependencies": [{"job_id": e.job_id, "depends_on_id": e.depends_on_id, "policy": e.policy} for e in edges],
+    }
+
+
+@router.get("")
+async def list_workflows(
+    request: Request,
+    response: Response,
+    status: str | None = Query(default=None, description="Comma-separated statuses"),
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1),
+    session: AsyncSession = Depends(get_db),
+):
+    """Workflows, newest first, keyset-paginated (see ``X-Next-Cursor``)."""
+    not_modified = check_not_modified(request, response, "workflow")
+    if not_modified is not None:
+        return not_modified
+    stmt = select(Workflow)
+    if status:
+        stmt = stmt.where(Workflow.status.in_([s.strip() for s in status.split(",") if s.strip()]))
+    return await paginate(
+        session, stmt, request, response,
+        columns=[Workflow.id], cursor=cursor, limit=limit, descending=True,
+    )
+
+
+@router.post("")
+async def create_workflow(
+    request: Request,
+    payload: WorkflowCreate,
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Create a workflow; jobs without dependencies start at ``when``, the
+    rest as soon as their upstream jobs settle."""
+    if not payload.nodes:
+        raise HTTPException(status_code=422, detail="A workflow needs at least one node")
+    if len(payload.nodes) > settings.api_batch_max_jobs:
+        raise HTTPException(status_code=422, detail=f"At most {settings.api_batch_max_jobs} nodes per workflow")
+    edges = _edges(payload)
+    unknown = {n.priority for n in payload.nodes} - set(settings.executor_class_weights)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown priority {sorted(unknown)[0]!r}")
+    await _check_refs(session, Script, {n.script_id for n in payload.nodes if n.script_id is not None}, "Script")
+    await _check_refs(session, Agent, {n.agent_id for n in payload.nodes if n.agent_id is not None}, "Agent")
+    await admit_jobs("create_workflow", user.id, len(payload.nodes))
+
+    run_at = payload.when or datetime.now(timezone.utc)
+    if run_at.tzinfo is None:
+        run_at = run_at.replace(tzinfo=timezone.utc)
+    has_upstream = {key for key, _, _ in edges}
+
+    workflow = Workflow(name=payload.name)
+    session.add(workflow)
+    await session.flush()
+    jobs: dict[str, Job] = {}
+    for node in payload.nodes:
+        root = node.key not in has_upstream
+        jobs[node.key] = Job(
+            script_id=node.script_id,
+            agent_id=node.agent_id,
+            workflow_id=workflow.id,
+            priority=node.priority,
+            owner_id=user.id,
+            status="scheduled" if root else "waiting",
+            next_run_at=run_at if root else None,
+        )
+    session.add_all(jobs.values())
+    await session.flush()
+    session.add_all(
+        JobDependency(workflow_id=workflow.id, job_id=jobs[key].id, depends_on_id=jobs[dep].id, policy=policy)
+        for key, dep, policy in edges
+    )
+    await session.commit()
+    bump("workflow", "job")
+    audit_target(request, "workflow", workflow.id)
+
+    get_workflow_engine().add(
+        workflow.id,
+        [(j.id, j.status) for j in jobs.values()],
+        [(jobs[key].id, jobs[dep].id, policy) for key, dep, policy in edges],
+    )
+    roots = [j for j in jobs.values() if j.status == "scheduled"]
+    for job in jobs.values():
+        publish_job(job.id, status=job.status, next_run_at=job.next_run_at)
+    scheduler_add_many(roots)
+    return {**workflow.model_dump(), "jobs": {key: job.id for key, job in jobs.items()}}
+
+
+@router.get("/{workflow_id}")
+async def get_workflow(workflow_id: int, session: AsyncSession = Depends(get_db)):
+    """A workflow with its jobs and dependency edges."""
+    workflow = await session.get(Workflow, workflow_id)
+    if workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    return await _detail(session, workflow)
+
+
+@router.post("/{workflow_id}/cancel")
+async def cancel_workflow(
+    workflow_id: int,
+    session: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    """Cancel every job of the workflow that has not started; running jobs finish."""
+    workflow = await session.get(Workflow, workflow_id)
+    if workflow is None:
+        raise HTTPException(status_code=404, detail="Workflow not found")
+    if workflow.status != "running":
+        raise HTTPException(status_code=409, detail=f"Workflow already {workflow.status}")
+    get_workflow_engine().cancel(workflow_id)
+    pending = (
+        await session.exec(
+            select(Job.id).where(Job.workflow_id == workflow_id, Job.status.in_(("waiting", "pending", "scheduled")))
+        )
+    ).all()
+    for job_id in pending:
+        scheduler_cancel(job_id)
+    await session.execute(update(Job).where(Job.id.in_(pending)).values(status="cancelled", next_run_at=None))
+    workflow.status = "cancelled"
+    workflow.finished_at = datetime.now(timezone.utc)
+    session.add(workflow)
+    await session.commit()
+    bump("workflow", "job")
+    for job_id in pending:
+        publish_job(job_id, status="cancelled", next_run_at=None)
+    return await _detail(session, workflow)
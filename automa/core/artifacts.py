@@ -0,0 +1,202 @@
+"""Content-addressed store for files produced by job runs.
+
+Every run gets a scratch output directory under ``<data_dir>/artifacts/tmp``,
+exposed to the script as ``$AUTOMA_OUTPUT_DIR``. When the run ends, each
+regular file in it becomes an :class:`~automa.domain.models.Artifact` of the
+job, named by its path relative to that directory; a file of the same name
+from an earlier run is replaced. The content is hashed (SHA-256) and moved
+by rename, as the scratch directory is on the same filesystem, to
+``blobs/<aa>/<digest>``, or dropped if that blob is already stored. So
+identical outputs, e.g. an unchanged daily report, take the space of one.
+
+``Blob.refcount`` counts the artifacts pointing at a blob. It is updated in
+the same transaction that adds, replaces or deletes artifacts, and blobs
+whose count dropped to zero are deleted right after the commit.
+:meth:`ArtifactStore.collect` sweeps what a crash can leave behind: zero-count
+rows, blob files without a row and scratch directories. Blob moves and
+deletions serialize on a lock, so a blob can't be removed while another run
+is adding a reference to it.
+"""
+
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Optional
+import hashlib
+import logging
+import mimetypes
+import os
+import shutil
+import stat
+import threading
+
+from sqlalchemy import delete, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from .config import settings
+from ..domain.models import Artifact, Blob
+
+
+_logger = logging.getLogger(__name__)
+
+
+class ArtifactStore:
+    def __init__(self, root: Path, max_files: int = 100, max_bytes: int = 1024**3) -> None:
+        self.root = Path(root)
+        self.blobs = self.root / "blobs"
+        self.scratch = self.root / "tmp"
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {"stored": 0, "deduplicated": 0, "deleted": 0, "skipped": 0}
+
+    def blob_path(self, digest: str) -> Path:
+        return self.blobs / digest[:2] / digest
+
+    def output_dir(self, run_key: str) -> Path:
+        """Create the scratch directory a run writes its artifacts to."""
+        path = self.scratch / run_key
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _files(self, directory: Path) -> list[tuple[str, Path, int]]:
+        """``(name, path, size)`` of the regular files under ``directory``, within the limits."""
+        files: list[tuple[str, Path, int]] = []
+        total = 0
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = Path(dirpath) / filename
+                st = path.lstat()
+                if not stat.S_ISREG(st.st_mode):
+                    continue  # symlinks could point anywhere on the host
+                if len(files) >= self.max_files or total + st.st_size > self.max_bytes:
+                    _logger.warning("Artifact limits exceeded, not storing %s", path)
+                    self.stats["skipped"] += 1
+                    continue
+                total += st.st_size
+                files.append((path.relative_to(directory).as_posix(), path, st.st_size))
+        return files
+
+    def ingest(self, engine: Engine, job_id: int, run_key: str, directory: Path) -> list[str]:
+        """Store the files a run left in ``directory`` as artifacts of the job,
+        then remove the directory. Returns the artifact names."""
+        try:
+            files = []
+            for name, path, size in self._files(directory):
+                with open(path, "rb") as fh:
+                    files.append((name, path, size, hashlib.file_digest(fh, "sha256").hexdigest()))
+            if not files:
+                return []
+            with self._lock:
+                for _, path, _, digest in files:
+                    target = self.blob_path(digest)
+                    if target.exists():
+                        path.unlink()
+                        self.stats["deduplicated"] += 1
+                    else:
+                        target.parent.mkdir(parents=True, exist_ok=True)
+                        os.replace(path, target)
+                        self.stats["stored"] += 1
+                with Session(engine) as session:
+                    released = self._register(session, job_id, run_key, files)
+                    session.commit()
+                self._delete_unreferenced(engine, released)
+            return [name for name, *_ in files]
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _register(self, session: Session, job_id: int, run_key: str, files: list) -> set[str]:
+        names = [name for name, *_ in files]
+        previous = {
+            a.name: a
+            for a in session.exec(select(Artifact).where(Artifact.job_id == job_id, Artifact.name.in_(names)))
+        }
+        refs: Counter[str] = Counter()
+        sizes = {}
+        for _, _, size, digest in files:
+            refs[digest] += 1
+            sizes[digest] = size
+        known = set(session.exec(select(Blob.digest).where(Blob.digest.in_(sizes))).all())
+        session.add_all(Blob(digest=digest, size=size) for digest, size in sizes.items() if digest not in known)
+        session.flush()
+
+        now = datetime.utcnow()
+        for name, _, size, digest in files:
+            artifact = previous.get(name) or Artifact(job_id=job_id, name=name)
+            if artifact.id is not None:
+                refs[artifact.digest] -= 1
+            artifact.digest = digest
+            artifact.size = size
+            artifact.content_type = mimetypes.guess_type(name)[0]
+            artifact.run_key = run_key
+            artifact.created_at = now
+            session.add(artifact)
+        self._adjust(session, refs)
+        return {digest for digest, delta in refs.items() if delta < 0}
+
+    @staticmethod
+    def _adjust(session: Session, refs: Counter[str]) -> None:
+        for digest, delta in refs.items():
+            if delta:
+                session.execute(update(Blob).where(Blob.digest == digest).values(refcount=Blob.refcount + delta))
+
+    def delete(self, engine: Engine, job_id: int, names: Optional[Iterable[str]] = None) -> int:
+        """Drop artifacts of a job (all of them, or those in ``names``)."""
+        with self._lock:
+            with Session(engine) as session:
+                stmt = select(Artifact).where(Artifact.job_id == job_id)
+                if names is not None:
+                    stmt = stmt.where(Artifact.name.in_(list(names)))
+                artifacts = session.exec(stmt).all()
+                refs: Counter[str] = Counter()
+                for artifact in artifacts:
+                    refs[artifact.digest] -= 1
+                    session.delete(artifact)
+                self._adjust(session, refs)
+                session.commit()
+            self._delete_unreferenced(engine, set(refs))
+        return len(artifacts)
+
+    def _delete_unreferenced(self, engine: Engine, digests: Optional[set[str]] = None) -> int:
+        # called with the lock held
+        if digests is not None and not digests:
+            return 0
+        stmt = delete(Blob).where(Blob.refcount <= 0)
+        if digests is not None:
+            stmt = stmt.where(Blob.digest.in_(digests))
+        with engine.begin() as conn:
+            gone = conn.execute(stmt.returning(Blob.digest)).scalars().all()
+        for digest in gone:
+            self.blob_path(digest).unlink(missing_ok=True)
+        self.stats["deleted"] += len(gone)
+        return len(gone)
+
+    def collect(self, engine: Engine) -> int:
+        """Delete unreferenced blobs and orphaned files; only while no run is in progress."""
+        with self._lock:
+            removed = self._delete_unreferenced(engine)
+            with Session(engine) as session:
+                known = set(session.exec(select(Blob.digest)).all())
+            if self.blobs.is_dir():
+                for path in self.blobs.glob("*/*"):
+                    if path.name not in known:
+                        path.unlink(missing_ok=True)
+                        removed += 1
+            shutil.rmtree(self.scratch, ignore_errors=True)
+        return removed
+
+
+_store: Optional[ArtifactStore] = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _store
+    if _store is None:
+        _store = ArtifactStore(
+            Path(settings.data_dir) / "artifacts",
+            max_files=settings.artifact_max_files,
+            max_bytes=settings.artifact_max_bytes,
+        )
+    return _store
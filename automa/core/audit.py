@@ -0,0 +1,181 @@
+"""Batched, non-blocking audit log writer.
+
+Producers (the audit middleware, mostly) hand events to :meth:`AuditWriter.submit`,
+which only appends a tuple to a bounded in-memory queue. A background thread
+drains the queue every ``interval`` seconds, or as soon as ``batch_size``
+events are waiting, and inserts them into ``AuditLog`` with one
+``executemany`` per transaction.
+
+Overflow policy: when ``max_pending`` events are already queued, new events
+are dropped and counted (never blocking the request). The next flush
+records the gap itself as an ``audit.dropped`` row carrying the number of
+lost events, so the log shows where it is incomplete.
+
+Events submitted before :meth:`start` stay queued until the first flush.
+"""
+
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Optional
+import json
+import logging
+import threading
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .db import engine
+from ..domain.models import AuditLog
+
+
+_logger = logging.getLogger(__name__)
+
+# (created_at, actor_user_id, action, target_type, target_id, detail)
+AuditEvent = tuple[datetime, Optional[int], str, Optional[str], Optional[int], Optional[dict[str, Any]]]
+
+
+class AuditWriter:
+    def __init__(
+        self,
+        engine: Engine,
+        interval: float = 1.0,
+        batch_size: int = 1000,
+        max_pending: int = 10000,
+    ) -> None:
+        self.engine = engine
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+
+        self._lock = threading.Lock()
+        self._queue: deque[AuditEvent] = deque()
+        self._dropped = 0  # since the last flush
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"submitted": 0, "written": 0, "dropped": 0, "flushes": 0, "errors": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def pending(self) -> int:
+        return len(self._queue)
+
+    # -- producers -----------------------------------------------------
+    def submit(
+        self,
+        action: str,
+        actor_user_id: Optional[int] = None,
+        target_type: Optional[str] = None,
+        target_id: Optional[int] = None,
+        detail: Optional[dict[str, Any]] = None,
+    ) -> bool:
+        """Queue an event; returns False if it was dropped (queue full)."""
+        event = (datetime.now(timezone.utc), actor_user_id, action, target_type, target_id, detail)
+        with self._lock:
+            if len(self._queue) >= self.max_pending:
+                self._dropped += 1
+                self.stats["dropped"] += 1
+                return False
+            self._queue.append(event)
+            self.stats["submitted"] += 1
+            full = len(self._queue) >= self.batch_size
+        if full:
+            self._wakeup.set()
+        return True
+
+    # -- flushing ------------------------------------------------------
+    def _take(self) -> tuple[list[AuditEvent], int]:
+        with self._lock:
+            events = list(self._queue)
+            self._queue.clear()
+            dropped, self._dropped = self._dropped, 0
+            return events, dropped
+
+    @staticmethod
+    def _row(event: AuditEvent) -> dict[str, Any]:
+        created_at, actor, action, target_type, target_id, detail = event
+        return {
+            # stored as naive UTC like every other timestamp
+            "created_at": created_at.replace(tzinfo=None),
+            "actor_user_id": actor,
+            "action": action,
+            "target_type": target_type,
+            "target_id": target_id,
+            "detail": json.dumps(detail, separators=(",", ":"), default=str) if detail else None,
+        }
+
+    def flush(self) -> int:
+        """Write every queued event in one transaction; returns the row count."""
+        with self._flush_lock:
+            events, dropped = self._take()
+            if not events and not dropped:
+                return 0
+            rows = [self._row(e) for e in events]
+            if dropped:
+                _logger.warning("Audit queue full; dropped %s events", dropped)
+                now = datetime.now(timezone.utc)
+                rows.append(self._row((now, None, "audit.dropped", None, None, {"count": dropped})))
+            try:
+                with self.engine.begin() as conn:
+                    for start in range(0, len(rows), self.batch_size):
+                        conn.execute(insert(AuditLog), rows[start:start + self.batch_size])
+            except Exception:
+                self.stats["errors"] += 1
+                _logger.exception("Writing audit batch failed; will retry")
+                with self._lock:
+                    # put it back in front, still within the queue bound
+                    room = max(0, self.max_pending - len(self._queue))
+                    self._queue.extendleft(reversed(events[:room]))
+                    lost = max(0, len(events) - room)
+                    self._dropped += dropped + lost
+                    self.stats["dropped"] += lost
+                return 0
+            self.stats["flushes"] += 1
+            self.stats["written"] += len(rows)
+            return len(rows)
+
+    def _loop(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._loop, name="automa-audit", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.flush()
+
+
+_writer: Optional[AuditWriter] = None
+
+
+def get_audit_writer() -> AuditWriter:
+    global _writer
+    if _writer is None:
+        _writer = AuditWriter(
+            engine,
+            interval=settings.audit_flush_interval_seconds,
+            batch_size=settings.audit_batch_size,
+            max_pending=settings.audit_queue_size,
+        )
+    return _writer
+
+
+def shutdown_audit_writer() -> None:
+    if _writer is not None:
+        _writer.shutdown()  # flushes whatever is still queued
+
@@ -0,0 +1,286 @@
+"""Compressed, time-partitioned archive of old audit rows.
+
+Rows older than ``audit_retention_days`` are moved out of the ``auditlog``
+table into one segment per UTC day, ``<data_dir>/audit/YYYY/MM/YYYY-MM-DD.jsonl.gz``,
+and deleted from the table, so the hot table only ever holds the retention
+window.
+
+A segment is a series of independent gzip members of up to ``block_rows``
+JSON lines each (a concatenation of gzip members is itself a valid gzip
+file, so ``zcat`` still reads it). ``manifest.json`` keeps a small index per
+segment: its time and id range, the actions, target types and actors it
+contains, and per block the byte offset, length and id/time range. A query
+opens only segments whose index overlaps the requested window and filters,
+and inside them seeks straight to the matching blocks.
+
+Audit ids grow with ``created_at`` and archival always takes the oldest
+rows, so everything in the archive sorts before everything in the table.
+"""
+
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Iterator, Optional
+import gzip
+import json
+import logging
+import os
+import threading
+
+from sqlalchemy import delete, select
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from ..domain.models import AuditLog
+
+
+_logger = logging.getLogger(__name__)
+
+_COLUMNS = ("id", "created_at", "actor_user_id", "action", "target_type", "target_id", "detail")
+
+
+def _iso(value: datetime) -> str:
+    # fixed width, so timestamps compare correctly as strings
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec="microseconds")
+
+
+class AuditArchive:
+    def __init__(self, root: Path, block_rows: int = 1000) -> None:
+        self.root = Path(root)
+        self.block_rows = block_rows
+        self._lock = threading.Lock()
+        self._manifest: Optional[dict[str, Any]] = None
+        self._manifest_mtime: Optional[float] = None
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.root / "manifest.json"
+
+    # -- manifest ------------------------------------------------------
+    def manifest(self) -> dict[str, Any]:
+        """The archive index, re-read only when the file changed."""
+        with self._lock:
+            try:
+                mtime = self.manifest_path.stat().st_mtime
+            except FileNotFoundError:
+                return {"segments": {}}
+            if self._manifest is None or mtime != self._manifest_mtime:
+                self._manifest = json.loads(self.manifest_path.read_text())
+                self._manifest_mtime = mtime
+            return self._manifest
+
+    def _save_manifest(self, manifest: dict[str, Any]) -> None:
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, separators=(",", ":")))
+        os.replace(tmp, self.manifest_path)
+        with self._lock:
+            self._manifest = None
+
+    # -- writing -------------------------------------------------------
+    def _append_segment(self, manifest: dict[str, Any], day: str, rows: list[dict[str, Any]]) -> None:
+        seg = manifest["segments"].get(day)
+        if seg is None:
+            seg = {
+                "file": f"{day[:4]}/{day[5:7]}/{day}.jsonl.gz",
+                "count": 0,
+                "min_ts": rows[0]["created_at"],
+                "max_ts": rows[0]["created_at"],
+                "actions": [],
+                "target_types": [],
+                "actors": [],
+                "blocks": [],
+            }
+            manifest["segments"][day] = seg
+        path = self.root / seg["file"]
+        path.parent.mkdir(parents=True, exist_ok=True)
+        actions, target_types, actors = set(seg["actions"]), set(seg["target_types"]), set(seg["actors"])
+        with open(path, "ab") as fh:
+            offset = fh.tell()
+            for start in range(0, len(rows), self.block_rows):
+                block = rows[start:start + self.block_rows]
+                payload = "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in block).encode()
+                data = gzip.compress(payload, mtime=0)
+                fh.write(data)
+                seg["blocks"].append(
+                    [offset, len(data), block[0]["id"], block[-1]["id"], block[0]["created_at"], block[-1]["created_at"]]
+                )
+                offset += len(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        for r in rows:
+            actions.add(r["action"])
+            if r["target_type"] is not None:
+                target_types.add(r["target_type"])
+            if r["actor_user_id"] is not None:
+                actors.add(r["actor_user_id"])
+        seg["count"] += len(rows)
+        seg["min_ts"] = min(seg["min_ts"], rows[0]["created_at"])
+        seg["max_ts"] = max(seg["max_ts"], rows[-1]["created_at"])
+        seg["actions"], seg["target_types"], seg["actors"] = sorted(actions), sorted(target_types), sorted(actors)
+
+    @staticmethod
+    def _delete_batch(engine: Engine, batch: list) -> None:
+        # exactly the rows a batch selected: created before the cutoff, in its id range
+        first_id, last_id, before = batch
+        with engine.begin() as conn:
+            conn.execute(
+                delete(AuditLog).where(
+                    AuditLog.id.between(first_id, last_id),
+                    AuditLog.created_at < datetime.fromisoformat(before),
+                )
+            )
+
+    def archive(self, engine: Engine, before: datetime, chunk: int = 10000) -> int:
+        """Move rows created before ``before`` into segments; returns the count."""
+        if before.tzinfo is not None:
+            before = before.astimezone(timezone.utc).replace(tzinfo=None)
+        manifest = json.loads(json.dumps(self.manifest()))  # private copy to edit
+        if manifest.get("last_batch"):
+            # the previous run stopped after writing its batch, before deleting it
+            self._delete_batch(engine, manifest["last_batch"])
+        moved = 0
+        while True:
+            with engine.connect() as conn:
+                result = conn.execute(
+                    select(*(getattr(AuditLog, c) for c in _COLUMNS))
+                    .where(AuditLog.created_at < before)
+                    .order_by(AuditLog.id)
+                    .limit(chunk)
+                ).all()
+            if not result:
+                return moved
+            by_day: dict[str, list[dict[str, Any]]] = {}
+            for row in result:
+                r = dict(zip(_COLUMNS, row))
+                day = r["created_at"].strftime("%Y-%m-%d")
+                r["created_at"] = _iso(r["created_at"])
+                by_day.setdefault(day, []).append(r)
+            self.root.mkdir(parents=True, exist_ok=True)
+            for day, rows in by_day.items():
+                self._append_segment(manifest, day, rows)
+            # segments are synced before the manifest points at them, and the
+            # manifest is saved before the rows are deleted
+            manifest["last_batch"] = [result[0][0], result[-1][0], _iso(before)]
+            self._save_manifest(manifest)
+            self._delete_batch(engine, manifest["last_batch"])
+            moved += len(result)
+            if len(result) < chunk:
+                return moved
+
+    # -- reading -------------------------------------------------------
+    def query(
+        self,
+        *,
+        before_id: Optional[int] = None,
+        actor_user_id: Optional[int] = None,
+        action: Optional[str] = None,
+        target_type: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        limit: int = 100,
+    ) -> list[dict[str, Any]]:
+        """Archived rows matching the filters, newest first (``id < before_id``)."""
+        since_s = _iso(since) if since is not None else None
+        until_s = _iso(until) if until is not None else None
+        out: list[dict[str, Any]] = []
+        segments = sorted(self.manifest()["segments"].values(), key=lambda s: s["max_ts"], reverse=True)
+        for seg in segments:
+            if since_s is not None and seg["max_ts"] < since_s:
+                break  # all remaining segments are older
+            if until_s is not None and seg["min_ts"] >= until_s:
+                continue
+            if action is not None and action not in seg["actions"]:
+                continue
+            if target_type is not None and target_type not in seg["target_types"]:
+                continue
+            if actor_user_id is not None and actor_user_id not in seg["actors"]:
+                continue
+            for r in self._scan(seg, before_id, since_s, until_s):
+                if (
+                    (actor_user_id is None or r["actor_user_id"] == actor_user_id)
+                    and (action is None or r["action"] == action)
+                    and (target_type is None or r["target_type"] == target_type)
+                ):
+                    out.append(r)
+                    if len(out) >= limit:
+                        return out
+        return out
+
+    def _scan(
+        self, seg: dict[str, Any], before_id: Optional[int], since_s: Optional[str], until_s: Optional[str]
+    ) -> Iterator[dict[str, Any]]:
+        with open(self.root / seg["file"], "rb") as fh:
+            for offset, length, min_id, max_id, min_ts, max_ts in reversed(seg["blocks"]):
+                if before_id is not None and min_id >= before_id:
+                    continue
+                if (since_s is not None and max_ts < since_s) or (until_s is not None and min_ts >= until_s):
+                    continue
+                fh.seek(offset)
+                lines = gzip.decompress(fh.read(length)).decode().splitlines()
+                for line in reversed(lines):
+                    r = json.loads(line)
+                    if before_id is not None and r["id"] >= before_id:
+                        continue
+                    if (since_s is not None and r["created_at"] < since_s) or (
+                        until_s is not None and r["created_at"] >= until_s
+                    ):
+                        continue
+                    yield r
+
+    def stats(self) -> dict[str, Any]:
+        manifest = self.manifest()
+        segments = manifest["segments"].values()
+        return {
+            "segments": len(manifest["segments"]),
+            "rows": sum(s["count"] for s in segments),
+            "bytes": sum(b[1] for s in segments for b in s["blocks"]),
+        }
+
+
+_archive: Optional[AuditArchive] = None
+_archiver: Optional[threading.Thread] = None
+_archiver_stop = threading.Event()
+
+
+def get_audit_archive() -> AuditArchive:
+    global _archive
+    if _archive is None:
+        _archive = AuditArchive(Path(settings.data_dir) / "audit", block_rows=settings.audit_archive_block_rows)
+    return _archive
+
+
+def archive_expired(engine: Engine) -> int:
+    """Archive everything older than the retention window (whole UTC days)."""
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    moved = get_audit_archive().archive(engine, today - timedelta(days=settings.audit_retention_days))
+    if moved:
+        _logger.info("Archived %s audit rows", moved)
+    return moved
+
+
+def start_archiver(engine: Engine) -> None:
+    """Run :func:`archive_expired` now and then every ``audit_archive_interval_seconds``."""
+    global _archiver
+    if settings.audit_retention_days <= 0 or (_archiver is not None and _archiver.is_alive()):
+        return
+
+    def loop() -> None:
+        while not _archiver_stop.is_set():
+            try:
+                archive_expired(engine)
+            except Exception:
+                _logger.exception("Audit archival failed")
+            _archiver_stop.wait(settings.audit_archive_interval_seconds)
+
+    _archiver_stop.clear()
+    _archiver = threading.Thread(target=loop, name="automa-audit-archive", daemon=True)
+    _archiver.start()
+
+
+def stop_archiver() -> None:
+    global _archiver
+    _archiver_stop.set()
+    if _archiver is not None:
+        _archiver.join(timeout=30)
+        _archiver = None
@@ -1,3 +1,5 @@
+import os
+
 from pydantic_settings import BaseSettings
 from pydantic import Field
 
@@ -5,15 +7,125 @@ from pydantic import Field
 class Settings(BaseSettings):
     app_name: str = "Automa"
     sqlite_url: str = Field(default="sqlite:///./automa.db")
+    # "default" keeps driver defaults; "production" enables WAL, tuned pragmas
+    # and a single serialized writer connection plus a pool of read-only ones
+    sqlite_profile: str = Field(default="default")
+    sqlite_busy_timeout_ms: int = Field(default=5000)
+    sqlite_cache_size_kib: int = Field(default=65536)
+    sqlite_mmap_size: int = Field(default=268435456)
+    sqlite_read_pool_size: int = Field(default=4)
     secret_key: str = Field(default="change-this-secret")
     jwt_algorithm: str = Field(default="HS256")
     access_token_expire_minutes: int = Field(default=60)
+    # password hashing: "process" pool (parallel across cores) or "thread" pool;
+    # requests beyond max_pending queued/running operations get 429
+    password_bcrypt_rounds: int = Field(default=12)
+    password_hash_executor: str = Field(default="process")
+    password_hash_workers: int = Field(default_factory=lambda: max(1, min(4, os.cpu_count() or 1)))
+    password_hash_max_pending: int = Field(default=32)
+    # validated token -> user snapshot cache (0 disables)
+    auth_cache_ttl_seconds: float = Field(default=60.0)
+    auth_cache_max_entries: int = Field(default=4096)
+    # rendered list partials, bounded by total body size (0 disables)
+    ui_fragment_cache_bytes: int = Field(default=4 * 1024 * 1024)
     cors_origins: list[str] = Field(default_factory=lambda: ["*"])
 
+    # list endpoints: page size when no limit is given / upper bound for limit
+    api_page_size_default: int = Field(default=100)
+    api_page_size_max: int = Field(default=1000)
+    # POST /api/v1/jobs/batch: items per request
+    api_batch_max_jobs: int = Field(default=1000)
+
+    # job creation: token bucket per user and endpoint name, [tokens per second,
+    # burst], one token per created job; unlisted endpoints are not limited. Buckets are per process unless
+    # rate_limit_shared_url names an SQLite database shared by all workers
+    rate_limit_enabled: bool = Field(default=True)
+    rate_limits: dict[str, tuple[float, float]] = Field(
+        default_factory=lambda: {
+            "create_job": (10.0, 50.0),
+            "create_jobs": (10.0, 1000.0),
+            "create_workflow": (10.0, 1000.0),
+            "create_job_ui": (5.0, 20.0),
+        }
+    )
+    rate_limit_shared_url: str = Field(default="")
+    rate_limit_max_keys: int = Field(default=100_000)
+    # refuse new jobs (429) while this many wait in the executor queue (0 = off)
+    backpressure_max_pending: int = Field(default=10_000)
+
     # bootstrap admin (for MVP)
     admin_email: str = Field(default="admin@example.com")
     admin_password: str = Field(default="admin")
 
+    # job execution engine (0 = no per-key cap)
+    executor_max_workers: int = Field(default=4)
+    executor_max_per_agent: int = Field(default=2)
+    executor_max_per_script: int = Field(default=0)
+    # fair queuing between waiting jobs: weight per priority class, and how long
+    # a job may wait before it jumps ahead of every class (0 = no aging)
+    executor_class_weights: dict[str, float] = Field(default_factory=lambda: {"high": 8.0, "normal": 4.0, "low": 1.0})
+    executor_max_wait_seconds: float = Field(default=300.0)
+
+    # write-behind run history: flush at least this often / at this many pending changes
+    history_flush_interval_seconds: float = Field(default=0.25)
+    history_batch_size: int = Field(default=500)
+
+    # audit log: every state-changing request (also reads with audit_reads) is
+    # queued and written in batches; beyond audit_queue_size events are dropped
+    audit_enabled: bool = Field(default=True)
+    audit_reads: bool = Field(default=False)
+    audit_flush_interval_seconds: float = Field(default=1.0)
+    audit_batch_size: int = Field(default=1000)
+    audit_queue_size: int = Field(default=10000)
+    # rows older than audit_retention_days (0 = keep all in the table) move to
+    # gzip day segments under <data_dir>/audit, checked every interval
+    audit_retention_days: int = Field(default=30)
+    audit_archive_interval_seconds: float = Field(default=3600.0)
+    audit_archive_block_rows: int = Field(default=1000)
+
+    # /ui/stream/jobs: per-connection backlog before a resync / idle keep-alive comment
+    event_stream_queue_size: int = Field(default=256)
+    event_stream_keepalive_seconds: float = Field(default=15.0)
+
+    # sandbox: "local" (subprocess), "docker" or "podman"
+    data_dir: str = Field(default="./data")
+    sandbox_backend: str = Field(default="local")
+    sandbox_python: str = Field(default="")  # local backend; empty = current interpreter
+    sandbox_image: str = Field(default="python:3.13-slim")
+    sandbox_memory: str = Field(default="256m")
+    sandbox_cpus: str = Field(default="1.0")
+    sandbox_network: str = Field(default="none")
+    sandbox_timeout_seconds: int = Field(default=3600)  # 0 = no timeout
+    # run logs: a line index entry every N lines (0 = no index); follow=true
+    # polls for new output and gives up after max_idle seconds without any
+    log_index_interval: int = Field(default=1000)
+    log_follow_poll_seconds: float = Field(default=0.5)
+    log_follow_max_idle_seconds: float = Field(default=600.0)
+    # warm sandbox pool (0 = disabled, every run starts a fresh sandbox)
+    sandbox_pool_size: int = Field(default=0)
+    sandbox_pool_max: int = Field(default=8)
+    sandbox_pool_idle_ttl_seconds: float = Field(default=300.0)
+    sandbox_pool_max_uses: int = Field(default=50)
+
+    # files a run writes to $AUTOMA_OUTPUT_DIR become job artifacts, stored once
+    # per content hash under <data_dir>/artifacts; limits are per run
+    artifacts_enabled: bool = Field(default=True)
+    artifact_max_files: int = Field(default=100)
+    artifact_max_bytes: int = Field(default=1024**3)
+
+    # GET /metrics in the Prometheus text format: request latency, job queue and
+    # run timings, database statement counts and connection pool usage
+    metrics_enabled: bool = Field(default=True)
+    # request profiling (Server-Timing breakdown of sampled requests under the
+    # path prefixes, all when empty) and the slow-query log; both start off and
+    # admins switch them at runtime through /api/v1/debug/profiling
+    profile_requests: bool = Field(default=False)
+    profile_sample_rate: float = Field(default=1.0)
+    profile_paths: list[str] = Field(default_factory=list)
+    slow_query_log: bool = Field(default=False)
+    slow_query_threshold_ms: float = Field(default=200.0)
+    profile_history_size: int = Field(default=100)
+
     class Config:
         env_prefix = "AUTOMA_"
 
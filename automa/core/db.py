@@ -1,9 +1,112 @@
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 from .config import settings
+from .metrics import instrument_engine
 
 
-engine = create_engine(settings.sqlite_url, echo=False)
+def _is_file_sqlite(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+
+def _async_url(url: str) -> str:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.get_driver_name() == "pysqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+def _create_engines(url: str, profile: str, factory=create_engine):
+    """
+    Build the (writer, reader) engine pair; ``factory`` is ``create_engine``
+    or ``create_async_engine``.
+
+    The "production" profile only applies to file-backed SQLite: the writer
+    is a single connection that callers queue for (SQLite allows one writer
+    anyway, so this turns "database is locked" into an orderly wait) and
+    takes the write lock up front with BEGIN IMMEDIATE; readers are a pool
+    of query_only connections that WAL lets run alongside the writer.
+    In every other case both names refer to the same engine.
+    """
+    if profile != "production" or not _is_file_sqlite(url):
+        writer = factory(url, echo=False)
+        return writer, writer
+
+    connect_args = {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout_ms / 1000}
+    writer = factory(url, echo=False, connect_args=connect_args, pool_size=1, max_overflow=0, pool_timeout=60)
+    reader = factory(
+        url,
+        echo=False,
+        connect_args=connect_args,
+        pool_size=settings.sqlite_read_pool_size,
+        max_overflow=0,
+        pool_timeout=60,
+    )
+
+    def pragmas(dbapi_conn, readonly: bool) -> None:
+        cur = dbapi_conn.cursor()
+        if not readonly:
+            cur.execute("PRAGMA journal_mode=WAL")  # persistent, stored in the file
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+        cur.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+        cur.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+        cur.execute("PRAGMA temp_store=MEMORY")
+        cur.execute("PRAGMA foreign_keys=ON")
+        if readonly:
+            cur.execute("PRAGMA query_only=ON")
+        cur.close()
+
+    # async engines dispatch their events through the wrapped sync engine
+    sync_writer = getattr(writer, "sync_engine", writer)
+    sync_reader = getattr(reader, "sync_engine", reader)
+
+    @event.listens_for(sync_writer, "connect")
+    def _writer_connect(dbapi_conn, _record):
+        # let SQLAlchemy emit BEGIN itself (see "begin" below)
+        dbapi_conn.isolation_level = None
+        pragmas(dbapi_conn, readonly=False)
+
+    @event.listens_for(sync_writer, "begin")
+    def _writer_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    @event.listens_for(sync_reader, "connect")
+    def _reader_connect(dbapi_conn, _record):
+        pragmas(dbapi_conn, readonly=True)
+
+    return writer, reader
+
+
+# Sync engines serve the scheduler, the run history writer and scripts; the
+# request path uses the async pair (aiosqlite). Both pairs point at the same
+# database file, the busy timeout arbitrates between their writers.
+engine, reader_engine = _create_engines(settings.sqlite_url, settings.sqlite_profile)
+async_engine, async_reader_engine = _create_engines(
+    _async_url(settings.sqlite_url), settings.sqlite_profile, create_async_engine
+)
+
+
+def sync_engines() -> dict[str, Engine]:
+    """The distinct engines by pool name, async ones as the sync engine that
+    dispatches their events; a reader shared with the writer is left out."""
+    engines = {"writer": engine, "async_writer": async_engine.sync_engine}
+    if reader_engine is not engine:
+        engines["reader"] = reader_engine
+    if async_reader_engine is not async_engine:
+        engines["async_reader"] = async_reader_engine.sync_engine
+    return engines
+
+
+if settings.metrics_enabled:
+    # statement counts and pool usage for /metrics
+    for _pool, _engine in sync_engines().items():
+        instrument_engine(_engine, _pool)
 
 
 def _ensure_sqlite_schema() -> None:
@@ -35,6 +138,10 @@ def _ensure_sqlite_schema() -> None:
                 if column not in existing:
                     conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {ddl}")
 
+        def ensure_index(name: str, table: str, columns: str) -> None:
+            # create_all skips indexes of tables that already exist
+            conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
         ensure_columns(
             "user",
             {
@@ -51,8 +158,18 @@ def _ensure_sqlite_schema() -> None:
                 "last_run_at": "last_run_at TIMESTAMP",
                 "last_exit_code": "last_exit_code INTEGER",
                 "last_error": "last_error TEXT",
+                "next_run_at": "next_run_at TIMESTAMP",
+                "workflow_id": "workflow_id INTEGER REFERENCES workflow(id)",
+                "priority": "priority VARCHAR NOT NULL DEFAULT 'normal'",
+                "owner_id": "owner_id INTEGER REFERENCES user(id)",
             },
         )
+        ensure_index("ix_job_status_next_run_at", "job", "status, next_run_at")
+        ensure_index("ix_job_status_id", "job", "status, id")
+        ensure_index("ix_job_script_id_id", "job", "script_id, id")
+        ensure_index("ix_job_agent_id_id", "job", "agent_id, id")
+        ensure_index("ix_job_last_run_at_id", "job", "last_run_at, id")
+        ensure_index("ix_job_workflow_id", "job", "workflow_id")
 
 
 def init_db() -> None:
@@ -63,6 +180,34 @@ def init_db() -> None:
 
 
 @contextmanager
-def get_session():
-    with Session(engine) as session:
+def get_session(readonly: bool = False):
+    """Session on the writer engine, or on the read-only pool when ``readonly``."""
+    with Session(reader_engine if readonly else engine) as session:
+        yield session
+
+
+@asynccontextmanager
+async def get_async_session(readonly: bool = False) -> AsyncIterator[AsyncSession]:
+    """
+    Async counterpart of :func:`get_session` for the request path. Objects
+    stay loaded after commit, since lazy reloads are not possible in async code.
+    """
+    bind: AsyncEngine = async_reader_engine if readonly else async_engine
+    async with AsyncSession(bind, expire_on_commit=False) as session:
         yield session
+
+
+async def release_connection(session: AsyncSession) -> None:
+    """
+    End the session's read transaction so its connection goes back to the
+    pool, e.g. before awaiting slow non-database work. No-op when there are
+    unflushed changes.
+    """
+    if not (session.new or session.dirty or session.deleted):
+        await session.commit()
+
+
+async def dispose_async_engines() -> None:
+    await async_engine.dispose()
+    if async_reader_engine is not async_engine:
+        await async_reader_engine.dispose()
@@ -0,0 +1,138 @@
+"""In-process fan-out of job state changes to dashboard streams.
+
+``execute_job`` (on executor threads), the timer and the job routes publish
+small deltas (``{"id": 7, "status": "running"}``) with :func:`publish_job`.
+Every open ``/ui/stream/jobs`` connection holds a :class:`Subscription`: a
+bounded ``asyncio.Queue`` on its event loop, fed with
+``call_soon_threadsafe``. An idle subscriber is just a coroutine waiting on
+its queue, so open dashboards cost nothing until something changes.
+
+A subscriber that falls ``queue_size`` events behind stops receiving deltas
+and is told to resync (re-fetch the full list) instead of blocking the
+publisher.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Optional
+import asyncio
+import threading
+
+from .config import settings
+
+
+# end of stream (bus shutdown) / the subscriber missed events and must re-fetch
+CLOSED: dict[str, Any] = {"type": "closed"}
+RESYNC: dict[str, Any] = {"type": "resync"}
+
+
+def _jsonable(value: Any) -> Any:
+    if isinstance(value, datetime):
+        # same shape as the naive-UTC timestamps read back from the DB
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat(sep=" ")
+    return value
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", loop: asyncio.AbstractEventLoop, maxsize: int) -> None:
+        self._bus = bus
+        self._loop = loop
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def _deliver(self, event: dict[str, Any]) -> None:
+        # runs on the subscriber's loop
+        if not self.overflowed:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except asyncio.QueueFull:
+                # the queued deltas are moot once the client has to re-fetch
+                self.overflowed = True
+                while not self._queue.empty():
+                    self._queue.get_nowait()
+        self._bus._count("dropped")
+        if event is CLOSED:
+            self._queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[dict[str, Any]]:
+        """Next event, :data:`RESYNC` after an overflow, :data:`CLOSED` at shutdown, None on timeout."""
+        if self.overflowed and self._queue.empty():
+            self.overflowed = False
+            return RESYNC
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, queue_size: int = 256) -> None:
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: set[Subscription] = set()
+        self._stats = {"published": 0, "dropped": 0}
+
+    def subscribe(self) -> Subscription:
+        """Register a subscriber on the running event loop."""
+        sub = Subscription(self, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish(self, event: dict[str, Any]) -> None:
+        """Deliver ``event`` to every subscriber; safe to call from any thread."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._stats["published"] += 1
+        for sub in subscribers:
+            try:
+                sub._loop.call_soon_threadsafe(sub._deliver, event)
+            except RuntimeError:  # loop closed under us
+                self.unsubscribe(sub)
+
+    def close(self) -> None:
+        """End every open stream (app shutdown)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for sub in subscribers:
+            try:
+                sub._loop.call_soon_threadsafe(sub._deliver, CLOSED)
+            except RuntimeError:
+                pass
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "subscribers": len(self._subscribers)}
+
+
+_bus: Optional[EventBus] = None
+
+
+def get_event_bus() -> EventBus:
+    global _bus
+    if _bus is None:
+        _bus = EventBus(queue_size=settings.event_stream_queue_size)
+    return _bus
+
+
+def publish_job(job_id: int, **fields: Any) -> None:
+    """Publish a job delta: its id plus the columns that changed."""
+    if _bus is None or not _bus._subscribers:
+        return  # nobody listening
+    event = {"type": "job", "id": job_id}
+    event.update((k, _jsonable(v)) for k, v in fields.items())
+    _bus.publish(event)
@@ -0,0 +1,88 @@
+"""Cache of rendered HTML fragments.
+
+The list partials used to query and render their whole table on every hit.
+A fragment is now cached per slot (template name + viewer bucket) together
+with the table version (:mod:`automa.core.versions`) it was rendered at; a
+lookup at any other version misses, and the next render replaces the stale
+body in place. Entries are evicted least recently used first once the
+cached bodies exceed ``max_bytes``.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, Optional
+import threading
+
+from .config import settings
+
+
+class FragmentCache:
+    def __init__(self, max_bytes: int = 4 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # slot -> (version, body)
+        self._entries: OrderedDict[Hashable, tuple[int, bytes]] = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get(self, slot: Hashable, version: int) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(slot)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(slot)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, slot: Hashable, version: int, body: bytes) -> None:
+        if not self.enabled or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.get(slot)
+            if old is not None:
+                if old[0] > version:
+                    return  # a newer render got there first
+                self.bytes -= len(old[1])
+            self._entries[slot] = (version, body)
+            self._entries.move_to_end(slot)
+            self.bytes += len(body)
+            while self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+            }
+
+
+_cache: Optional[FragmentCache] = None
+
+
+def get_fragment_cache() -> FragmentCache:
+    global _cache
+    if _cache is None:
+        _cache = FragmentCache(max_bytes=settings.ui_fragment_cache_bytes)
+    return _cache
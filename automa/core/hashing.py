@@ -0,0 +1,166 @@
+"""Password hashing off the request path.
+
+bcrypt costs tens to hundreds of milliseconds of CPU per call. Request
+handlers submit hashing and verification to a dedicated, size-bounded
+executor (a process pool by default, so several hashes run in parallel on
+different cores) and await the result, which leaves the server's threadpool
+and event loop free for other requests.
+
+Admission control: at most ``password_hash_max_pending`` operations may be
+queued or running at once. Beyond that :class:`HasherBusy` is raised, which
+the app turns into ``429 Too Many Requests`` with a ``Retry-After`` estimate.
+
+Verification also reports when a stored hash was made with a different cost
+than the configured ``password_bcrypt_rounds``, so callers can store the
+returned new hash (transparent rehash on login).
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+import asyncio
+import math
+import multiprocessing
+import threading
+import time
+
+from passlib.context import CryptContext
+
+from .config import settings
+from .profiling import span
+
+
+def build_pwd_context(rounds: int | None = None) -> CryptContext:
+    # Try bcrypt first; fall back to pbkdf2_sha256 if unavailable
+    rounds = rounds or settings.password_bcrypt_rounds
+    try:
+        import bcrypt  # noqa: F401
+        # min == max == rounds makes hashes of any other cost "need update"
+        return CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+    except Exception:
+        return CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
+
+# -- worker side (must be picklable module-level functions) -------------
+_worker_contexts: dict[int, CryptContext] = {}
+
+
+def _context(rounds: int) -> CryptContext:
+    ctx = _worker_contexts.get(rounds)
+    if ctx is None:
+        ctx = _worker_contexts[rounds] = build_pwd_context(rounds)
+    return ctx
+
+
+def _hash(password: str, rounds: int) -> str:
+    return _context(rounds).hash(password)
+
+
+def _verify_and_update(password: str, hashed: str, rounds: int) -> tuple[bool, Optional[str]]:
+    try:
+        return _context(rounds).verify_and_update(password, hashed)
+    except ValueError:
+        # malformed / unknown hash format
+        return False, None
+
+
+# -- request side -------------------------------------------------------
+class HasherBusy(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__("Password hashing capacity exhausted")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    def __init__(self, kind: str = "process", max_workers: int = 2, max_pending: int = 16) -> None:
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._avg_seconds = 0.25  # EWMA of one operation, seeds Retry-After
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                # spawn: the server process has threads, which fork does not copy safely
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="automa-hash")
+        return self._executor
+
+    def retry_after(self) -> int:
+        waves = (self._in_flight + 1) / max(1, self.max_workers)
+        return max(1, math.ceil(waves * self._avg_seconds))
+
+    async def _submit(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.max_pending:
+                self.rejected += 1
+                raise HasherBusy(self.retry_after())
+            self._in_flight += 1
+            executor = self._get_executor()
+        started = time.perf_counter()
+        try:
+            with span("hash"):  # includes the wait for a free worker
+                return await asyncio.wrap_future(executor.submit(fn, *args))
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._in_flight -= 1
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password, settings.password_bcrypt_rounds)
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, Optional[str]]:
+        """Returns ``(valid, new_hash)``; ``new_hash`` is set when the cost changed."""
+        return await self._submit(_verify_and_update, password, hashed, settings.password_bcrypt_rounds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "max_pending": self.max_pending,
+                "rejected": self.rejected,
+                "avg_seconds": round(self._avg_seconds, 4),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher: Optional[PasswordHasher] = None
+
+
+def get_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher(
+            kind=settings.password_hash_executor,
+            max_workers=settings.password_hash_workers,
+            max_pending=settings.password_hash_max_pending,
+        )
+    return _hasher
+
+
+def shutdown_hasher() -> None:
+    global _hasher
+    if _hasher is not None:
+        _hasher.shutdown()
+        _hasher = None
@@ -0,0 +1,310 @@
+"""In-process metrics in the Prometheus text format.
+
+Counters and histograms keep one value array per thread: a thread only
+ever writes its own array, so recording is a couple of list updates
+without a lock, and a scrape sums the arrays. Gauges are callbacks
+evaluated at scrape time (queue depths, pool usage), so keeping them costs
+nothing at all.
+
+Metrics are module-level objects registered on creation; :func:`render`
+produces the exposition served at ``/metrics``.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Iterable, Union
+import math
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+_registry: list["_Metric"] = []
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+RUN_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0)
+LAG_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Shards:
+    """Per-thread value arrays; writers never share one, readers sum them."""
+
+    def __init__(self, size: int) -> None:
+        self._size = size
+        self._local = threading.local()
+        self._arrays: list[list[float]] = []
+        self._lock = threading.Lock()  # only taken by a thread's first write and by reads
+
+    def local(self) -> list[float]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = [0] * self._size
+            with self._lock:
+                self._arrays.append(values)
+            return values
+
+    def totals(self) -> list[float]:
+        with self._lock:
+            arrays = list(self._arrays)
+        return [sum(column) for column in zip(*arrays)] if arrays else [0] * self._size
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _registry.append(self)
+
+    def samples(self) -> list[str]:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines += self.samples()
+        return "\n".join(lines)
+
+
+class _Family(_Metric):
+    """A metric with one child per combination of label values."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._children: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+        # unlabelled metrics are exported as zero before the first observation
+        self._default = self.labels() if not self.labelnames else None
+
+    def labels(self, *values) -> object:
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def _child(self) -> object:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def _items(self) -> list[tuple[tuple, object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+
+class _CounterChild:
+    __slots__ = ("_shards",)
+
+    def __init__(self) -> None:
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.local()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self._default.inc(amount)
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}_total{_labels(self.labelnames, values)} {_number(child.value)}"
+            for values, child in self._items()
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_shards")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self._bounds = bounds
+        self._shards = _Shards(len(bounds) + 2)  # buckets, +Inf, sum
+
+    def observe(self, value: float) -> None:
+        values = self._shards.local()
+        values[bisect_left(self._bounds, value)] += 1
+        values[-1] += value
+
+    def totals(self) -> tuple[list[float], float]:
+        totals = self._shards.totals()
+        return totals[:-1], totals[-1]
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: tuple = LATENCY_BUCKETS
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def samples(self) -> list[str]:
+        lines = []
+        for values, child in self._items():
+            counts, total = child.totals()
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, values, le)} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, values)} {_number(cumulative)}")
+        return lines
+
+
+GaugeValue = Union[float, dict[tuple, float]]
+
+
+class Gauge(_Metric):
+    """Read at scrape time from ``collect``: a number, or ``{label values: number}``."""
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, documentation: str, collect: Callable[[], GaugeValue], labelnames: Iterable[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self) -> list[str]:
+        value = self.collect()
+        if not isinstance(value, dict):
+            value = {(): value}
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in sorted(value.items())]
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# -- application metrics ---------------------------------------------------
+HTTP_REQUEST_DURATION = Histogram(
+    "automa_http_request_duration_seconds",
+    "Time until the response starts, by route template",
+    ("method", "route", "status"),
+)
+JOB_START_LAG = Histogram(
+    "automa_job_start_lag_seconds",
+    "Delay between a job's scheduled time and the start of its run",
+    buckets=LAG_BUCKETS,
+)
+JOB_RUN_DURATION = Histogram(
+    "automa_job_run_duration_seconds", "Run time of sandboxed scripts", ("status",), buckets=RUN_BUCKETS
+)
+DB_QUERIES = Counter("automa_db_queries", "Statements executed, by pool and statement type", ("pool", "statement"))
+DB_CONNECTION_WAIT = Histogram(
+    "automa_db_connection_wait_seconds", "Time spent acquiring a connection from the pool", ("pool",)
+)
+DB_CONNECTION_HOLD = Histogram(
+    "automa_db_connection_hold_seconds", "Time connections stay checked out of the pool", ("pool",)
+)
+
+_pools: dict[str, Engine] = {}
+_STATEMENTS = frozenset({"SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA"})
+_MAX_STATEMENTS = 4096
+
+
+def _statement_type(statement: str) -> str:
+    words = statement[:16].split(None, 1)
+    verb = words[0].upper() if words else ""
+    return verb if verb in _STATEMENTS else "OTHER"
+
+
+def instrument_engine(engine: Engine, pool: str) -> None:
+    """Count the statements ``engine`` executes and time its connection checkouts.
+
+    A checkout is timed twice: the wait to get the connection out of the
+    pool (``raw_connection`` is wrapped, since the pool has no event before
+    a checkout; async engines wait inside it too), and how long it stays
+    out, from the ``checkout`` to the ``checkin`` event.
+
+    Only ``after_cursor_execute`` is hooked per statement: any statement
+    hook puts SQLAlchemy on its slower event path (a few µs per statement),
+    and timing each statement would take a second one.
+    """
+    if pool in _pools:
+        return
+    _pools[pool] = engine
+    # statement text -> counter; compiled statements are cached strings, so this stays small
+    counters: dict[str, _CounterChild] = {}
+    wait = DB_CONNECTION_WAIT.labels(pool)
+    hold = DB_CONNECTION_HOLD.labels(pool)
+    raw_connection = engine.raw_connection
+
+    def _acquire():
+        started = time.perf_counter()
+        connection = raw_connection()
+        wait.observe(time.perf_counter() - started)
+        return connection
+
+    engine.raw_connection = _acquire
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        child = counters.get(statement)
+        if child is None:
+            child = DB_QUERIES.labels(pool, _statement_type(statement))
+            if len(counters) < _MAX_STATEMENTS:
+                counters[statement] = child
+        child.inc()
+
+    @event.listens_for(engine, "checkout")
+    def _checkout(dbapi_conn, record, proxy):
+        record.info["automa_checked_out"] = time.perf_counter()
+
+    @event.listens_for(engine, "checkin")
+    def _checkin(dbapi_conn, record):
+        started = record.info.pop("automa_checked_out", None)
+        if started is not None:
+            hold.observe(time.perf_counter() - started)
+
+
+def _pool_usage() -> dict[tuple, float]:
+    usage = {}
+    for name, engine in _pools.items():
+        checkedout = getattr(engine.pool, "checkedout", None)
+        if checkedout is not None:
+            usage[(name,)] = checkedout()
+    return usage
+
+
+Gauge("automa_db_pool_checked_out", "Connections currently checked out", _pool_usage, ("pool",))
+
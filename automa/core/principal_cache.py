@@ -0,0 +1,128 @@
+"""Cache of authenticated principals.
+
+Every authenticated request used to decode the JWT and load the user by
+email. The cache maps a validated token to a snapshot of the user's columns
+so repeat requests with the same token (an HTMX page load fires several)
+skip both. Entries expire after ``ttl`` seconds or at the token's own
+``exp``, whichever is sooner; the least recently used entries are dropped
+beyond ``max_entries``.
+
+Snapshots are rebuilt as detached ``User`` objects on every hit. Routes that
+modify the user must load the persistent row from their session and call
+:func:`invalidate_user` after committing.
+"""
+
+from collections import OrderedDict
+from typing import Any, Optional
+import threading
+import time
+
+from .config import settings
+from ..domain.models import User
+
+
+class PrincipalCache:
+    def __init__(self, max_entries: int = 4096, ttl: float = 60.0) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # token -> (expires_at, user_id, column snapshot)
+        self._entries: OrderedDict[str, tuple[float, int, dict[str, Any]]] = OrderedDict()
+        self._by_user: dict[int, set[str]] = {}
+        # bumped by every invalidation; a lookup that raced one is not cached
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, token: str) -> Optional[User]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user_id, snapshot = entry
+            if expires_at <= now:
+                self._drop(token, user_id)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+        return User(**snapshot)
+
+    def put(self, token: str, user: User, token_exp: float | None = None, epoch: int | None = None) -> None:
+        """
+        Remember ``user`` for ``token``; ``token_exp`` is the JWT ``exp``
+        (epoch seconds) and ``epoch`` the value of :attr:`epoch` read before
+        the user was loaded.
+        """
+        if not self.enabled or user.id is None:
+            return
+        lifetime = self.ttl
+        if token_exp is not None:
+            lifetime = min(lifetime, token_exp - time.time())
+        if lifetime <= 0:
+            return
+        snapshot = user.model_dump()
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return
+            old = self._entries.pop(token, None)
+            if old is not None:
+                self._drop_index(token, old[1])
+            self._entries[token] = (time.monotonic() + lifetime, user.id, snapshot)
+            self._by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                evicted, (_, evicted_user, _) = self._entries.popitem(last=False)
+                self._drop_index(evicted, evicted_user)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self.epoch += 1
+            for token in self._by_user.pop(user_id, ()):
+                self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.epoch += 1
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _drop(self, token: str, user_id: int) -> None:
+        self._entries.pop(token, None)
+        self._drop_index(token, user_id)
+
+    def _drop_index(self, token: str, user_id: int) -> None:
+        tokens = self._by_user.get(user_id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._by_user[user_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_cache: Optional[PrincipalCache] = None
+
+
+def get_principal_cache() -> PrincipalCache:
+    global _cache
+    if _cache is None:
+        _cache = PrincipalCache(
+            max_entries=settings.auth_cache_max_entries,
+            ttl=settings.auth_cache_ttl_seconds,
+        )
+    return _cache
+
+
+def invalidate_user(user_id: int | None) -> None:
+    if user_id is not None:
+        get_principal_cache().invalidate_user(user_id)
@@ -0,0 +1,258 @@
+"""Opt-in request profiling and slow-query log.
+
+Both are off by default and switched at runtime (``PATCH
+/api/v1/debug/profiling``), without a restart:
+
+* Request profiling: a sampled request gets a :class:`RequestProfile` in a
+  context variable, and the code paths that usually explain a slow endpoint
+  add their time to it with :func:`span` - JWT decoding (``jwt``), password
+  hashing (``hash``), template rendering (``render``) and SQL statements
+  (``db``). The breakdown goes out as a ``Server-Timing`` header and is kept
+  in a short history.
+* Slow-query log: statements slower than the threshold are logged with
+  their parameter shape (types, never values), duration and the route that
+  issued them (or the thread, for the scheduler and writers).
+
+While both are off, the middleware passes requests straight through, the
+cursor hooks are removed from the engines and :func:`span` is one context
+variable lookup.
+"""
+
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+import logging
+import random
+import threading
+import time
+
+import jinja2
+from sqlalchemy import event
+
+from .config import settings
+
+
+_logger = logging.getLogger(__name__)
+_slow_logger = logging.getLogger("automa.slow_query")
+
+_MAX_STATEMENT = 2000
+_NOOP = nullcontext()
+
+
+class RequestProfile:
+    __slots__ = ("scope", "started", "sampled", "spans", "token")
+
+    def __init__(self, scope: dict, sampled: bool) -> None:
+        self.scope = scope
+        self.started = time.perf_counter()
+        self.sampled = sampled
+        self.spans: dict[str, list[float]] = {}  # name -> [seconds, count]
+        self.token = None
+
+    def add(self, name: str, seconds: float) -> None:
+        entry = self.spans.get(name)
+        if entry is None:
+            self.spans[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    @property
+    def route(self) -> str:
+        route = self.scope.get("route")
+        return f"{self.scope['method']} {getattr(route, 'path', None) or self.scope['path']}"
+
+    def server_timing(self) -> str:
+        parts = [
+            f'{name};dur={seconds * 1000:.2f};desc="{count:.0f}x"' for name, (seconds, count) in self.spans.items()
+        ]
+        parts.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("automa_request_profile", default=None)
+
+
+@contextmanager
+def _timed(profile: RequestProfile, name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - started)
+
+
+def span(name: str):
+    """Time a block into the current request's profile; a no-op outside profiled requests."""
+    profile = _current.get()
+    if profile is None or not profile.sampled:
+        return _NOOP
+    return _timed(profile, name)
+
+
+class ProfiledTemplate(jinja2.Template):
+    """Jinja template class that reports rendering as the ``render`` span."""
+
+    def render(self, *args: Any, **kwargs: Any) -> str:
+        with span("render"):
+            return super().render(*args, **kwargs)
+
+
+def _parameter_shape(parameters: Any, executemany: bool) -> Any:
+    if executemany and isinstance(parameters, (list, tuple)):
+        first = _parameter_shape(parameters[0], False) if parameters else None
+        return {"rows": len(parameters), "row": first}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class Profiler:
+    """Runtime switches plus the recent request profiles and slow queries."""
+
+    def __init__(
+        self,
+        requests: bool = False,
+        sample_rate: float = 1.0,
+        paths: Optional[list[str]] = None,
+        slow_queries: bool = False,
+        slow_query_ms: float = 200.0,
+        history: int = 100,
+    ) -> None:
+        self.requests = False
+        self.sample_rate = sample_rate
+        self.paths = list(paths or [])
+        self.slow_queries = False
+        self.slow_query_ms = slow_query_ms
+        self.active = False  # read on every request: the only cost while everything is off
+        self.profiles: deque[dict] = deque(maxlen=history)
+        self.queries: deque[dict] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._hooked: list = []
+        self.configure(requests=requests, slow_queries=slow_queries)
+
+    def configure(self, **changes: Any) -> dict:
+        """Apply the given settings (see :meth:`config` for the names)."""
+        with self._lock:
+            for name, value in changes.items():
+                if name not in ("requests", "sample_rate", "paths", "slow_queries", "slow_query_ms"):
+                    raise ValueError(f"Unknown profiling setting {name!r}")
+                if value is not None:
+                    setattr(self, name, list(value) if name == "paths" else value)
+            active = self.requests or self.slow_queries
+            if active and not self._hooked:
+                self._hook()
+            elif not active and self._hooked:
+                self._unhook()
+            self.active = active
+            return self.config()
+
+    def config(self) -> dict:
+        return {
+            "requests": self.requests,
+            "sample_rate": self.sample_rate,
+            "paths": self.paths,
+            "slow_queries": self.slow_queries,
+            "slow_query_ms": self.slow_query_ms,
+        }
+
+    # -- requests ------------------------------------------------------------
+    def start(self, scope: dict) -> RequestProfile:
+        """Make a profile current for the request; only sampled ones collect spans,
+        the others just tell the slow-query log which route is running."""
+        sampled = (
+            self.requests
+            and (not self.paths or scope["path"].startswith(tuple(self.paths)))
+            and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+        )
+        profile = RequestProfile(scope, sampled)
+        profile.token = _current.set(profile)
+        return profile
+
+    def finish(self, profile: RequestProfile, status: int) -> None:
+        _current.reset(profile.token)
+        if not profile.sampled:
+            return
+        elapsed = time.perf_counter() - profile.started
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "route": profile.route,
+            "path": profile.scope["path"],
+            "status": status,
+            "total_ms": round(elapsed * 1000, 2),
+            "spans": {
+                name: {"ms": round(seconds * 1000, 2), "count": int(count)}
+                for name, (seconds, count) in profile.spans.items()
+            },
+        }
+        self.profiles.append(entry)
+        _logger.info("Profiled %s: %s", entry["route"], entry)
+
+    # -- SQL -----------------------------------------------------------------
+    def _hook(self) -> None:
+        from .db import sync_engines  # not at import time: hashing workers import this module
+
+        for engine in sync_engines().values():
+            event.listen(engine, "before_cursor_execute", self._before)
+            event.listen(engine, "after_cursor_execute", self._after)
+            self._hooked.append(engine)
+
+    def _unhook(self) -> None:
+        for engine in self._hooked:
+            event.remove(engine, "before_cursor_execute", self._before)
+            event.remove(engine, "after_cursor_execute", self._after)
+        self._hooked.clear()
+
+    @staticmethod
+    def _before(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info["automa_query_started"] = time.perf_counter()
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.pop("automa_query_started", None)
+        if started is None:
+            return  # hooked while this statement was running
+        elapsed = time.perf_counter() - started
+        profile = _current.get()
+        if profile is not None and profile.sampled:
+            profile.add("db", elapsed)
+        if self.slow_queries and elapsed * 1000 >= self.slow_query_ms:
+            self._slow_query(statement, parameters, executemany, elapsed, profile)
+
+    def _slow_query(self, statement: str, parameters: Any, executemany: bool, elapsed: float, profile) -> None:
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(elapsed * 1000, 2),
+            "statement": statement[:_MAX_STATEMENT],
+            "parameters": _parameter_shape(parameters, executemany),
+            "route": profile.route if profile is not None else None,
+            "thread": threading.current_thread().name,
+        }
+        self.queries.append(entry)
+        _slow_logger.warning(
+            "Slow query %.1f ms from %s: %s %s",
+            entry["duration_ms"],
+            entry["route"] or entry["thread"],
+            entry["statement"],
+            entry["parameters"],
+        )
+
+
+_profiler: Optional[Profiler] = None
+
+
+def get_profiler() -> Profiler:
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(
+            requests=settings.profile_requests,
+            sample_rate=settings.profile_sample_rate,
+            paths=settings.profile_paths,
+            slow_queries=settings.slow_query_log,
+            slow_query_ms=settings.slow_query_threshold_ms,
+            history=settings.profile_history_size,
+        )
+    return _profiler
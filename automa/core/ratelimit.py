@@ -0,0 +1,174 @@
+"""Per-user token buckets for endpoints that create work.
+
+Every ``(endpoint, user)`` pair owns a bucket of up to ``burst`` tokens that
+refills at ``rate`` tokens per second; a request spends one token per job
+it creates or is refused with the number of seconds until enough are
+available (a request never needs more than ``burst``). Limits
+are configured per endpoint name in ``settings.rate_limits``; endpoints not
+listed there are not limited.
+
+Buckets live in process memory by default (least recently used ones are
+dropped beyond ``max_keys``; a dropped bucket simply starts full again).
+With ``settings.rate_limit_shared_url`` set to an SQLite URL they are kept
+in that database instead, so every worker process draws from the same
+buckets. Each check there is one ``INSERT ... ON CONFLICT DO UPDATE ...
+WHERE`` statement, which refills and spends atomically.
+
+Refusals are raised as :class:`RateLimited`; the app answers them with
+``429`` and ``Retry-After``.
+"""
+
+from collections import OrderedDict
+from typing import Callable, Optional
+import math
+import threading
+import time
+
+from sqlalchemy import create_engine, event, text
+
+from .config import settings
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float, detail: str = "Rate limit exceeded") -> None:
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class MemoryBuckets:
+    blocking = False
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()  # key -> (tokens, updated)
+
+    def take(self, key: str, rate: float, burst: float, now: float, cost: float = 1) -> float:
+        """Spend ``cost`` tokens; returns 0 or the seconds until they are available."""
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+_SCHEMA = "CREATE TABLE IF NOT EXISTS rate_limit_bucket (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+_TAKE = text(
+    "INSERT INTO rate_limit_bucket (key, tokens, updated) VALUES (:key, :burst - :cost, :now) "
+    "ON CONFLICT(key) DO UPDATE SET "
+    "tokens = min(:burst, tokens + max(0, :now - updated) * :rate) - :cost, updated = :now "
+    "WHERE min(:burst, tokens + max(0, :now - updated) * :rate) >= :cost "
+    "RETURNING tokens"
+)
+
+
+class SqliteBuckets:
+    """Buckets shared through an SQLite database (wall-clock timestamps)."""
+
+    blocking = True
+    prune_every = 1000
+
+    def __init__(self, url: str) -> None:
+        self._engine = create_engine(url, connect_args={"check_same_thread": False, "timeout": 5})
+        # losing the last few refills in a crash is harmless: skip the fsyncs
+        event.listen(self._engine, "connect", lambda conn, _: conn.execute("PRAGMA synchronous=OFF"))
+        with self._engine.begin() as conn:
+            conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+            conn.exec_driver_sql(_SCHEMA)
+        self._calls = 0
+        self._horizon = 0.0  # longest time any bucket needs to refill
+
+    def take(self, key: str, rate: float, burst: float, now: float, cost: float = 1) -> float:
+        self._horizon = max(self._horizon, burst / rate)
+        params = {"key": key, "rate": rate, "burst": burst, "now": now, "cost": cost}
+        with self._engine.begin() as conn:
+            if conn.execute(_TAKE, params).first() is not None:
+                wait = 0.0
+            else:
+                tokens, updated = conn.execute(
+                    text("SELECT tokens, updated FROM rate_limit_bucket WHERE key = :key"), {"key": key}
+                ).one()
+                wait = (cost - min(burst, tokens + max(0.0, now - updated) * rate)) / rate
+            self._calls += 1
+            if self._calls % self.prune_every == 0:
+                # a bucket untouched this long is full again, same as a missing row
+                conn.execute(
+                    text("DELETE FROM rate_limit_bucket WHERE updated < :cutoff"), {"cutoff": now - self._horizon}
+                )
+        return wait
+
+    def __len__(self) -> int:
+        with self._engine.connect() as conn:
+            return conn.execute(text("SELECT count(*) FROM rate_limit_bucket")).scalar_one()
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        limits: dict[str, tuple[float, float]],
+        buckets: MemoryBuckets | SqliteBuckets,
+        clock: Optional[Callable[[], float]] = None,
+    ) -> None:
+        self.limits = {name: (float(rate), float(burst)) for name, (rate, burst) in limits.items()}
+        self.buckets = buckets
+        self._clock = clock or (time.time if buckets.blocking else time.monotonic)
+        self.allowed: dict[str, int] = {}
+        self.refused: dict[str, int] = {}
+
+    @property
+    def blocking(self) -> bool:
+        """True if :meth:`check` does I/O and should run off the event loop."""
+        return self.buckets.blocking
+
+    def check(self, endpoint: str, user_id: Optional[int], n: int = 1) -> float:
+        """Spend ``n`` tokens of ``user_id``'s bucket for ``endpoint``;
+        returns 0 if the request may proceed, else the seconds to wait.
+
+        ``n`` is capped at ``burst``: a request larger than the bucket empties
+        it instead of waiting forever.
+        """
+        rate, burst = self.limits.get(endpoint, (0.0, 0.0))
+        if rate <= 0 or burst < 1:
+            return 0.0
+        wait = self.buckets.take(f"{endpoint}:{user_id}", rate, burst, self._clock(), min(float(n), burst))
+        counter = self.refused if wait else self.allowed
+        counter[endpoint] = counter.get(endpoint, 0) + 1
+        return wait
+
+    def stats(self) -> dict:
+        return {
+            "backend": "sqlite" if self.buckets.blocking else "memory",
+            "limits": {name: {"rate": rate, "burst": burst} for name, (rate, burst) in self.limits.items()},
+            "buckets": len(self.buckets),
+            "allowed": dict(self.allowed),
+            "refused": dict(self.refused),
+        }
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                if settings.rate_limit_shared_url:
+                    buckets = SqliteBuckets(settings.rate_limit_shared_url)
+                else:
+                    buckets = MemoryBuckets(settings.rate_limit_max_keys)
+                limits = settings.rate_limits if settings.rate_limit_enabled else {}
+                _limiter = RateLimiter(limits, buckets)
+    return _limiter
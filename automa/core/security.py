@@ -3,32 +3,31 @@ from typing import Optional
 
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from .config import settings
+from .db import release_connection
+from .hashing import build_pwd_context, get_hasher
+from .principal_cache import get_principal_cache, invalidate_user
+from .profiling import span
 from ..domain.models import User
+from ..api.audit import audit_actor
 from ..api.deps import get_db
 
 
 _pwd_context: CryptContext | None = None
 
 
-def _build_pwd_context() -> CryptContext:
-    # Try bcrypt first; fall back to pbkdf2_sha256 if unavailable
-    try:
-        import bcrypt  # noqa: F401
-        return CryptContext(schemes=["bcrypt"], deprecated="auto")
-    except Exception:
-        return CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
-
-
 def get_pwd_context() -> CryptContext:
     global _pwd_context
     if _pwd_context is None:
-        _pwd_context = _build_pwd_context()
+        _pwd_context = build_pwd_context()
     return _pwd_context
+
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token")
 
 
@@ -56,21 +55,80 @@ def authenticate_user(session: Session, email: str, password: str) -> Optional[U
     return user
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_db)) -> User:
+async def hash_password(password: str, session: Optional[AsyncSession] = None) -> str:
+    """
+    Hash on the password hashing pool; raises HasherBusy when saturated.
+    Pass the request's ``session`` to release its connection meanwhile.
+    """
+    if session is not None:
+        await release_connection(session)
+    return await get_hasher().hash(password)
+
+
+async def check_password(session: AsyncSession, user: User, password: str) -> bool:
+    """
+    Verify ``password`` for a persistent ``user`` on the hashing pool. A hash
+    made with a different cost than configured is replaced and committed.
+    """
+    hashed = user.hashed_password
+    # don't hold a pooled connection while waiting for the hash
+    await release_connection(session)
+    ok, new_hash = await get_hasher().verify_and_update(password, hashed)
+    if ok and new_hash:
+        user.hashed_password = new_hash
+        session.add(user)
+        await session.commit()
+        invalidate_user(user.id)
+    return ok
+
+
+async def authenticate_user_async(session: AsyncSession, email: str, password: str) -> Optional[User]:
+    user = (await session.exec(select(User).where(User.email == email))).first()
+    if not user or not user.is_active:
+        return None
+    if not await check_password(session, user, password):
+        return None
+    return user
+
+
+async def user_from_token(token: str, session: AsyncSession) -> Optional[User]:
+    """
+    Resolve a bearer/cookie token to its user, or None if it is invalid.
+
+    Cache hits return a detached snapshot without touching JWT decoding or
+    the database; load the row from the session before modifying it.
+    """
+    cache = get_principal_cache()
+    user = cache.get(token)
+    if user is not None:
+        return user
+    epoch = cache.epoch
+    try:
+        with span("jwt"):
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
+    except JWTError:
+        return None
+    sub: str | None = payload.get("sub")
+    if sub is None:
+        return None
+    user = (await session.exec(select(User).where(User.email == sub))).first()
+    if user is not None:
+        cache.put(token, user, payload.get("exp"), epoch)
+    return user
+
+
+async def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_db),
+) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.jwt_algorithm])
-        sub: str | None = payload.get("sub")
-        if sub is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = session.exec(select(User).where(User.email == sub)).first()
+    user = await user_from_token(token, session)
     if user is None or not user.is_active:
         raise credentials_exception
+    audit_actor(request, user.id)
     return user
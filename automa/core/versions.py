@@ -0,0 +1,55 @@
+"""Per-table data versions for conditional requests.
+
+Every write path bumps the version of the tables it changed *after* its
+commit, so a reader that saw version N can only have seen data at least as
+new as N. List endpoints and partials derive a strong ETag from the
+versions they depend on and answer ``If-None-Match`` with 304 before
+running any query.
+
+Versions live in this process only; the ETag embeds a per-boot token so a
+restart invalidates every outstanding tag. Writes made by another process
+(a second uvicorn worker, a script against the same database) are not
+seen, so run a single worker when relying on ETags.
+"""
+
+import secrets
+import threading
+
+
+class TableVersions:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._versions: dict[str, int] = {}
+        self.boot = secrets.token_hex(4)
+
+    def get(self, table: str) -> int:
+        return self._versions.get(table, 0)
+
+    def bump(self, *tables: str) -> None:
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def etag(self, *tables: str, variant: str = "") -> str:
+        """Strong ETag over the current versions of ``tables``."""
+        parts = [self.boot, *(f"{t}{self.get(t)}" for t in tables)]
+        if variant:
+            parts.append(variant)
+        return '"' + "-".join(parts) + '"'
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._versions)
+
+
+# created eagerly: a second instance would silently lose bumps
+_versions = TableVersions()
+
+
+def get_versions() -> TableVersions:
+    return _versions
+
+
+def bump(*tables: str) -> None:
+    """Record that ``tables`` changed; call after the commit."""
+    get_versions().bump(*tables)
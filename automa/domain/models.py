@@ -1,5 +1,6 @@
 from datetime import datetime
 from typing import Optional
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import SQLModel, Field, Relationship
 
 
@@ -28,14 +29,90 @@ class Script(SQLModel, table=True):
 
 
 class Job(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_job_status_next_run_at", "status", "next_run_at"),
+        # keyset pagination: filter column + the sort key
+        Index("ix_job_status_id", "status", "id"),
+        Index("ix_job_script_id_id", "script_id", "id"),
+        Index("ix_job_agent_id_id", "agent_id", "id"),
+        Index("ix_job_last_run_at_id", "last_run_at", "id"),
+        Index("ix_job_workflow_id", "workflow_id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     agent_id: Optional[int] = Field(default=None, foreign_key="agent.id")
     script_id: Optional[int] = Field(default=None, foreign_key="script.id")
     schedule: Optional[str] = None  # e.g., cron string
     status: str = Field(default="pending")
+    next_run_at: Optional[datetime] = None  # UTC; durable schedule for the timer
     last_run_at: Optional[datetime] = None
     last_exit_code: Optional[int] = None
     last_error: Optional[str] = None
+    workflow_id: Optional[int] = Field(default=None, foreign_key="workflow.id")
+    priority: str = Field(default="normal")  # executor class, see executor_class_weights
+    owner_id: Optional[int] = Field(default=None, foreign_key="user.id")
+
+
+class Workflow(SQLModel, table=True):
+    """A DAG of jobs linked by :class:`JobDependency` edges."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+    status: str = Field(default="running", index=True)  # running | succeeded | failed | cancelled
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+
+class JobDependency(SQLModel, table=True):
+    """``job_id`` waits for ``depends_on_id``; ``policy`` says which outcome lets it run."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    workflow_id: int = Field(foreign_key="workflow.id", index=True)
+    job_id: int = Field(foreign_key="job.id")
+    depends_on_id: int = Field(foreign_key="job.id")
+    policy: str = Field(default="on_success")  # on_success | on_failure | always
+
+
+class JobRun(SQLModel, table=True):
+    """One row per execution of a job; Job.last_* is the denormalized summary."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    run_key: str = Field(index=True, unique=True)
+    job_id: int = Field(foreign_key="job.id", index=True)
+    status: str = Field(default="running")  # running | succeeded | failed
+    started_at: datetime
+    finished_at: Optional[datetime] = None
+    exit_code: Optional[int] = None
+    error: Optional[str] = None
+    stdout_bytes: Optional[int] = None
+    stderr_bytes: Optional[int] = None
+    duration_ms: Optional[int] = None
+    log_path: Optional[str] = None
+
+
+class Blob(SQLModel, table=True):
+    """Content-addressed file in the artifact store; ``refcount`` counts the
+    :class:`Artifact` rows pointing at it."""
+
+    digest: str = Field(primary_key=True)  # sha256 hex
+    size: int
+    refcount: int = Field(default=0)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class Artifact(SQLModel, table=True):
+    """A named output file of a job; a later run's file of the same name replaces it."""
+
+    __table_args__ = (UniqueConstraint("job_id", "name", name="uq_artifact_job_id_name"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    job_id: int = Field(foreign_key="job.id")
+    name: str  # relative path inside the run's output directory
+    digest: str = Field(foreign_key="blob.digest", index=True)
+    size: int
+    content_type: Optional[str] = None
+    run_key: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
 class AuditLog(SQLModel, table=True):
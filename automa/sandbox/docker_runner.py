@@ -1,21 +1,455 @@
-"""Sandbox adapter (Docker/Podman) — MVP stub.
+"""Sandbox adapter for running user scripts.
 
-In production, run user scripts inside a locked-down container, with:
-- read-only FS, working dir bind-mount, no NET (if possible)
-- CPU/memory limits, seccomp/apparmor profile
+Two backends are available, selected by ``settings.sandbox_backend``:
 
-This module exposes a simple interface for the scheduler to call.
+- ``docker`` / ``podman``: run the script in a locked-down throw-away
+  container (read-only FS, script dir mounted read-only, no network by
+  default, all capabilities dropped, CPU/memory/pids limits)
+- ``local``: a plain subprocess with the configured Python interpreter; it
+  needs no daemon, which makes it the backend for development and tests
+
+Both stream stdout/stderr through fixed-size reads into a log sink, so the
+scheduler never holds more than one chunk (plus a short stderr tail) per
+stream in memory regardless of how much a script prints. With an
+``output_dir`` the script finds a writable directory in ``$AUTOMA_OUTPUT_DIR``
+whose files end up in ``output_dir`` on the host (job artifacts).
 """
 
-from typing import Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, Sequence
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from ..core.config import settings
+from .logs import LogSink, NullLogSink
+
+
+_logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 64 * 1024
+_TAIL_SIZE = 2 * 1024
+_DRAIN_TIMEOUT = 5.0  # seconds to wait for the pipes to close once the child is gone
+OUTPUT_ENV = "AUTOMA_OUTPUT_DIR"
+
+
+@dataclass(slots=True)
+class RunResult:
+    exit_code: int
+    stdout_bytes: int = 0
+    stderr_bytes: int = 0
+    duration_seconds: float = 0.0
+    timed_out: bool = False
+    stderr_tail: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.exit_code == 0 and not self.timed_out
+
+
+class _StreamPump(threading.Thread):
+    """Drain one pipe into the sink so the child never blocks on a full pipe."""
+
+    def __init__(self, pipe, stream: str, sink: LogSink, keep_tail: bool) -> None:
+        super().__init__(name=f"automa-pump-{stream}", daemon=True)
+        self._pipe = pipe
+        self._stream = stream
+        self._sink = sink
+        self._keep_tail = keep_tail
+        self.count = 0
+        self.tail = b""
+
+    def run(self) -> None:
+        try:
+            while True:
+                chunk = self._pipe.read(_CHUNK_SIZE)
+                if not chunk:
+                    break
+                self.count += len(chunk)
+                if self._keep_tail:
+                    self.tail = (self.tail + chunk)[-_TAIL_SIZE:]
+                try:
+                    self._sink.write(self._stream, chunk)
+                except Exception:
+                    # A broken sink must not stall the child; keep draining.
+                    _logger.exception("Log sink failed for %s", self._stream)
+        finally:
+            self._pipe.close()
+
+
+def _new_group() -> dict:
+    """Popen arguments that give the child its own process group."""
+    if hasattr(os, "killpg"):
+        return {"start_new_session": True}
+    return {"creationflags": getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)}  # Windows
+
+
+def _kill(proc: subprocess.Popen) -> None:
+    """Kill the child with its descendants: grandchildren hold the pipes too."""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass  # the group is gone already
+        return
+    # Windows has no group signals; taskkill walks the process tree, as far
+    # as it still hangs off a live child
+    try:
+        subprocess.run(["taskkill", "/T", "/F", "/PID", str(proc.pid)], capture_output=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        _logger.warning("taskkill failed for pid %s", proc.pid)
+    if proc.poll() is None:
+        proc.kill()
+
+
+def _drain(proc: subprocess.Popen, pumps: list[_StreamPump]) -> None:
+    # A background process the script left behind keeps the pipes open after
+    # the child exits; kill it instead of blocking the executor slot on it.
+    for pump in pumps:
+        pump.join(_DRAIN_TIMEOUT)
+    if any(pump.is_alive() for pump in pumps):
+        _kill(proc)
+        for pump in pumps:
+            pump.join(_DRAIN_TIMEOUT)
+        if any(pump.is_alive() for pump in pumps):
+            _logger.warning("Output pipes of pid %s still open; abandoning the log pumps", proc.pid)
+
+
+def execute_command(
+    cmd: list[str],
+    sink: LogSink | None = None,
+    timeout: float | None = None,
+    env: dict[str, str] | None = None,
+    cwd: str | None = None,
+    on_timeout: Callable[[subprocess.Popen], None] = _kill,
+) -> RunResult:
+    """Run ``cmd``, pumping its output into ``sink`` until it exits or times out."""
+    sink = sink or NullLogSink()
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=0,
+        env=env,
+        cwd=cwd,
+        **_new_group(),  # see _kill
+    )
+    pumps = [
+        _StreamPump(proc.stdout, "stdout", sink, keep_tail=False),
+        _StreamPump(proc.stderr, "stderr", sink, keep_tail=True),
+    ]
+    for pump in pumps:
+        pump.start()
+
+    timed_out = False
+    try:
+        exit_code = proc.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        on_timeout(proc)
+        exit_code = proc.wait()
+    _drain(proc, pumps)
+
+    return RunResult(
+        exit_code=exit_code,
+        stdout_bytes=pumps[0].count,
+        stderr_bytes=pumps[1].count,
+        duration_seconds=time.perf_counter() - started,
+        timed_out=timed_out,
+        stderr_tail=pumps[1].tail.decode("utf-8", errors="replace"),
+    )
+
+
+class Sandbox:
+    """A pre-started execution environment that can run several scripts in turn."""
+
+    def __init__(self, profile: str) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.profile = profile
+        self.uses = 0
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+
+    def run(
+        self,
+        script_path: str,
+        args: Sequence[str] | None,
+        sink: LogSink | None,
+        timeout: float | None,
+        output_dir: str | None = None,
+    ) -> RunResult:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def reset(self) -> bool:
+        """Restore a clean state after a run; False means the sandbox must be discarded."""
+        return True
+
+    def stop(self) -> None:
+        pass
+
+
+class SandboxBackend:
+    name = "base"
+
+    def command(self, script_path: str, args: Sequence[str], output_dir: str | None = None) -> list[str]:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def environment(self, output_dir: str | None = None) -> dict[str, str] | None:
+        return None  # inherit
+
+    def on_timeout(self, proc: subprocess.Popen) -> None:
+        _kill(proc)
+
+    def profile_for(self, script_path: str) -> str:
+        """Key of the warm pool that can run ``script_path``."""
+        return self.name
+
+    def start_sandbox(self, profile: str) -> Sandbox:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def run(
+        self,
+        script_path: str,
+        args: Sequence[str] | None = None,
+        sink: LogSink | None = None,
+        timeout: float | None = None,
+        output_dir: str | None = None,
+    ) -> RunResult:
+        cmd = self.command(script_path, list(args or []), output_dir)
+        return execute_command(cmd, sink, timeout, env=self.environment(output_dir), on_timeout=self.on_timeout)
+
+
+class LocalBackend(SandboxBackend):
+    """Subprocess on the host; isolation is limited to a separate process."""
+
+    name = "local"
+
+    def __init__(self, python: str | None = None) -> None:
+        self.python = python or sys.executable
+
+    def command(self, script_path: str, args: Sequence[str], output_dir: str | None = None) -> list[str]:
+        return [self.python, "-u", script_path, *args]
+
+    def environment(self, output_dir: str | None = None) -> dict[str, str]:
+        # Never leak the app's own configuration (secret key, admin password).
+        env = {k: v for k, v in os.environ.items() if not k.startswith("AUTOMA_")}
+        if output_dir is not None:
+            env[OUTPUT_ENV] = output_dir
+        return env
+
+    def start_sandbox(self, profile: str) -> "LocalSandbox":
+        return LocalSandbox(self, profile)
+
+
+class LocalSandbox(Sandbox):
+    """Stand-in for a warm container: a private scratch dir used as cwd/HOME/TMPDIR."""
+
+    def __init__(self, backend: LocalBackend, profile: str) -> None:
+        super().__init__(profile)
+        self.backend = backend
+        self.workdir = tempfile.mkdtemp(prefix=f"automa-sbx-{self.id}-")
+
+    def run(self, script_path, args=None, sink=None, timeout=None, output_dir=None) -> RunResult:
+        env = self.backend.environment(output_dir)
+        env.update(HOME=self.workdir, TMPDIR=self.workdir)
+        cmd = self.backend.command(os.path.abspath(script_path), list(args or []))
+        return execute_command(cmd, sink, timeout, env=env, cwd=self.workdir)
+
+    def reset(self) -> bool:
+        try:
+            shutil.rmtree(self.workdir)
+            os.mkdir(self.workdir)
+        except OSError:
+            return False
+        return True
+
+    def stop(self) -> None:
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class ContainerBackend(SandboxBackend):
+    """``docker run`` / ``podman run`` with a locked-down profile."""
+
+    def __init__(
+        self,
+        runtime: str = "docker",
+        image: str = "python:3.13-slim",
+        memory: str = "256m",
+        cpus: str = "1.0",
+        network: str = "none",
+        pids_limit: int = 128,
+    ) -> None:
+        self.name = runtime
+        self.runtime = runtime
+        self.image = image
+        self.memory = memory
+        self.cpus = cpus
+        self.network = network
+        self.pids_limit = pids_limit
+
+    def security_flags(self) -> list[str]:
+        return [
+            "--network", self.network,
+            "--read-only",
+            "--cap-drop", "ALL",
+            "--security-opt", "no-new-privileges",
+            "--pids-limit", str(self.pids_limit),
+            "--memory", self.memory,
+            "--cpus", self.cpus,
+            "--tmpfs", "/tmp:rw,noexec,nosuid,size=64m",
+        ]
+
+    def command(self, script_path: str, args: Sequence[str], output_dir: str | None = None) -> list[str]:
+        script = Path(script_path).resolve()
+        output = ["-v", f"{Path(output_dir).resolve()}:/out", "-e", f"{OUTPUT_ENV}=/out"] if output_dir else []
+        return [
+            self.runtime, "run", "--rm", "--name", f"automa-run-{uuid.uuid4().hex[:12]}",
+            *self.security_flags(),
+            "-v", f"{script.parent}:/work:ro",
+            *output,
+            "-w", "/work",
+            self.image,
+            "python", "-u", f"/work/{script.name}", *args,
+        ]
+
+    def on_timeout(self, proc: subprocess.Popen) -> None:
+        # Killing the CLI client does not stop the container; do it explicitly.
+        name = proc.args[proc.args.index("--name") + 1]
+        try:
+            subprocess.run([self.runtime, "kill", name], capture_output=True, timeout=30)
+        finally:
+            _kill(proc)
+
+    def profile_for(self, script_path: str) -> str:
+        # Warm containers mount one script directory, so that is the profile.
+        return str(Path(script_path).resolve().parent)
+
+    def start_sandbox(self, profile: str) -> "ContainerSandbox":
+        return ContainerSandbox(self, profile)
+
+
+_WARM_OUTPUT = "/tmp/automa-output"
+
+
+class ContainerSandbox(Sandbox):
+    """Long-lived locked-down container idling on ``sleep``; scripts run via ``exec``."""
+
+    def __init__(self, backend: ContainerBackend, profile: str) -> None:
+        super().__init__(profile)
+        self.backend = backend
+        self.name = f"automa-warm-{self.id}"
+        self.broken = False
+        subprocess.run(
+            [
+                backend.runtime, "run", "-d", "--name", self.name,
+                *backend.security_flags(),
+                "-v", f"{profile}:/work:ro",
+                "-w", "/work",
+                backend.image,
+                "sleep", "infinity",
+            ],
+            check=True,
+            capture_output=True,
+            timeout=120,
+        )
+
+    def run(self, script_path, args=None, sink=None, timeout=None, output_dir=None) -> RunResult:
+        # Volumes can't be added to a running container: the script writes to
+        # its /tmp and the files are copied out afterwards (reset wipes /tmp).
+        output = []
+        if output_dir is not None:
+            subprocess.run(
+                [self.backend.runtime, "exec", self.name, "mkdir", "-p", _WARM_OUTPUT], capture_output=True, timeout=30
+            )
+            output = ["-e", f"{OUTPUT_ENV}={_WARM_OUTPUT}"]
+        cmd = [
+            self.backend.runtime, "exec", "-w", "/work", *output, self.name,
+            "python", "-u", f"/work/{Path(script_path).name}", *(args or []),
+        ]
+        result = execute_command(cmd, sink, timeout, on_timeout=self._on_timeout)
+        if output_dir is not None and not self.broken:
+            subprocess.run(
+                [self.backend.runtime, "cp", f"{self.name}:{_WARM_OUTPUT}/.", output_dir],
+                capture_output=True,
+                timeout=300,
+            )
+        return result
+
+    def _on_timeout(self, proc: subprocess.Popen) -> None:
+        # The exec'd process survives its client; the container is discarded on release.
+        self.broken = True
+        _kill(proc)
+
+    def reset(self) -> bool:
+        if self.broken:
+            return False
+        # kill -1 spares PID 1 (the idle sleep); /tmp is the only writable path.
+        proc = subprocess.run(
+            [self.backend.runtime, "exec", self.name, "sh", "-c", "kill -9 -1 2>/dev/null; rm -rf /tmp/* /tmp/.[!.]* 2>/dev/null; true"],
+            capture_output=True,
+            timeout=30,
+        )
+        return proc.returncode == 0
+
+    def stop(self) -> None:
+        subprocess.run([self.backend.runtime, "rm", "-f", self.name], capture_output=True, timeout=60)
+
+
+_backend: Optional[SandboxBackend] = None
+
+
+def build_backend(kind: str | None = None) -> SandboxBackend:
+    kind = (kind or settings.sandbox_backend).lower()
+    if kind == "local":
+        return LocalBackend(python=settings.sandbox_python or None)
+    if kind in ("docker", "podman"):
+        return ContainerBackend(
+            runtime=kind,
+            image=settings.sandbox_image,
+            memory=settings.sandbox_memory,
+            cpus=settings.sandbox_cpus,
+            network=settings.sandbox_network,
+        )
+    raise ValueError(f"Unknown sandbox backend {kind!r}")
+
+
+def get_backend() -> SandboxBackend:
+    global _backend
+    if _backend is None:
+        _backend = build_backend()
+    return _backend
 
 
-def run_script(script_path: str, args: Sequence[str] | None = None) -> int:
-    """Run a script inside a container (not implemented in MVP).
+def run_script(
+    script_path: str,
+    args: Sequence[str] | None = None,
+    *,
+    log_sink: LogSink | None = None,
+    timeout: float | None = None,
+    output_dir: str | None = None,
+) -> RunResult:
+    """Run a script in the configured sandbox and stream its output to ``log_sink``.
 
-    Returns exit code (0 on success). For now, this function is a stub.
+    With the warm pool enabled the run leases a pre-started sandbox instead of
+    starting a fresh one. Files the script writes to ``$AUTOMA_OUTPUT_DIR``
+    are left in ``output_dir``.
     """
-    # TODO: implement docker/podman invocation with security flags
-    print(f"[sandbox] would run: {script_path} {args or []}")
-    return 0
+    from .pool import get_pool, pool_enabled
 
+    if timeout is None and settings.sandbox_timeout_seconds > 0:
+        timeout = settings.sandbox_timeout_seconds
+    backend = get_backend()
+    if pool_enabled():
+        with get_pool().lease(backend.profile_for(script_path)) as sandbox:
+            return sandbox.run(script_path, args, log_sink, timeout, output_dir)
+    return backend.run(script_path, args, log_sink, timeout, output_dir)
@@ -0,0 +1,229 @@
+"""Log sinks for sandboxed runs.
+
+The runner streams child output into a sink chunk by chunk, so a run's
+output never has to fit in the scheduler's memory.
+
+Run logs are append-only files with a sparse line index next to them
+(``<log>.idx``): a 16-byte header with the interval ``K``, then one
+``(line, offset)`` record for every ``K``-th line, in order. Record ``i``
+is always line ``(i + 1) * K``, so finding where a line starts is one seek
+into the index plus a scan of fewer than ``K`` lines of the log, however
+large it is. When the sink closes it appends a trailer record (the line
+count with :data:`_CLOSED` set, and the final size), which tells readers
+that the log is complete. With ``K = 0`` the index holds just the header
+and the trailer: no line records, but still the completion marker.
+"""
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+import os
+import struct
+import threading
+
+from ..core.config import settings
+
+
+_INDEX_MAGIC = b"ALX1"
+_HEADER = struct.Struct("<4sIQ")  # magic, interval, reserved
+_RECORD = struct.Struct("<QQ")  # line number, byte offset of its first character
+_CLOSED = 1 << 63
+_SCAN_CHUNK = 64 * 1024
+
+
+class LogSink:
+    """Receives raw output chunks tagged with their stream name."""
+
+    def write(self, stream: str, data: bytes) -> None:  # pragma: no cover - interface
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class NullLogSink(LogSink):
+    def write(self, stream: str, data: bytes) -> None:
+        pass
+
+
+class FileLogSink(LogSink):
+    """Append-only file; stdout and stderr are interleaved in arrival order.
+
+    With an ``index_interval`` it also maintains the line index (``0``: no
+    line records, only the completion marker).
+    """
+
+    def __init__(self, path: Path, index_interval: Optional[int] = None) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(self.path, "ab", buffering=0)
+        self._lock = threading.Lock()
+        self._size = self._fh.tell()
+        self._lines = 0
+        self._interval = index_interval
+        self._index = None
+        if index_interval is not None and self._size == 0:
+            self._index = open(index_path(self.path), "wb", buffering=0)
+            self._index.write(_HEADER.pack(_INDEX_MAGIC, index_interval, 0))
+
+    def write(self, stream: str, data: bytes) -> None:
+        with self._lock:
+            self._fh.write(data)
+            if self._index is not None and self._interval:
+                self._index_lines(data)
+            elif self._index is not None:
+                self._lines += data.count(b"\n")  # for the trailer
+            self._size += len(data)
+
+    def _index_lines(self, data: bytes) -> None:
+        newlines = data.count(b"\n")
+        mark = (self._lines // self._interval + 1) * self._interval  # next line to record
+        pos, seen = 0, 0  # newlines before pos
+        while self._lines + newlines >= mark:
+            # line ``mark`` starts right after the (mark - lines)-th newline of this chunk
+            pos = _nth_newline(data, pos, mark - self._lines - seen) + 1
+            seen = mark - self._lines
+            self._index.write(_RECORD.pack(mark, self._size + pos))
+            mark += self._interval
+        self._lines += newlines
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
+            if self._index is not None and not self._index.closed:
+                self._index.write(_RECORD.pack(_CLOSED | self._lines, self._size))
+                self._index.close()
+
+
+def _nth_newline(data: bytes, start: int, n: int) -> int:
+    """Position of the ``n``-th newline at or after ``start``; it must exist."""
+    # count() whole blocks in C instead of stepping through every line,
+    # narrowing the block once it contains the newline
+    block = 8192
+    while True:
+        found = data.count(b"\n", start, start + block)
+        if found < n:
+            n -= found
+            start += block
+        elif block > 256:
+            block //= 8
+        else:
+            break
+    pos = start - 1
+    for _ in range(n):
+        pos = data.index(b"\n", pos + 1)
+    return pos
+
+
+def logs_root() -> Path:
+    return Path(settings.data_dir) / "logs"
+
+
+def run_log_path(job_id: int, started_at: datetime) -> Path:
+    """``<data_dir>/logs/job-<id>/<timestamp>.log``"""
+    return logs_root() / f"job-{job_id}" / (started_at.strftime("%Y%m%dT%H%M%S%fZ") + ".log")
+
+
+def open_run_log(job_id: int, started_at: datetime | None = None) -> FileLogSink:
+    """Create the per-run log file (see :func:`run_log_path`) and its line index."""
+    path = run_log_path(job_id, started_at or datetime.now(timezone.utc))
+    return FileLogSink(path, index_interval=settings.log_index_interval)
+
+
+def index_path(log_path: Path) -> Path:
+    return Path(f"{log_path}.idx")
+
+
+class LogIndex:
+    """Reader side of a log's line index; a missing index reads as a
+    finished log without entries (logs written before indexing existed)."""
+
+    def __init__(self, log_path: Path) -> None:
+        self.interval = 0
+        self.entries = 0
+        self.closed = True
+        self.lines: Optional[int] = None  # newline count, once closed
+        self._path = index_path(log_path)
+        try:
+            size = self._path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size < _HEADER.size:
+            self.closed = False  # header not written yet
+            return
+        with open(self._path, "rb") as fh:
+            magic, self.interval, _ = _HEADER.unpack(fh.read(_HEADER.size))
+            if magic != _INDEX_MAGIC:
+                raise ValueError(f"Not a log index: {self._path}")
+            self.entries = (size - _HEADER.size) // _RECORD.size
+            self.closed = False
+            if self.entries:
+                fh.seek(_HEADER.size + (self.entries - 1) * _RECORD.size)
+                line, _ = _RECORD.unpack(fh.read(_RECORD.size))
+                if line & _CLOSED:
+                    self.closed = True
+                    self.lines = line & ~_CLOSED
+                    self.entries -= 1
+
+    def floor(self, line: int) -> tuple[int, int]:
+        """The closest indexed ``(line, offset)`` at or before ``line``."""
+        i = min(line // self.interval, self.entries) if self.interval else 0
+        if i == 0:
+            return 0, 0
+        with open(self._path, "rb") as fh:
+            fh.seek(_HEADER.size + (i - 1) * _RECORD.size)
+            return _RECORD.unpack(fh.read(_RECORD.size))
+
+
+def line_offset(log_path: Path, line: int) -> int:
+    """Byte offset where ``line`` (0-based) starts, or the file size if the
+    log has fewer lines."""
+    start_line, offset = LogIndex(log_path).floor(line)
+    skip = line - start_line
+    with open(log_path, "rb") as fh:
+        fh.seek(offset)
+        while skip > 0:
+            chunk = fh.read(_SCAN_CHUNK)
+            if not chunk:
+                break
+            count = chunk.count(b"\n")
+            if count < skip:
+                skip -= count
+                offset += len(chunk)
+                continue
+            pos = -1
+            for _ in range(skip):
+                pos = chunk.index(b"\n", pos + 1)
+            return offset + pos + 1
+    return os.path.getsize(log_path) if skip > 0 else offset
+
+
+def tail_offset(log_path: Path, lines: int) -> int:
+    """Byte offset of the last ``lines`` lines, reading backwards from the end,
+    so the cost depends on the size of those lines only."""
+    with open(log_path, "rb") as fh:
+        end = fh.seek(0, os.SEEK_END)
+        if lines <= 0:
+            return end
+        pos = end
+        # a final newline ends the last line rather than starting an empty one
+        wanted = lines + 1 if end and _read_at(fh, end - 1, 1) == b"\n" else lines
+        while pos > 0:
+            size = min(_SCAN_CHUNK, pos)
+            pos -= size
+            chunk = _read_at(fh, pos, size)
+            count = chunk.count(b"\n")
+            if count < wanted:
+                wanted -= count
+                continue
+            cut = len(chunk)
+            for _ in range(wanted):
+                cut = chunk.rindex(b"\n", 0, cut)
+            return pos + cut + 1
+    return 0
+
+
+def _read_at(fh, offset: int, size: int) -> bytes:
+    fh.seek(offset)
+    return fh.read(size)
@@ -0,0 +1,243 @@
+"""Warm sandbox pool.
+
+Starting a container dominates the latency of short scripts, so the pool
+keeps pre-started sandboxes per profile and leases one to each run. After a
+run the sandbox is reset and returned, or discarded if the reset fails or it
+has reached ``max_uses``. A maintenance thread evicts sandboxes that stayed
+idle longer than ``idle_ttl`` and pre-starts new ones so that every known
+profile has ``min_idle`` spares plus one per job in the executor queue that
+will run in that profile (capped at ``max_size`` sandboxes per profile).
+"""
+
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+import logging
+import threading
+import time
+
+from ..core.config import settings
+from .docker_runner import Sandbox, SandboxBackend, get_backend
+
+
+_logger = logging.getLogger(__name__)
+
+
+class _Profile:
+    __slots__ = ("idle", "busy", "last_demand")
+
+    def __init__(self) -> None:
+        self.idle: deque[Sandbox] = deque()
+        self.busy = 0
+        self.last_demand = time.monotonic()
+
+
+class SandboxPool:
+    def __init__(
+        self,
+        backend: SandboxBackend,
+        min_idle: int = 1,
+        max_size: int = 8,
+        idle_ttl: float = 300.0,
+        max_uses: int = 50,
+        interval: float = 1.0,
+        queue_depth: Callable[[], dict[str, int]] | None = None,
+    ) -> None:
+        self.backend = backend
+        self.min_idle = min_idle
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.max_uses = max_uses
+        self.interval = interval
+        self.queue_depth = queue_depth or dict  # waiting jobs per profile
+
+        self._lock = threading.Lock()
+        self._profiles: dict[str, _Profile] = {}
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.counters = {
+            "hits": 0,
+            "misses": 0,
+            "created": 0,
+            "recycled": 0,
+            "destroyed": 0,
+            "evicted": 0,
+            "start_failures": 0,
+        }
+
+    # -- leasing -------------------------------------------------------
+    def acquire(self, profile: str) -> Sandbox:
+        with self._lock:
+            prof = self._profiles.setdefault(profile, _Profile())
+            prof.last_demand = time.monotonic()
+            prof.busy += 1
+            sandbox = prof.idle.pop() if prof.idle else None
+            self.counters["hits" if sandbox else "misses"] += 1
+        if sandbox is not None:
+            return sandbox
+        # Cold start on the caller's thread; ask maintenance to warm up more.
+        self._wakeup.set()
+        try:
+            return self._create(profile)
+        except Exception:
+            with self._lock:
+                prof.busy -= 1
+            raise
+
+    def release(self, sandbox: Sandbox) -> None:
+        sandbox.uses += 1
+        sandbox.last_used = time.monotonic()
+        reusable = sandbox.uses < self.max_uses and not self._stopped.is_set()
+        if reusable:
+            try:
+                reusable = sandbox.reset()
+            except Exception:
+                _logger.exception("Resetting sandbox %s failed", sandbox.id)
+                reusable = False
+        with self._lock:
+            prof = self._profiles.setdefault(sandbox.profile, _Profile())
+            prof.busy -= 1
+            if reusable and len(prof.idle) + prof.busy < self.max_size:
+                prof.idle.append(sandbox)
+                self.counters["recycled"] += 1
+                return
+        self._destroy(sandbox)
+
+    @contextmanager
+    def lease(self, profile: str) -> Iterator[Sandbox]:
+        sandbox = self.acquire(profile)
+        try:
+            yield sandbox
+        finally:
+            self.release(sandbox)
+
+    # -- lifecycle of individual sandboxes -----------------------------
+    def _create(self, profile: str) -> Sandbox:
+        try:
+            sandbox = self.backend.start_sandbox(profile)
+        except Exception:
+            with self._lock:
+                self.counters["start_failures"] += 1
+            raise
+        with self._lock:
+            self.counters["created"] += 1
+        return sandbox
+
+    def _destroy(self, sandbox: Sandbox) -> None:
+        try:
+            sandbox.stop()
+        except Exception:
+            _logger.exception("Stopping sandbox %s failed", sandbox.id)
+        with self._lock:
+            self.counters["destroyed"] += 1
+
+    # -- maintenance ---------------------------------------------------
+    def _target_idle(self, prof: _Profile, waiting: int) -> int:
+        wanted = self.min_idle + waiting
+        return max(0, min(wanted, self.max_size - prof.busy))
+
+    def maintain(self) -> None:
+        """Evict expired idle sandboxes and top every profile up to its target."""
+        now = time.monotonic()
+        expired: list[Sandbox] = []
+        to_start: list[str] = []
+        waiting = self.queue_depth()
+        with self._lock:
+            for name in waiting:
+                self._profiles.setdefault(name, _Profile())  # queued work for a profile not seen yet
+            for name, prof in list(self._profiles.items()):
+                target = self._target_idle(prof, waiting.get(name, 0))
+                # oldest idle sandboxes sit at the left end
+                while prof.idle and (
+                    len(prof.idle) > target or now - prof.idle[0].last_used > self.idle_ttl
+                ):
+                    expired.append(prof.idle.popleft())
+                if not prof.idle and not prof.busy and now - prof.last_demand > self.idle_ttl:
+                    del self._profiles[name]  # profile fell out of use
+                    continue
+                to_start.extend([name] * (target - len(prof.idle)))
+            self.counters["evicted"] += len(expired)
+        for sandbox in expired:
+            self._destroy(sandbox)
+        for name in to_start:
+            if self._stopped.is_set():
+                break
+            try:
+                sandbox = self._create(name)
+            except Exception:
+                _logger.exception("Pre-starting sandbox for %s failed", name)
+                break
+            with self._lock:
+                prof = self._profiles.setdefault(name, _Profile())
+                prof.idle.append(sandbox)
+
+    def _loop(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.maintain()
+            except Exception:
+                _logger.exception("Sandbox pool maintenance failed")
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._loop, name="automa-sandbox-pool", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        with self._lock:
+            idle = [sb for prof in self._profiles.values() for sb in prof.idle]
+            for prof in self._profiles.values():
+                prof.idle.clear()
+        for sandbox in idle:
+            self._destroy(sandbox)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_ratio": round(self.counters["hits"] / lookups, 4) if lookups else None,
+                "profiles": {
+                    name: {"idle": len(prof.idle), "busy": prof.busy}
+                    for name, prof in self._profiles.items()
+                },
+            }
+
+
+_pool: Optional[SandboxPool] = None
+
+
+def pool_enabled() -> bool:
+    return settings.sandbox_pool_size > 0
+
+
+def get_pool() -> SandboxPool:
+    global _pool
+    if _pool is None:
+        _pool = SandboxPool(
+            get_backend(),
+            min_idle=settings.sandbox_pool_size,
+            max_size=settings.sandbox_pool_max,
+            idle_ttl=settings.sandbox_pool_idle_ttl_seconds,
+            max_uses=settings.sandbox_pool_max_uses,
+        )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown()
+        _pool = None
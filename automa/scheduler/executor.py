@@ -0,0 +1,302 @@
+"""Bounded execution engine for scheduled jobs.
+
+The scheduler only decides *when* a job is due; this module decides *whether
+it may start now*. Runs are handed to a fixed-size worker pool, with optional
+concurrency caps per agent and per script. Jobs that cannot start yet wait in
+an inspectable pending queue and are admitted as soon as a slot frees up, so
+one noisy agent cannot starve the rest of the workers.
+
+Which waiting job goes next is decided by weighted fair queuing (start-time
+fair queuing). Every ``(priority, owner, agent)`` combination is a flow
+with the weight of its priority class; with ``max_per_script`` the script is
+part of the key too, so a script at its cap only holds back its own jobs. A job's start tag is
+``max(virtual time, finish tag of the flow's previous job)``, its finish tag
+``start + 1 / weight``, and the job with the lowest start tag is admitted
+first (the heavier class wins ties). So one owner's backlog of 5,000 jobs
+is a single flow: a job arriving in another flow is admitted at the next
+free slot, and within a class owners and agents share the workers evenly.
+A job that has waited longer than ``max_wait`` goes ahead of every tag
+(oldest first), so a low class is never starved outright.
+"""
+
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+
+_logger = logging.getLogger(__name__)
+
+
+DEFAULT_PRIORITY = "normal"
+DEFAULT_WEIGHTS = {"high": 8.0, "normal": 4.0, "low": 1.0}
+
+
+@dataclass(slots=True)
+class ExecutionRequest:
+    job_id: int
+    agent_id: Optional[int] = None
+    script_id: Optional[int] = None
+    priority: str = DEFAULT_PRIORITY
+    owner_id: Optional[int] = None
+    due_at: float = field(default_factory=time.time)  # epoch seconds the job was scheduled for
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass(slots=True)
+class _Flow:
+    weight: float
+    queue: deque[tuple[float, ExecutionRequest]] = field(default_factory=deque)  # (start tag, request)
+    last_finish: float = 0.0
+
+
+class JobExecutor:
+    """Worker pool with global, per-agent and per-script concurrency limits.
+
+    A limit of ``0`` disables the corresponding per-key cap, ``max_wait=0``
+    disables aging. Unknown priority classes get the weight of
+    :data:`DEFAULT_PRIORITY`. ``on_start`` is called with the request on the
+    worker thread right before the runner. ``on_done`` is
+    called with the job id and the runner's return value (None if it raised)
+    after every run, once the worker slot has been released.
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[int], object],
+        max_workers: int = 4,
+        max_per_agent: int = 0,
+        max_per_script: int = 0,
+        on_done: Optional[Callable[[int, object], None]] = None,
+        weights: Optional[dict[str, float]] = None,
+        max_wait: float = 0.0,
+        on_start: Optional[Callable[[ExecutionRequest], None]] = None,
+    ) -> None:
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+        self._runner = runner
+        self._on_done = on_done
+        self._on_start = on_start
+        self.max_workers = max_workers
+        self.max_per_agent = max_per_agent
+        self.max_per_script = max_per_script
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        self.max_wait = max_wait
+
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="automa-job")
+        self._flows: dict[tuple, _Flow] = {}
+        self._vtime = 0.0
+        self._pending_by_class: Counter[str] = Counter()
+        self._queued_ids: set[int] = set()
+        self._running: dict[int, ExecutionRequest] = {}
+        self._running_by_agent: Counter[int] = Counter()
+        self._running_by_script: Counter[int] = Counter()
+        self._avg_run: Optional[float] = None  # moving average of run durations
+        self._closed = False
+
+    # -- admission -----------------------------------------------------
+    def _can_start(self, req: ExecutionRequest) -> bool:
+        if len(self._running) >= self.max_workers:
+            return False
+        if self.max_per_agent and req.agent_id is not None:
+            if self._running_by_agent[req.agent_id] >= self.max_per_agent:
+                return False
+        if self.max_per_script and req.script_id is not None:
+            if self._running_by_script[req.script_id] >= self.max_per_script:
+                return False
+        return True
+
+    def _reserve(self, req: ExecutionRequest) -> None:
+        self._running[req.job_id] = req
+        if req.agent_id is not None:
+            self._running_by_agent[req.agent_id] += 1
+        if req.script_id is not None:
+            self._running_by_script[req.script_id] += 1
+
+    def _release(self, req: ExecutionRequest) -> None:
+        self._running.pop(req.job_id, None)
+        if req.agent_id is not None:
+            self._running_by_agent[req.agent_id] -= 1
+            if self._running_by_agent[req.agent_id] <= 0:
+                del self._running_by_agent[req.agent_id]
+        if req.script_id is not None:
+            self._running_by_script[req.script_id] -= 1
+            if self._running_by_script[req.script_id] <= 0:
+                del self._running_by_script[req.script_id]
+
+    def _weight(self, priority: str) -> float:
+        return self.weights.get(priority) or self.weights.get(DEFAULT_PRIORITY) or 1.0
+
+    def _enqueue(self, req: ExecutionRequest) -> None:
+        # a flow's head blocks the flow while it is at a cap, so the key
+        # includes everything a cap applies to
+        key = (req.priority, req.owner_id, req.agent_id, req.script_id if self.max_per_script else None)
+        flow = self._flows.get(key)
+        if flow is None:
+            flow = self._flows[key] = _Flow(self._weight(req.priority))
+        start = max(self._vtime, flow.last_finish)
+        flow.last_finish = start + 1.0 / flow.weight
+        flow.queue.append((start, req))
+        self._queued_ids.add(req.job_id)
+        self._pending_by_class[req.priority] += 1
+
+    def _take_ready(self) -> list[ExecutionRequest]:
+        """Pop every pending request that fits the current limits, in fair-queuing order."""
+        ready: list[ExecutionRequest] = []
+        if not self._queued_ids or len(self._running) >= self.max_workers:
+            return ready
+        now = time.monotonic()
+        seq = itertools.count()
+
+        def head(key: tuple, flow: _Flow) -> tuple:
+            start, req = flow.queue[0]
+            if self.max_wait and now - req.enqueued_at >= self.max_wait:
+                return (0, req.enqueued_at, 0.0, next(seq), key)  # aged: oldest first
+            return (1, start, -flow.weight, next(seq), key)
+
+        order = [head(key, flow) for key, flow in self._flows.items() if flow.queue]
+        heapq.heapify(order)
+        while order and len(self._running) < self.max_workers:
+            key = heapq.heappop(order)[-1]
+            flow = self._flows[key]
+            start, req = flow.queue[0]
+            if not self._can_start(req):
+                continue  # its agent/script is at its cap; the flow waits for a release
+            flow.queue.popleft()
+            self._vtime = max(self._vtime, start)
+            self._queued_ids.discard(req.job_id)
+            self._pending_by_class[req.priority] -= 1
+            self._reserve(req)
+            ready.append(req)
+            if flow.queue:
+                heapq.heappush(order, head(key, flow))
+        # idle flows whose tags are behind the virtual time carry no state worth keeping
+        for key in [k for k, f in self._flows.items() if not f.queue and f.last_finish <= self._vtime]:
+            del self._flows[key]
+        return ready
+
+    # -- public API ----------------------------------------------------
+    def submit(self, req: ExecutionRequest) -> bool:
+        """Start ``req`` now if limits allow, otherwise queue it.
+
+        Returns True when the job was started immediately.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Executor is shut down")
+            if req.job_id in self._running or req.job_id in self._queued_ids:
+                _logger.info("Job %s is already queued or running; ignoring duplicate", req.job_id)
+                return False
+            self._enqueue(req)
+            ready = self._take_ready()
+        for nxt in ready:
+            self._pool.submit(self._run, nxt)
+        return any(r is req for r in ready)
+
+    def _run(self, req: ExecutionRequest) -> None:
+        result = None
+        if self._on_start is not None:
+            try:
+                self._on_start(req)
+            except Exception:
+                _logger.exception("Start callback failed for job %s", req.job_id)
+        started = time.monotonic()
+        try:
+            result = self._runner(req.job_id)
+        except Exception:
+            _logger.exception("Job %s raised in executor", req.job_id)
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._avg_run = elapsed if self._avg_run is None else 0.8 * self._avg_run + 0.2 * elapsed
+                self._release(req)
+                ready = [] if self._closed else self._take_ready()
+            for nxt in ready:
+                self._pool.submit(self._run, nxt)
+        if self._on_done is not None and not self._closed:
+            try:
+                self._on_done(req.job_id, result)
+            except Exception:
+                _logger.exception("Completion callback failed for job %s", req.job_id)
+
+    def _ordered_pending(self, limit: Optional[int] = None) -> list[ExecutionRequest]:
+        entries = [(start, req.enqueued_at, req) for flow in self._flows.values() for start, req in flow.queue]
+        if limit is not None:
+            entries = heapq.nsmallest(limit, entries, key=lambda e: (e[0], e[1]))
+        return [req for _, _, req in sorted(entries, key=lambda e: (e[0], e[1]))]
+
+    def pending(self) -> list[ExecutionRequest]:
+        """Waiting requests, roughly in the order they will be admitted."""
+        with self._lock:
+            return self._ordered_pending()
+
+    def pending_count(self) -> int:
+        return len(self._queued_ids)
+
+    def pending_by_script(self) -> dict[Optional[int], int]:
+        with self._lock:
+            return Counter(req.script_id for flow in self._flows.values() for _, req in flow.queue)
+
+    def running_count(self) -> int:
+        return len(self._running)
+
+    def pending_by_class(self) -> dict[str, int]:
+        with self._lock:
+            return {cls: depth for cls, depth in self._pending_by_class.items() if depth > 0}
+
+    def drain_seconds(self, jobs: int) -> float:
+        """Rough time for the workers to get through ``jobs`` waiting jobs."""
+        return jobs * (self._avg_run or 1.0) / self.max_workers
+
+    def snapshot(self, pending_limit: Optional[int] = None) -> dict:
+        """Limits and counters, plus the first ``pending_limit`` waiting jobs
+        (all of them by default) in admission order."""
+        now = time.monotonic()
+        with self._lock:
+            oldest: dict[str, float] = {}
+            for flow in self._flows.values():
+                if flow.queue:
+                    req = flow.queue[0][1]  # flows are FIFO: the head waited longest
+                    oldest[req.priority] = max(oldest.get(req.priority, 0.0), now - req.enqueued_at)
+            return {
+                "max_workers": self.max_workers,
+                "max_per_agent": self.max_per_agent,
+                "max_per_script": self.max_per_script,
+                "running": sorted(self._running),
+                "running_by_agent": dict(self._running_by_agent),
+                "running_by_script": dict(self._running_by_script),
+                "weights": self.weights,
+                "max_wait_seconds": self.max_wait,
+                "avg_run_seconds": round(self._avg_run, 3) if self._avg_run is not None else None,
+                "pending_by_class": {
+                    cls: {"depth": depth, "oldest_seconds": round(oldest.get(cls, 0.0), 3)}
+                    for cls, depth in self._pending_by_class.items()
+                    if depth > 0
+                },
+                "pending_count": len(self._queued_ids),
+                "pending": [
+                    {
+                        "job_id": p.job_id,
+                        "agent_id": p.agent_id,
+                        "script_id": p.script_id,
+                        "priority": p.priority,
+                        "owner_id": p.owner_id,
+                        "waiting_seconds": round(now - p.enqueued_at, 3),
+                    }
+                    for p in self._ordered_pending(pending_limit)
+                ],
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            self._closed = True
+            self._flows.clear()
+            self._pending_by_class.clear()
+            self._queued_ids.clear()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
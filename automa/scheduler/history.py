@@ -0,0 +1,247 @@
+"""Write-behind persistence of job run state.
+
+Workers report run transitions (started, finished) and schedule changes to a
+:class:`RunHistoryWriter` instead of committing them one by one. A background
+thread coalesces everything reported within ``interval`` seconds (or as soon
+as ``batch_size`` changes are pending) and writes it in a single transaction
+with ``executemany`` inserts/updates. That keeps the number of SQLite write
+transactions independent of the job rate.
+
+When the writer is not started (scripts, tests, CLI use) every change is
+written through immediately.
+"""
+
+from datetime import datetime
+from typing import Any, Callable, Optional
+import logging
+import threading
+
+from sqlalchemy import bindparam, case, insert, update
+from sqlalchemy.engine import Engine
+
+from ..domain.models import Job, JobRun
+
+
+_logger = logging.getLogger(__name__)
+
+_RUN_COLUMNS = (
+    "run_key",
+    "job_id",
+    "status",
+    "started_at",
+    "finished_at",
+    "exit_code",
+    "error",
+    "stdout_bytes",
+    "stderr_bytes",
+    "duration_ms",
+    "log_path",
+)
+_RUN_UPDATE_COLUMNS = tuple(c for c in _RUN_COLUMNS if c not in ("run_key", "job_id", "started_at"))
+
+# Job summary updates never resurrect a job that was cancelled meanwhile.
+_keep_cancelled = case((Job.status == "cancelled", Job.status), else_=bindparam("b_status"))
+
+_UPDATE_RUN = (
+    update(JobRun)
+    .where(JobRun.run_key == bindparam("b_run_key"))
+    .values({c: bindparam(f"b_{c}") for c in _RUN_UPDATE_COLUMNS})
+)
+_JOB_STARTED = (
+    update(Job)
+    .where(Job.id == bindparam("b_id"))
+    .values(status=_keep_cancelled, last_error=None)
+)
+_JOB_FINISHED = (
+    update(Job)
+    .where(Job.id == bindparam("b_id"))
+    .values(
+        status=_keep_cancelled,
+        last_run_at=bindparam("b_last_run_at"),
+        last_exit_code=bindparam("b_last_exit_code"),
+        last_error=bindparam("b_last_error"),
+    )
+)
+_JOB_NEXT_RUN = update(Job).where(Job.id == bindparam("b_id")).values(next_run_at=bindparam("b_next_run_at"))
+
+
+class RunHistoryWriter:
+    def __init__(
+        self,
+        engine: Engine,
+        interval: float = 0.25,
+        batch_size: int = 500,
+        on_flush: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.engine = engine
+        self.interval = interval
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+
+        self._lock = threading.Lock()
+        self._runs: dict[str, dict[str, Any]] = {}
+        self._job_started: dict[int, dict[str, Any]] = {}
+        self._job_finished: dict[int, dict[str, Any]] = {}
+        self._next_runs: dict[int, datetime | None] = {}
+        self._persisted_runs: set[str] = set()  # inserted, not finished yet
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"flushes": 0, "runs_inserted": 0, "runs_updated": 0, "jobs_updated": 0, "errors": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    # -- producers -----------------------------------------------------
+    def _submitted(self) -> None:
+        if not self.running:
+            self.flush()
+        elif len(self._runs) + len(self._job_finished) >= self.batch_size:
+            self._wakeup.set()
+
+    def run_started(self, run_key: str, job_id: int, started_at: datetime, log_path: str | None = None) -> None:
+        with self._lock:
+            row = self._runs.setdefault(run_key, dict.fromkeys(_RUN_COLUMNS))
+            row.update(run_key=run_key, job_id=job_id, status="running", started_at=started_at, log_path=log_path)
+            self._job_started[job_id] = {"b_id": job_id, "b_status": "running"}
+            self._job_finished.pop(job_id, None)
+        self._submitted()
+
+    def run_finished(
+        self,
+        run_key: str,
+        job_id: int,
+        *,
+        status: str,
+        job_status: str,
+        started_at: datetime,
+        finished_at: datetime,
+        exit_code: int | None = None,
+        error: str | None = None,
+        stdout_bytes: int | None = None,
+        stderr_bytes: int | None = None,
+        duration_ms: int | None = None,
+        log_path: str | None = None,
+    ) -> None:
+        with self._lock:
+            row = self._runs.setdefault(run_key, dict.fromkeys(_RUN_COLUMNS))
+            row.update(
+                run_key=run_key,
+                job_id=job_id,
+                status=status,
+                started_at=started_at,
+                finished_at=finished_at,
+                exit_code=exit_code,
+                error=error,
+                stdout_bytes=stdout_bytes,
+                stderr_bytes=stderr_bytes,
+                duration_ms=duration_ms,
+                log_path=log_path,
+            )
+            # the final state supersedes a not-yet-written "running"
+            self._job_started.pop(job_id, None)
+            self._job_finished[job_id] = {
+                "b_id": job_id,
+                "b_status": job_status,
+                "b_last_run_at": started_at,  # the start, whether or not it was flushed already
+                "b_last_exit_code": exit_code,
+                "b_last_error": error,
+            }
+        self._submitted()
+
+    def set_next_runs(self, items: list[tuple[int, datetime | None]]) -> None:
+        with self._lock:
+            self._next_runs.update(items)
+        self._submitted()
+
+    # -- flushing ------------------------------------------------------
+    def _take(self):
+        with self._lock:
+            batch = (self._runs, self._job_started, self._job_finished, self._next_runs)
+            self._runs, self._job_started, self._job_finished, self._next_runs = {}, {}, {}, {}
+            return batch
+
+    def _restore(self, runs, started, finished, next_runs) -> None:
+        # Put a failed batch back underneath anything reported meanwhile.
+        with self._lock:
+            for key, row in runs.items():
+                newer = self._runs.get(key)
+                if newer is not None:
+                    row.update({k: v for k, v in newer.items() if v is not None})
+                self._runs[key] = row
+            for job_id, values in started.items():
+                if job_id not in self._job_finished:
+                    self._job_started.setdefault(job_id, values)
+            for job_id, values in finished.items():
+                self._job_finished.setdefault(job_id, values)
+            for job_id, value in next_runs.items():
+                self._next_runs.setdefault(job_id, value)
+
+    def flush(self) -> int:
+        """Write everything reported so far in one transaction; returns the row count."""
+        with self._flush_lock:
+            runs, started, finished, next_runs = self._take()
+            if not (runs or started or finished or next_runs):
+                return 0
+            inserts = [row for key, row in runs.items() if key not in self._persisted_runs]
+            updates = [
+                {f"b_{c}": row[c] for c in ("run_key", *_RUN_UPDATE_COLUMNS)}
+                for key, row in runs.items()
+                if key in self._persisted_runs
+            ]
+            try:
+                with self.engine.begin() as conn:
+                    if inserts:
+                        conn.execute(insert(JobRun), inserts)
+                    if updates:
+                        conn.execute(_UPDATE_RUN, updates)
+                    if started:
+                        conn.execute(_JOB_STARTED, list(started.values()))
+                    if finished:
+                        conn.execute(_JOB_FINISHED, list(finished.values()))
+                    if next_runs:
+                        conn.execute(
+                            _JOB_NEXT_RUN,
+                            [{"b_id": job_id, "b_next_run_at": nxt} for job_id, nxt in next_runs.items()],
+                        )
+            except Exception:
+                self.stats["errors"] += 1
+                _logger.exception("Writing run history batch failed; will retry")
+                self._restore(runs, started, finished, next_runs)
+                return 0
+
+            for key, row in runs.items():
+                if row["finished_at"] is None:
+                    self._persisted_runs.add(key)
+                else:
+                    self._persisted_runs.discard(key)
+            self.stats["flushes"] += 1
+            self.stats["runs_inserted"] += len(inserts)
+            self.stats["runs_updated"] += len(updates)
+            self.stats["jobs_updated"] += len(started) + len(finished)
+        if self.on_flush is not None:
+            self.on_flush()
+        return len(inserts) + len(updates) + len(started) + len(finished) + len(next_runs)
+
+    def _loop(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._loop, name="automa-run-history", daemon=True)
+        self._thread.start()
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        self.flush()
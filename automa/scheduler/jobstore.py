@@ -0,0 +1,63 @@
+"""Durable job store: the ``job`` table itself.
+
+Schedules are not kept anywhere else. Every job waiting to run has
+``status`` in :data:`SCHEDULABLE_STATUSES` and a ``next_run_at`` timestamp,
+so after a restart the whole backlog is recovered with one query served by
+``ix_job_status_next_run_at`` and loaded into the timer in a single pass.
+
+Timer payloads are ``(agent_id, script_id, recurring_schedule, priority, owner_id)``.
+"""
+
+from datetime import datetime, timezone
+from typing import Iterator
+
+from sqlmodel import Session, select
+
+from ..domain.models import Job
+from .timer import JobTimer
+from .triggers import is_recurring
+
+
+SCHEDULABLE_STATUSES = ("pending", "scheduled")
+
+
+def _as_utc(value: datetime | None, fallback: datetime) -> datetime:
+    if value is None:
+        return fallback
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _legacy_run_at(schedule: str | None) -> datetime | None:
+    # Rows created before next_run_at existed kept the run date in `schedule`.
+    if not schedule:
+        return None
+    try:
+        return datetime.fromisoformat(schedule)
+    except ValueError:
+        return None
+
+
+def timer_payload(job: Job) -> tuple:
+    recurring = job.schedule if is_recurring(job.schedule) else None
+    return (job.agent_id, job.script_id, recurring, job.priority, job.owner_id)
+
+
+def iter_schedulable_jobs(session: Session) -> Iterator[tuple[int, datetime, tuple]]:
+    """Yield ``(job_id, run_at, payload)`` for every waiting job."""
+    now = datetime.now(timezone.utc)
+    stmt = select(
+        Job.id, Job.next_run_at, Job.schedule, Job.agent_id, Job.script_id, Job.priority, Job.owner_id
+    ).where(Job.status.in_(SCHEDULABLE_STATUSES))
+    for job_id, next_run_at, schedule, agent_id, script_id, priority, owner_id in session.exec(stmt):
+        recurring = schedule if is_recurring(schedule) else None
+        run_at = next_run_at
+        if run_at is None and recurring is None:
+            run_at = _legacy_run_at(schedule)
+        yield job_id, _as_utc(run_at, now), (agent_id, script_id, recurring, priority, owner_id)
+
+
+def rehydrate_jobs(session: Session, timer: JobTimer) -> int:
+    """Re-register all pending/scheduled jobs with ``timer``; returns the count."""
+    return timer.schedule_many(iter_schedulable_jobs(session))
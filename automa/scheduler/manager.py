@@ -1,112 +1,421 @@
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Iterable, Optional
 import logging
+import time
+import uuid
 
-from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import update
+from sqlmodel import select
 
-from ..core.db import get_session
-from ..domain.models import Job, Script
-from ..sandbox.docker_runner import run_script
+from ..core.artifacts import get_artifact_store
+from ..core.config import settings
+from ..core.db import engine, get_session
+from ..core.events import publish_job
+from ..core.metrics import JOB_RUN_DURATION, JOB_START_LAG, Gauge
+from ..core.versions import bump, get_versions
+from ..domain.models import Job, JobDependency, Script, Workflow
+from ..sandbox.docker_runner import RunResult, get_backend, run_script
+from ..sandbox.logs import open_run_log, run_log_path
+from ..sandbox.pool import get_pool, pool_enabled, shutdown_pool
+from .executor import DEFAULT_PRIORITY, ExecutionRequest, JobExecutor
+from .history import RunHistoryWriter
+from .jobstore import rehydrate_jobs, timer_payload
+from .timer import JobTimer
+from .triggers import is_recurring, next_fire_time, parse_schedule
+from .workflows import Transition, WorkflowEngine
 
 
-_scheduler: Optional[BackgroundScheduler] = None
+_scheduler: Optional[JobTimer] = None
+_executor: Optional[JobExecutor] = None
+_history: Optional[RunHistoryWriter] = None
+_workflows = WorkflowEngine()
 _logger = logging.getLogger(__name__)
 
+_NO_PAYLOAD = (None, None, None, DEFAULT_PRIORITY, None)
 
-def get_scheduler() -> BackgroundScheduler:
+# script id -> warm pool profile, valid for one version of the script table
+_script_profiles: dict[int, str] = {}
+_script_profiles_version = -1
+
+
+def _on_due(batch: list[tuple[int, float, tuple | None]]) -> None:
+    """Timer callback: dispatch due jobs and re-arm the recurring ones."""
+    now = datetime.now(timezone.utc)
+    rearm: list[tuple[int, datetime, tuple]] = []
+    for job_id, due_ts, payload in batch:
+        agent_id, script_id, schedule, priority, owner_id = payload or _NO_PAYLOAD
+        if schedule:
+            trigger = parse_schedule(schedule)
+            # Missed fires (e.g. downtime) are coalesced into this single run.
+            nxt = next_fire_time(trigger, max(datetime.fromtimestamp(due_ts, tz=timezone.utc), now))
+            if nxt is not None:
+                rearm.append((job_id, nxt, payload))
+        dispatch_job(job_id, agent_id, script_id, priority, owner_id, due_at=due_ts)
+    if rearm:
+        get_scheduler().schedule_many(rearm)
+        get_run_history().set_next_runs([(job_id, nxt) for job_id, nxt, _ in rearm])
+        for job_id, nxt, _ in rearm:
+            publish_job(job_id, next_run_at=nxt)
+
+
+def get_scheduler() -> JobTimer:
     global _scheduler
     if _scheduler is None:
-        _scheduler = BackgroundScheduler()
+        _scheduler = JobTimer(_on_due)
     return _scheduler
 
 
+def get_run_history() -> RunHistoryWriter:
+    global _history
+    if _history is None:
+        _history = RunHistoryWriter(
+            engine,
+            interval=settings.history_flush_interval_seconds,
+            batch_size=settings.history_batch_size,
+            on_flush=lambda: bump("job"),
+        )
+    return _history
+
+
+def _pending_by_profile() -> dict[str, int]:
+    """Queued jobs per warm pool profile, for the pool's pre-start target."""
+    global _script_profiles_version
+    waiting = get_executor().pending_by_script()
+    waiting.pop(None, None)  # no script, nothing to run
+    if not waiting:
+        return {}
+    version = get_versions().get("script")
+    if version != _script_profiles_version:
+        _script_profiles.clear()
+        _script_profiles_version = version
+    missing = [script_id for script_id in waiting if script_id not in _script_profiles]
+    if missing:
+        backend = get_backend()
+        with get_session(readonly=True) as session:
+            for script_id, path in session.exec(select(Script.id, Script.path).where(Script.id.in_(missing))):
+                _script_profiles[script_id] = backend.profile_for(path)
+    by_profile: dict[str, int] = {}
+    for script_id, count in waiting.items():
+        profile = _script_profiles.get(script_id)
+        if profile is not None:
+            by_profile[profile] = by_profile.get(profile, 0) + count
+    return by_profile
+
+
 def scheduler_start():
+    get_run_history().start()
     sched = get_scheduler()
     if not sched.running:
         sched.start()
+    if pool_enabled():
+        pool = get_pool()
+        pool.queue_depth = _pending_by_profile
+        pool.start()
+
+
+def scheduler_rehydrate() -> int:
+    """Load every pending/scheduled job from the DB into the timer."""
+    with get_session(readonly=True) as session:
+        count = rehydrate_jobs(session, get_scheduler())
+    _logger.info("Rehydrated %s scheduled jobs", count)
+    workflows = rehydrate_workflows()
+    if workflows:
+        _logger.info("Resumed %s running workflows", workflows)
+    return count
+
+
+def get_workflow_engine() -> WorkflowEngine:
+    return _workflows
+
+
+def rehydrate_workflows() -> int:
+    """Rebuild the dependency state of every running workflow from the DB."""
+    with get_session(readonly=True) as session:
+        workflow_ids = session.exec(select(Workflow.id).where(Workflow.status == "running")).all()
+        if not workflow_ids:
+            return 0
+        jobs = session.exec(
+            select(Job.workflow_id, Job.id, Job.status).where(
+                Job.workflow_id.in_(workflow_ids)
+            )
+        ).all()
+        edges = session.exec(
+            select(JobDependency.workflow_id, JobDependency.job_id, JobDependency.depends_on_id, JobDependency.policy)
+            .where(JobDependency.workflow_id.in_(workflow_ids))
+        ).all()
+    for workflow_id in workflow_ids:
+        if workflow_id in _workflows:
+            continue
+        apply_transition(
+            _workflows.add(
+                workflow_id,
+                [j[1:] for j in jobs if j[0] == workflow_id],
+                [e[1:] for e in edges if e[0] == workflow_id],
+            )
+        )
+    return len(workflow_ids)
+
+
+def apply_transition(t: Transition) -> None:
+    """Persist a workflow engine decision, then start the jobs it made ready."""
+    if not t:
+        return
+    now = datetime.now(timezone.utc)
+    ready = []
+    with engine.begin() as conn:
+        # only "waiting" rows: a job cancelled meanwhile stays cancelled
+        if t.ready:
+            ready = conn.execute(
+                update(Job)
+                .where(Job.id.in_(t.ready), Job.status == "waiting")
+                .values(status="scheduled", next_run_at=now)
+                .returning(Job.id, Job.agent_id, Job.script_id, Job.priority, Job.owner_id)
+            ).all()
+        if t.skipped:
+            conn.execute(update(Job).where(Job.id.in_(t.skipped), Job.status == "waiting").values(status="skipped"))
+        for workflow_id, status in t.finished:
+            conn.execute(
+                update(Workflow)
+                .where(Workflow.id == workflow_id, Workflow.status == "running")
+                .values(status=status, finished_at=now)
+            )
+    bump("job", *(["workflow"] if t.finished else []))
+    for job_id in t.skipped:
+        publish_job(job_id, status="skipped")
+    for job_id, *_ in ready:
+        publish_job(job_id, status="scheduled", next_run_at=now)
+    for row in ready:
+        dispatch_job(*row)
+    # jobs cancelled while waiting never run; settle them so the workflow still ends
+    for job_id in set(t.ready) - {row[0] for row in ready}:
+        apply_transition(_workflows.job_finished(job_id, None))
+
+
+def _on_job_start(req: ExecutionRequest) -> None:
+    JOB_START_LAG.observe(max(0.0, time.time() - req.due_at))
+
+
+def _on_job_done(job_id: int, status: object) -> None:
+    # executor completion callback: downstream jobs start right away
+    apply_transition(_workflows.job_finished(job_id, status if isinstance(status, str) else None))
+
+
+def get_executor() -> JobExecutor:
+    global _executor
+    if _executor is None:
+        _executor = JobExecutor(
+            execute_job,
+            max_workers=settings.executor_max_workers,
+            max_per_agent=settings.executor_max_per_agent,
+            max_per_script=settings.executor_max_per_script,
+            on_done=_on_job_done,
+            on_start=_on_job_start,
+            weights=settings.executor_class_weights,
+            max_wait=settings.executor_max_wait_seconds,
+        )
+    return _executor
+
+
+# read at scrape time; a stopped scheduler reports empty queues rather than starting one
+Gauge(
+    "automa_jobs_pending",
+    "Due jobs waiting for a worker, by priority class",
+    lambda: {(cls,): n for cls, n in _executor.pending_by_class().items()} if _executor is not None else {},
+    ("priority",),
+)
+Gauge("automa_jobs_running", "Jobs running now", lambda: _executor.running_count() if _executor is not None else 0)
+Gauge(
+    "automa_jobs_scheduled",
+    "Jobs armed in the timer, waiting for their due time",
+    lambda: len(_scheduler) if _scheduler is not None else 0,
+)
 
 
 def scheduler_shutdown():
+    global _executor
     sched = get_scheduler()
     if sched.running:
-        sched.shutdown(wait=False)
+        sched.shutdown()
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
+    shutdown_pool()
+    if _history is not None:
+        _history.shutdown()  # flushes whatever is still buffered
+
+
+def dispatch_job(
+    job_id: int,
+    agent_id: int | None = None,
+    script_id: int | None = None,
+    priority: str = DEFAULT_PRIORITY,
+    owner_id: int | None = None,
+    due_at: float | None = None,
+) -> None:
+    """Hand a due job to the execution engine; the scheduler thread returns at once."""
+    req = ExecutionRequest(job_id=job_id, agent_id=agent_id, script_id=script_id, priority=priority, owner_id=owner_id)
+    if due_at is not None:
+        req.due_at = due_at
+    get_executor().submit(req)
+
 
+def _settled_status(recurring: bool, outcome: str) -> str:
+    # A recurring job goes back to waiting for its next fire; the outcome of
+    # the run stays visible through last_exit_code / last_error. Cancellation
+    # that happens mid-run is preserved by the history writer.
+    return "scheduled" if recurring else outcome
 
-def execute_job(job_id: int) -> None:
-    """Run the job inside the sandbox and persist execution metadata."""
+
+def _exit_error(exit_code: int, result: RunResult | None) -> str:
+    message = f"Exit code {exit_code}"
+    tail = result.stderr_tail.strip() if result is not None else ""
+    if tail:
+        message += ": " + tail.splitlines()[-1][:500]
+    return message
+
+
+def execute_job(job_id: int) -> str | None:
+    """Run the job inside the sandbox and record the run.
+
+    The only database round trip on the worker is the initial read (plus
+    one write if the run left artifacts); state transitions go through the
+    write-behind run history. Returns the run status, or None when the job
+    was not run.
+    """
     now = datetime.now(timezone.utc)
 
-    script_path: str | None = None
-    with get_session() as session:
-        job = session.get(Job, job_id)
-        if job is None:
-            _logger.warning("Attempted to execute missing job %s", job_id)
-            return
-
-        job.status = "running"
-        job.last_error = None
-        session.add(job)
-        session.commit()
-
-        if job.script_id is None:
-            job.status = "failed"
-            job.last_run_at = now
-            job.last_exit_code = None
-            job.last_error = "No script linked to job"
-            session.add(job)
-            session.commit()
-            return
-
-        script = session.get(Script, job.script_id)
-        if script is None:
-            job.status = "failed"
-            job.last_run_at = now
-            job.last_exit_code = None
-            job.last_error = "Script not found"
-            session.add(job)
-            session.commit()
-            return
-
-        script_path = script.path
-
-    exit_code = 1
+    with get_session(readonly=True) as session:
+        row = session.exec(
+            select(Job, Script).join(Script, Job.script_id == Script.id, isouter=True).where(Job.id == job_id)
+        ).first()
+    if row is None:
+        _logger.warning("Attempted to execute missing job %s", job_id)
+        return None
+    job, script = row
+    if job.status == "cancelled":
+        _logger.info("Skipping cancelled job %s", job_id)
+        return None
+    recurring = is_recurring(job.schedule)
+
+    history = get_run_history()
+    run_key = uuid.uuid4().hex
+    # the path is known up front, so the log can be followed while the run is in progress
+    has_script = job.script_id is not None and script is not None
+    history.run_started(run_key, job_id, now, log_path=str(run_log_path(job_id, now)) if has_script else None)
+    publish_job(job_id, status="running")
+
+    if not has_script:
+        error = "No script linked to job" if job.script_id is None else "Script not found"
+        job_status = _settled_status(recurring, "failed")
+        history.run_finished(
+            run_key,
+            job_id,
+            status="failed",
+            job_status=job_status,
+            started_at=now,
+            finished_at=now,
+            error=error,
+        )
+        publish_job(job_id, status=job_status, last_run_at=now, last_exit_code=None, last_error=error)
+        return "failed"
+
+    result: RunResult | None = None
     error_message: str | None = None
+    sink = None
+    output_dir = None
     try:
-        assert script_path is not None  # for type checkers; guarded above
-        exit_code = run_script(script_path, args=None)
-    except Exception as exc:  # pragma: no cover - just in case sandbox explodes
+        sink = open_run_log(job_id, now)
+        if settings.artifacts_enabled:
+            output_dir = get_artifact_store().output_dir(run_key)
+        result = run_script(
+            script.path, args=None, log_sink=sink, output_dir=str(output_dir) if output_dir is not None else None
+        )
+    except Exception as exc:
         error_message = str(exc)
         _logger.exception("Job %s failed during sandbox execution", job_id)
+    finally:
+        if sink is not None:
+            sink.close()
+    if output_dir is not None:
+        # before the run is reported finished, so its artifacts are there when it is
+        try:
+            get_artifact_store().ingest(engine, job_id, run_key, output_dir)
+        except Exception:
+            _logger.exception("Could not store artifacts of job %s", job_id)
 
-    with get_session() as session:
-        job = session.get(Job, job_id)
-        if job is None:
-            _logger.warning("Job %s disappeared before completion update", job_id)
-            return
+    exit_code = result.exit_code if result is not None else 1
+    if result is not None:
+        _logger.info(
+            "Job %s exited with %s in %.3fs (stdout=%sB stderr=%sB)",
+            job_id,
+            exit_code,
+            result.duration_seconds,
+            result.stdout_bytes,
+            result.stderr_bytes,
+        )
+        if result.timed_out:
+            error_message = f"Timed out after {result.duration_seconds:.0f}s"
 
-        job.last_run_at = now
-        job.last_exit_code = exit_code
-        if exit_code == 0 and error_message is None:
-            job.status = "succeeded"
-            job.last_error = None
-        else:
-            job.status = "failed"
-            job.last_error = error_message or f"Exit code {exit_code}"
+    if exit_code == 0 and error_message is None:
+        status = "succeeded"
+    else:
+        status = "failed"
+        error_message = error_message or _exit_error(exit_code, result)
 
-        session.add(job)
-        session.commit()
+    if result is not None:
+        JOB_RUN_DURATION.labels(status).observe(result.duration_seconds)
+    job_status = _settled_status(recurring, status)
+    finished_at = datetime.now(timezone.utc)
+    history.run_finished(
+        run_key,
+        job_id,
+        status=status,
+        job_status=job_status,
+        started_at=now,
+        finished_at=finished_at,
+        exit_code=exit_code,
+        error=error_message,
+        stdout_bytes=result.stdout_bytes if result is not None else None,
+        stderr_bytes=result.stderr_bytes if result is not None else None,
+        duration_ms=round(result.duration_seconds * 1000) if result is not None else None,
+        log_path=str(sink.path) if sink is not None else None,
+    )
+    publish_job(job_id, status=job_status, last_run_at=now, last_exit_code=exit_code, last_error=error_message)
+    return status
 
 
-def scheduler_add_once(job_id: int, when: datetime | None):
-    sched = get_scheduler()
+def scheduler_add_once(
+    job_id: int,
+    when: datetime | None,
+    agent_id: int | None = None,
+    script_id: int | None = None,
+    priority: str = DEFAULT_PRIORITY,
+    owner_id: int | None = None,
+):
     run_date = when or datetime.now(timezone.utc)
     if run_date.tzinfo is None:
         run_date = run_date.replace(tzinfo=timezone.utc)
-    sched.add_job(
-        execute_job,
-        "date",
-        run_date=run_date,
-        args=[job_id],
-        id=f"job-{job_id}",
-        replace_existing=True,
-    )
+    get_scheduler().schedule(job_id, run_date, (agent_id, script_id, None, priority, owner_id))
+
+
+def scheduler_add_recurring(
+    job_id: int,
+    schedule: str,
+    first_run: datetime,
+    agent_id: int | None = None,
+    script_id: int | None = None,
+    priority: str = DEFAULT_PRIORITY,
+    owner_id: int | None = None,
+):
+    """Register a cron/interval job; the timer re-arms it after every fire."""
+    parse_schedule(schedule)  # fail fast on invalid expressions
+    get_scheduler().schedule(job_id, first_run, (agent_id, script_id, schedule, priority, owner_id))
+
+
+def scheduler_add_many(jobs: Iterable[Job]) -> int:
+    """Register saved jobs at their ``next_run_at`` in one timer pass."""
+    return get_scheduler().schedule_many((job.id, job.next_run_at, timer_payload(job)) for job in jobs)
+
+
+def scheduler_cancel(job_id: int) -> bool:
+    return get_scheduler().cancel(job_id)
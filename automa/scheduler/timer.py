@@ -0,0 +1,160 @@
+"""Heap-based timer that fires scheduled jobs at their due time.
+
+A single thread sleeps until the earliest entry is due, so the wake-up cost
+does not depend on how many jobs are scheduled. Entries can be added in bulk
+(``schedule_many`` heapifies once), which keeps startup rehydration of large
+backlogs linear instead of one sorted insert per job.
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Optional
+import heapq
+import logging
+import threading
+import time
+
+
+_logger = logging.getLogger(__name__)
+
+# Upper bound for a single sleep, so wall-clock adjustments are picked up.
+_MAX_WAIT_SECONDS = 30.0
+
+
+def _timestamp(when: datetime) -> float:
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+class JobTimer:
+    """Min-heap of ``(due_ts, seq, key, payload)`` entries.
+
+    Rescheduling or cancelling a key is lazy: the old heap entry stays in
+    place and is skipped when popped, because ``_live`` no longer maps the
+    key to its sequence number. Everything due at a wake-up is handed to the
+    callback as one batch of ``(key, due_ts, payload)`` tuples.
+    """
+
+    def __init__(self, callback: Callable[[list[tuple[int, float, Any]]], None]) -> None:
+        self._callback = callback
+        self._heap: list[tuple[float, int, int, Any]] = []
+        self._live: dict[int, int] = {}
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._live)
+
+    def __contains__(self, key: int) -> bool:
+        with self._cond:
+            return key in self._live
+
+    # -- scheduling ----------------------------------------------------
+    def _push(self, key: int, ts: float, payload: Any) -> tuple:
+        self._seq += 1
+        self._live[key] = self._seq
+        return (ts, self._seq, key, payload)
+
+    def schedule(self, key: int, when: datetime, payload: Any = None) -> None:
+        """Schedule ``key`` at ``when``; replaces an existing entry for the key."""
+        with self._cond:
+            entry = self._push(key, _timestamp(when), payload)
+            heapq.heappush(self._heap, entry)
+            self._maybe_compact()
+            if self._heap[0] is entry:
+                self._cond.notify()
+
+    def schedule_many(self, items: Iterable[tuple[int, datetime, Any]]) -> int:
+        """Bulk-schedule ``(key, when, payload)`` items with a single heapify."""
+        with self._cond:
+            entries = [self._push(key, _timestamp(when), payload) for key, when, payload in items]
+            if not entries:
+                return 0
+            if len(entries) > len(self._heap) // 8:
+                # large batch (e.g. startup): O(n) heapify beats k log n pushes
+                self._heap.extend(entries)
+                heapq.heapify(self._heap)
+            else:
+                for entry in entries:
+                    heapq.heappush(self._heap, entry)
+            self._maybe_compact()
+            self._cond.notify()
+            return len(entries)
+
+    def cancel(self, key: int) -> bool:
+        with self._cond:
+            return self._live.pop(key, None) is not None
+
+    def next_fire_time(self) -> Optional[datetime]:
+        with self._cond:
+            self._drop_stale_head()
+            if not self._heap:
+                return None
+            return datetime.fromtimestamp(self._heap[0][0], tz=timezone.utc)
+
+    def _drop_stale_head(self) -> None:
+        while self._heap and self._live.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def _maybe_compact(self) -> None:
+        # Rebuild once stale entries dominate, so memory tracks live jobs.
+        if len(self._heap) > 2 * len(self._live) + 1024:
+            self._heap = [e for e in self._heap if self._live.get(e[2]) == e[1]]
+            heapq.heapify(self._heap)
+
+    # -- lifecycle -----------------------------------------------------
+    def start(self) -> None:
+        with self._cond:
+            if self.running:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._loop, name="automa-timer", daemon=True)
+            self._thread.start()
+
+    def shutdown(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        thread = self._thread
+        # The loop wakes up immediately; join so a later start() never races it.
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self._thread = None
+
+    def _pop_due(self) -> list[tuple[int, float, Any]]:
+        now = time.time()
+        due: list[tuple[int, float, Any]] = []
+        while self._heap and self._heap[0][0] <= now:
+            ts, seq, key, payload = heapq.heappop(self._heap)
+            if self._live.get(key) == seq:
+                del self._live[key]
+                due.append((key, ts, payload))
+        return due
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped:
+                    self._drop_stale_head()
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    delay = self._heap[0][0] - time.time()
+                    if delay <= 0:
+                        break
+                    self._cond.wait(min(delay, _MAX_WAIT_SECONDS))
+                if self._stopped:
+                    return
+                due = self._pop_due()
+            if due:
+                try:
+                    self._callback(due)
+                except Exception:
+                    _logger.exception("Timer callback failed for %s due jobs", len(due))
@@ -0,0 +1,76 @@
+"""Recurring schedule expressions for ``Job.schedule``.
+
+Supported forms:
+
+- 5-field crontab, e.g. ``*/5 * * * *`` (evaluated in UTC)
+- shortcuts ``@hourly``, ``@daily``, ``@weekly``, ``@monthly``
+- fixed intervals ``@every 30s`` / ``@every 1h30m`` (units ``s``, ``m``, ``h``, ``d``)
+
+Expressions are parsed once and cached, so firing a recurring job only costs
+a next-fire-time computation. APScheduler's triggers do the calendar math.
+"""
+
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import re
+
+from apscheduler.triggers.base import BaseTrigger
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+
+_SHORTCUTS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+}
+_INTERVAL_RE = re.compile(r"^@every\s+((?:\d+[smhd])+)$")
+_INTERVAL_PART_RE = re.compile(r"(\d+)([smhd])")
+_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+_MIN_INTERVAL = timedelta(seconds=1)
+
+
+@lru_cache(maxsize=4096)
+def parse_schedule(expr: str) -> BaseTrigger:
+    """Parse a recurring schedule expression; raises ValueError when invalid."""
+    text = " ".join(expr.split())
+    if not text:
+        raise ValueError("Empty schedule expression")
+    text = _SHORTCUTS.get(text.lower(), text)
+
+    match = _INTERVAL_RE.match(text.lower())
+    if match:
+        parts: dict[str, int] = {}
+        for amount, unit in _INTERVAL_PART_RE.findall(match.group(1)):
+            key = _UNITS[unit]
+            parts[key] = parts.get(key, 0) + int(amount)
+        if timedelta(**parts) < _MIN_INTERVAL:
+            raise ValueError("Interval must be at least 1 second")
+        return IntervalTrigger(timezone=timezone.utc, **parts)
+    if text.startswith("@"):
+        raise ValueError(f"Unknown schedule shortcut {text!r}")
+    return CronTrigger.from_crontab(text, timezone=timezone.utc)
+
+
+def is_recurring(expr: str | None) -> bool:
+    if not expr:
+        return False
+    expr = expr.strip()
+    if " " not in expr and not expr.startswith("@"):
+        # one-off ISO timestamps (the legacy meaning of Job.schedule)
+        return False
+    try:
+        parse_schedule(expr)
+    except ValueError:
+        return False
+    return True
+
+
+def next_fire_time(trigger: BaseTrigger, after: datetime) -> datetime | None:
+    """First fire time strictly after ``after`` (None if the trigger is exhausted)."""
+    if after.tzinfo is None:
+        after = after.replace(tzinfo=timezone.utc)
+    if isinstance(trigger, IntervalTrigger):
+        return after + trigger.interval
+    return trigger.get_next_fire_time(after, after)
@@ -0,0 +1,175 @@
+"""Dependency tracking for workflows (DAGs of jobs).
+
+A workflow is a set of jobs plus ``JobDependency`` edges between them. Jobs
+without upstream edges are scheduled like any other job; the rest wait in
+status ``waiting``. :class:`WorkflowEngine` keeps the graph of every active
+workflow in memory and is told about each finished run by the executor's
+completion callback. As soon as the last upstream job of a node settles, the
+node is decided: it runs if every incoming edge's policy accepts the
+upstream outcome, otherwise it is ``skipped``, which settles it in turn. So
+independent branches run in parallel and each node starts the moment its
+inputs are ready, without any polling.
+
+Edge policies (what the upstream outcome must be for the downstream job to run):
+
+* ``on_success`` (default): the upstream job succeeded;
+* ``on_failure``: the upstream job failed (clean-up, alerting);
+* ``always``: any outcome, including skipped or cancelled.
+
+The engine only decides; the caller persists the returned
+:class:`Transition` and dispatches its ready jobs.
+"""
+
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+import threading
+
+
+POLICIES = {
+    "on_success": frozenset({"succeeded"}),
+    "on_failure": frozenset({"failed"}),
+    "always": frozenset({"succeeded", "failed", "skipped", "cancelled"}),
+}
+TERMINAL_STATUSES = ("succeeded", "failed", "skipped", "cancelled")
+
+
+@dataclass(slots=True)
+class _Node:
+    workflow_id: int
+    job_id: int
+    waiting: bool  # not yet decided; False once dispatched (or scheduled at creation)
+    outcome: Optional[str] = None
+    upstream: dict[int, str] = field(default_factory=dict)  # job_id -> policy
+    downstream: list[int] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class _Run:
+    job_ids: list[int]
+    remaining: int
+    failed: bool = False
+
+
+@dataclass(slots=True)
+class Transition:
+    ready: list[int] = field(default_factory=list)
+    skipped: list[int] = field(default_factory=list)
+    finished: list[tuple[int, str]] = field(default_factory=list)  # (workflow_id, status)
+
+    def __bool__(self) -> bool:
+        return bool(self.ready or self.skipped or self.finished)
+
+
+class WorkflowEngine:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._nodes: dict[int, _Node] = {}
+        self._runs: dict[int, _Run] = {}
+
+    def __contains__(self, workflow_id: int) -> bool:
+        with self._lock:
+            return workflow_id in self._runs
+
+    def add(
+        self,
+        workflow_id: int,
+        jobs: Iterable[tuple[int, str]],
+        edges: Iterable[tuple[int, int, str]],
+    ) -> Transition:
+        """Track a workflow from ``(job_id, status)`` and
+        ``(job_id, depends_on_id, policy)``; also used to reload it after a restart.
+        """
+        t = Transition()
+        with self._lock:
+            nodes = {}
+            for job_id, status in jobs:
+                terminal = status in TERMINAL_STATUSES
+                nodes[job_id] = _Node(
+                    workflow_id, job_id, waiting=status == "waiting", outcome=status if terminal else None
+                )
+            for job_id, depends_on_id, policy in edges:
+                nodes[job_id].upstream[depends_on_id] = policy
+                nodes[depends_on_id].downstream.append(job_id)
+            run = _Run(list(nodes), remaining=sum(n.outcome is None for n in nodes.values()))
+            run.failed = any(n.outcome == "failed" for n in nodes.values())
+            self._nodes.update(nodes)
+            self._runs[workflow_id] = run
+            # upstream jobs may have settled while nobody was tracking them
+            skipped: list[_Node] = []
+            for node in nodes.values():
+                self._visit(node, t, skipped)
+            self._settle(skipped, t)
+            self._maybe_finish(workflow_id, t)
+        return t
+
+    def job_finished(self, job_id: int, status: Optional[str]) -> Transition:
+        """Record the outcome of a run (``None``: the job was not run)."""
+        t = Transition()
+        with self._lock:
+            node = self._nodes.get(job_id)
+            if node is None or node.outcome is not None:
+                return t  # not part of an active workflow
+            node.outcome = status if status in ("succeeded", "failed") else "cancelled"
+            node.waiting = False  # a job cancelled while waiting is decided already
+            self._settle([node], t)
+            self._maybe_finish(node.workflow_id, t)
+        return t
+
+    def cancel(self, workflow_id: int) -> bool:
+        """Stop tracking a workflow; returns False if it was not active."""
+        with self._lock:
+            return self._forget(workflow_id)
+
+    # -- internals (called with the lock held) -------------------------
+    def _decide(self, node: _Node) -> Optional[str]:
+        """``"ready"`` or ``"skipped"`` for a waiting node whose upstream jobs
+        have all settled; None while it has to wait."""
+        if not node.waiting:
+            return None
+        outcomes = [(self._nodes[up].outcome, policy) for up, policy in node.upstream.items()]
+        if any(outcome is None for outcome, _ in outcomes):
+            return None
+        node.waiting = False
+        if all(outcome in POLICIES[policy] for outcome, policy in outcomes):
+            return "ready"
+        node.outcome = "skipped"
+        return "skipped"
+
+    def _visit(self, node: _Node, t: Transition, skipped: list[_Node]) -> None:
+        decision = self._decide(node)
+        if decision == "ready":
+            t.ready.append(node.job_id)
+        elif decision == "skipped":
+            skipped.append(node)
+
+    def _settle(self, settled: list[_Node], t: Transition) -> None:
+        # iterative, so long chains of skipped nodes don't hit the recursion limit
+        stack = list(settled)
+        while stack:
+            node = stack.pop()
+            run = self._runs[node.workflow_id]
+            run.remaining -= 1
+            if node.outcome == "failed":
+                run.failed = True
+            elif node.outcome == "skipped":
+                t.skipped.append(node.job_id)
+            for child_id in node.downstream:
+                self._visit(self._nodes[child_id], t, stack)
+
+    def _maybe_finish(self, workflow_id: int, t: Transition) -> None:
+        run = self._runs.get(workflow_id)
+        if run is not None and run.remaining == 0:
+            t.finished.append((workflow_id, "failed" if run.failed else "succeeded"))
+            self._forget(workflow_id)
+
+    def _forget(self, workflow_id: int) -> bool:
+        run = self._runs.pop(workflow_id, None)
+        if run is None:
+            return False
+        for job_id in run.job_ids:
+            self._nodes.pop(job_id, None)
+        return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"workflows": len(self._runs), "jobs": len(self._nodes)}
@@ -0,0 +1,55 @@
+// Live job list: applies server-sent deltas from /ui/stream/jobs to #jobs-list
+// instead of re-fetching the whole partial.
+(function () {
+  if (!window.EventSource) return;
+
+  // event field -> data-* attribute (dataset key)
+  const FIELDS = { status: 'status', next_run_at: 'nextRunAt', last_run_at: 'lastRunAt' };
+
+  function render(li) {
+    const d = li.dataset;
+    let text = `${d.id} — status=${d.status}`;
+    if (d.status === 'scheduled' && d.nextRunAt) text += ` — next=${d.nextRunAt}`;
+    if (d.lastRunAt) text += ` — last=${d.lastRunAt}`;
+    li.textContent = text;
+  }
+
+  function apply(ev) {
+    const list = document.querySelector('#jobs-list ul');
+    if (!list) return;
+    let li = document.getElementById(`job-${ev.id}`);
+    if (!li) {
+      // only new jobs are added; older ones outside the listed page are ignored
+      const first = list.querySelector('li[data-id]');
+      if (first && Number(first.dataset.id) > ev.id) return;
+      const empty = list.querySelector('li.warn');
+      if (empty) empty.remove();
+      li = document.createElement('li');
+      li.id = `job-${ev.id}`;
+      li.dataset.id = ev.id;
+      list.prepend(li);
+    }
+    for (const [key, attr] of Object.entries(FIELDS)) {
+      if (!(key in ev)) continue;
+      if (ev[key] === null) delete li.dataset[attr];
+      else li.dataset[attr] = ev[key];
+    }
+    render(li);
+  }
+
+  function resync() {
+    if (document.getElementById('jobs-list')) {
+      htmx.ajax('GET', '/ui/partials/jobs', { target: '#jobs-list', swap: 'outerHTML' });
+    }
+  }
+
+  let connected = false;
+  const source = new EventSource('/ui/stream/jobs');
+  source.addEventListener('job', (e) => apply(JSON.parse(e.data)));
+  source.addEventListener('resync', resync);
+  source.addEventListener('open', () => {
+    // deltas sent while we were reconnecting are lost
+    if (connected) resync();
+    connected = true;
+  });
+})();
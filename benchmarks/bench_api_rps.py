@@ -0,0 +1,105 @@
+"""API throughput benchmark.
+
+Runs the app in-process (httpx ASGI transport) against a throw-away SQLite
+database seeded with agents, scripts and jobs, and drives read endpoints
+with ``--concurrency`` concurrent clients for ``--seconds``. Prints
+requests per second and latency percentiles per endpoint mix.
+
+    python -m benchmarks.bench_api_rps --concurrency 64 --seconds 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ENDPOINTS = (
+    "/api/v1/jobs?limit=50",
+    "/api/v1/agents",
+    "/api/v1/scripts",
+    "/api/v1/users/me",
+)
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _run(args) -> tuple[int, float, list[float], int]:
+    import httpx
+    from sqlalchemy import insert
+
+    from automa.api.app import app
+    from automa.core.db import dispose_async_engines, engine, get_session, init_db
+    from automa.core.hashing import shutdown_hasher
+    from automa.domain.models import Agent, Job, Script
+    from automa.domain.repo import ensure_bootstrap_admin
+
+    init_db()
+    with get_session() as session:
+        ensure_bootstrap_admin(session)
+    with engine.begin() as conn:
+        conn.execute(insert(Agent), [{"name": f"agent-{i}", "status": "idle"} for i in range(50)])
+        conn.execute(insert(Script), [{"name": f"script-{i}", "path": "scripts/dummy.py"} for i in range(50)])
+        conn.execute(insert(Job), [{"status": "succeeded", "script_id": 1 + i % 50} for i in range(args.jobs)])
+
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        r = await client.post("/api/v1/auth/token", data={"username": "admin@example.com", "password": "admin"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        latencies: list[float] = []
+        errors = 0
+        deadline = time.perf_counter() + args.seconds
+
+        async def worker(offset: int) -> None:
+            nonlocal errors
+            i = offset
+            while time.perf_counter() < deadline:
+                path = ENDPOINTS[i % len(ENDPOINTS)]
+                i += 1
+                t0 = time.perf_counter()
+                resp = await client.get(path, headers=headers)
+                latencies.append((time.perf_counter() - t0) * 1000)
+                if resp.status_code != 200:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+    # pooled aiosqlite connections run on their own threads; close them
+    await dispose_async_engines()
+    shutdown_hasher()
+    return len(latencies), elapsed, latencies, errors
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--jobs", type=int, default=5000, help="jobs to seed")
+    parser.add_argument("--min-rps", type=float, default=0.0, help="fail below this throughput")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # configure before the app (and its settings/engine) is imported
+        os.environ["AUTOMA_SQLITE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["AUTOMA_DISABLE_SCHED"] = "1"
+        count, elapsed, latencies, errors = asyncio.run(_run(args))
+
+    rps = count / elapsed
+    ok = errors == 0 and rps >= args.min_rps
+    print(
+        f"api rps: concurrency={args.concurrency} requests={count} errors={errors} "
+        f"rps={rps:,.0f} p50={_percentile(latencies, 50):.1f}ms p99={_percentile(latencies, 99):.1f}ms "
+        f"-> {'OK' if ok else 'FAIL'}"
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
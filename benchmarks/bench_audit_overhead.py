@@ -0,0 +1,128 @@
+"""Audit overhead benchmark.
+
+Drives a write-heavy mix (``POST /api/v1/agents`` alternating with
+``GET /api/v1/agents``) in-process with auditing off and on, each in a fresh
+interpreter against its own throw-away database (production SQLite profile
+unless ``AUTOMA_SQLITE_PROFILE`` says otherwise). Rounds alternate between
+the two modes and the median requests per second of each is compared.
+Fails when the overhead exceeds ``--max-overhead`` percent.
+
+    python -m benchmarks.bench_audit_overhead --concurrency 16 --seconds 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+async def _run(args) -> dict:
+    import httpx
+
+    from automa.api.app import app
+    from automa.core.audit import get_audit_writer, shutdown_audit_writer
+    from automa.core.config import settings
+    from automa.core.db import dispose_async_engines, get_session, init_db
+    from automa.core.hashing import shutdown_hasher
+    from automa.domain.repo import ensure_bootstrap_admin
+
+    init_db()
+    with get_session() as session:
+        ensure_bootstrap_admin(session)
+    if settings.audit_enabled:
+        get_audit_writer().start()
+
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        r = await client.post("/api/v1/auth/token", data={"username": "admin@example.com", "password": "admin"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        count = errors = 0
+        deadline = time.perf_counter() + args.seconds
+
+        async def worker(n: int) -> None:
+            nonlocal count, errors
+            i = 0
+            while time.perf_counter() < deadline:
+                if i % 2:
+                    resp = await client.get("/api/v1/agents?limit=20", headers=headers)
+                else:
+                    resp = await client.post("/api/v1/agents", json={"name": f"bench-{n}-{i}"}, headers=headers)
+                i += 1
+                count += 1
+                if resp.status_code != 200:
+                    errors += 1
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    shutdown_audit_writer()
+    stats = dict(get_audit_writer().stats)
+    shutdown_hasher()
+    await dispose_async_engines()
+    return {"requests": count, "errors": errors, "rps": count / elapsed, "audit": stats}
+
+
+def _child(args) -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["AUTOMA_SQLITE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["AUTOMA_DISABLE_SCHED"] = "1"
+        os.environ.setdefault("AUTOMA_SQLITE_PROFILE", "production")
+        print(json.dumps(asyncio.run(_run(args))))
+    return 0
+
+
+def _measure(args, enabled: bool) -> dict:
+    env = {**os.environ, "AUTOMA_AUDIT_ENABLED": "1" if enabled else "0"}
+    if args.reads:
+        env["AUTOMA_AUDIT_READS"] = "1"
+    cmd = [
+        sys.executable, "-m", "benchmarks.bench_audit_overhead", "--child",
+        "--concurrency", str(args.concurrency), "--seconds", str(args.seconds),
+    ]
+    out = subprocess.run(cmd, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rounds", type=int, default=3, help="runs per mode")
+    parser.add_argument("--reads", action="store_true", help="audit GET requests too")
+    parser.add_argument("--max-overhead", type=float, default=10.0, help="percent")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        return _child(args)
+
+    runs: dict[bool, list[dict]] = {False: [], True: []}
+    for _ in range(args.rounds):
+        for enabled in (False, True):
+            runs[enabled].append(_measure(args, enabled))
+    off_rps = statistics.median(r["rps"] for r in runs[False])
+    on_rps = statistics.median(r["rps"] for r in runs[True])
+    overhead = (off_rps - on_rps) / off_rps * 100
+    errors = sum(r["errors"] for rs in runs.values() for r in rs)
+    ok = errors == 0 and overhead <= args.max_overhead
+    written = sum(r["audit"]["written"] for r in runs[True])
+    dropped = sum(r["audit"]["dropped"] for r in runs[True])
+    samples = {enabled: ", ".join(f"{r['rps']:.0f}" for r in rs) for enabled, rs in runs.items()}
+    print(f"audit off: rounds={args.rounds} median rps={off_rps:,.0f} ({samples[False]})")
+    print(
+        f"audit on:  rounds={args.rounds} median rps={on_rps:,.0f} ({samples[True]}) "
+        f"written={written} dropped={dropped} errors={errors}"
+    )
+    print(f"overhead={overhead:.1f}% (max {args.max_overhead:.0f}%) -> {'OK' if ok else 'FAIL'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
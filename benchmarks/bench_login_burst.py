@@ -0,0 +1,123 @@
+"""Login burst benchmark.
+
+Fires a burst of concurrent logins at the app (in-process, via httpx's ASGI
+transport) while probing non-auth endpoints, and reports probe latency
+percentiles while idle and during the burst. Exits with a non-zero status
+when the p99 during the burst exceeds the budget.
+
+    python -m benchmarks.bench_login_burst --logins 64 --executor process --budget 250
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+PROBES = ("/api/v1/health", "/api/v1/jobs?limit=20")
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def _probe(client, stop: asyncio.Event, out: list[float], interval: float) -> None:
+    while not stop.is_set():
+        for path in PROBES:
+            t0 = time.perf_counter()
+            r = await client.get(path)
+            out.append((time.perf_counter() - t0) * 1000)
+            assert r.status_code == 200, r.text
+        await asyncio.sleep(interval)
+
+
+async def _run(args) -> tuple[list[float], list[float], dict, float]:
+    import httpx
+
+    from automa.api.app import app
+    from automa.core.db import dispose_async_engines, get_session, init_db
+    from automa.core.hashing import get_hasher, shutdown_hasher
+    from automa.domain.repo import ensure_bootstrap_admin
+
+    init_db()
+    with get_session() as session:
+        ensure_bootstrap_admin(session)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        idle: list[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, stop, idle, args.interval))
+        await asyncio.sleep(args.idle_seconds)
+        stop.set()
+        await probe
+
+        async def login():
+            r = await client.post(
+                "/api/v1/auth/token",
+                data={"username": "admin@example.com", "password": "admin"},
+            )
+            return r.status_code
+
+        burst: list[float] = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(_probe(client, stop, burst, args.interval))
+        t0 = time.perf_counter()
+        codes = await asyncio.gather(*(login() for _ in range(args.logins)))
+        burst_seconds = time.perf_counter() - t0
+        stop.set()
+        await probe
+        stats = get_hasher().stats()
+    shutdown_hasher()
+    await dispose_async_engines()
+
+    status_counts: dict = {}
+    for code in codes:
+        status_counts[code] = status_counts.get(code, 0) + 1
+    stats["status_codes"] = status_counts
+    return idle, burst, stats, burst_seconds
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--executor", choices=("process", "thread"), default="process")
+    parser.add_argument("--workers", type=int, default=0, help="hashing workers (0 = settings default)")
+    parser.add_argument("--interval", type=float, default=0.01, help="pause between probe rounds, seconds")
+    parser.add_argument("--idle-seconds", type=float, default=1.0)
+    parser.add_argument("--budget", type=float, default=250.0, help="p99 probe latency during the burst, ms")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # configure before the app (and its settings/engine) is imported
+        os.environ["AUTOMA_SQLITE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ["AUTOMA_DISABLE_SCHED"] = "1"
+        os.environ["AUTOMA_PASSWORD_HASH_EXECUTOR"] = args.executor
+        os.environ.setdefault("AUTOMA_PASSWORD_HASH_MAX_PENDING", str(max(args.logins, 1)))
+        if args.workers:
+            os.environ["AUTOMA_PASSWORD_HASH_WORKERS"] = str(args.workers)
+        idle, burst, stats, burst_seconds = asyncio.run(_run(args))
+
+    p99 = _percentile(burst, 99)
+    ok = p99 <= args.budget
+    print(
+        f"login burst: logins={args.logins} executor={stats['kind']} workers={stats['workers']} "
+        f"took={burst_seconds:.2f}s responses={stats['status_codes']}"
+    )
+    print(
+        f"  idle  probes={len(idle)} p50={statistics.median(idle):.1f}ms p99={_percentile(idle, 99):.1f}ms"
+    )
+    print(
+        f"  burst probes={len(burst)} p50={statistics.median(burst):.1f}ms p99={p99:.1f}ms "
+        f"budget={args.budget:.0f}ms -> {'OK' if ok else 'FAIL'}"
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
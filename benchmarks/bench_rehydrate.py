@@ -0,0 +1,67 @@
+"""Startup rehydration benchmark.
+
+Fills a throw-away SQLite database with N pending/scheduled jobs and measures
+how long ``rehydrate_jobs`` takes to load them into the timer. Exits with a
+non-zero status when the time budget is exceeded.
+
+    python -m benchmarks.bench_rehydrate --jobs 100000 --budget 3
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
+from sqlmodel import Session, SQLModel, create_engine
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=100_000)
+    parser.add_argument("--budget", type=float, default=3.0, help="seconds")
+    args = parser.parse_args(argv)
+
+    from automa.domain.models import Job
+    from automa.scheduler.jobstore import rehydrate_jobs
+    from automa.scheduler.timer import JobTimer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        SQLModel.metadata.create_all(engine)
+
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "status": "scheduled" if i % 4 else "pending",
+                "next_run_at": now + timedelta(seconds=3600 + i % 7200),
+                "script_id": None,
+            }
+            for i in range(args.jobs)
+        ]
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            conn.execute(insert(Job), rows)
+            # noise the query must skip via the status index
+            conn.execute(insert(Job), [{"status": "succeeded"} for _ in range(args.jobs // 10)])
+        fill = time.perf_counter() - t0
+
+        timer = JobTimer(lambda batch: None)
+        t0 = time.perf_counter()
+        with Session(engine) as session:
+            count = rehydrate_jobs(session, timer)
+        elapsed = time.perf_counter() - t0
+        engine.dispose()
+
+    ok = count == args.jobs and elapsed <= args.budget
+    print(
+        f"rehydrate: jobs={count} fill={fill:.2f}s elapsed={elapsed:.3f}s "
+        f"budget={args.budget:.1f}s rate={count / elapsed:,.0f} jobs/s -> {'OK' if ok else 'FAIL'}"
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+"""Benchmark suite with JSON results and a baseline check.
+
+Runs every scenario in a fresh interpreter against a throw-away database
+(settings and engines are fixed at import time, and cold start needs a new
+process anyway) and collects the numbers into one JSON document:
+
+* ``cold_start``: process spawn to the first answered request, with the
+  app's startup (schema, bootstrap admin, scheduler) in between; median
+  of ``--cold-runs``.
+* ``api``: requests/s and p50/p99 latency of the auth, list and create
+  endpoints, driven in-process through httpx's ASGI transport, once per
+  ``--sizes`` entry (number of seeded jobs).
+* ``executor``: the cost of one ``scheduler_add_once`` call, and
+  throughput from arming jobs to their recorded ``execute_job`` runs of
+  ``scripts/dummy.py`` in the local sandbox.
+
+The results are compared with a baseline (``benchmarks/baseline.json`` by
+default): a metric more than ``--tolerance`` worse than its baseline value
+fails the run (twice that for p99 latencies, which are noisier). Numbers
+depend on the machine, so refresh the baseline with ``--update-baseline``
+on the machine that runs the check.
+
+    python -m benchmarks.suite
+    python -m benchmarks.suite --scenarios api --sizes 1000,100000 --tolerance 0.3
+    python -m benchmarks.suite --update-baseline
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+BASELINE = os.path.join(HERE, "baseline.json")
+RESULTS = os.path.join(HERE, "results.json")
+SCENARIOS = ("cold_start", "api", "executor")
+
+LOGIN = {"username": "admin@example.com", "password": "admin"}
+ADD_ONCE_BATCH = 2000
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    if not samples:
+        return float("nan")
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _metric(value: float, unit: str, better: str, noise: float = 1.0) -> dict:
+    """``noise`` scales the tolerance for figures that vary more from run to run."""
+    return {"value": round(value, 3), "unit": unit, "better": better, "noise": noise}
+
+
+# -- scenarios (run in the child process) ------------------------------------
+def _cold_start(params: dict) -> dict:
+    t0 = time.perf_counter()
+    from fastapi.testclient import TestClient
+
+    from automa.api.app import app
+
+    imported = time.perf_counter()
+    with TestClient(app) as client:
+        started = time.perf_counter()
+        r = client.get("/api/v1/health")
+        answered = time.time()
+        assert r.status_code == 200, r.text
+    return {
+        "total_ms": (answered - params["spawned_at"]) * 1000,
+        "import_ms": (imported - t0) * 1000,
+        "startup_ms": (started - imported) * 1000,
+    }
+
+
+def _api_workloads(script_id: int) -> dict:
+    when = "2999-01-01T00:00:00Z"  # never due: measures the request, not the run
+    return {
+        "auth": ("POST", "/api/v1/auth/token", {"data": LOGIN}),
+        "list_jobs": ("GET", "/api/v1/jobs?limit=50", {}),
+        "list_jobs_filtered": ("GET", f"/api/v1/jobs?status=succeeded&script_id={script_id}&limit=50", {}),
+        "list_scripts": ("GET", "/api/v1/scripts?limit=50", {}),
+        "create_job": ("POST", "/api/v1/jobs", {"json": {"script_id": script_id, "when": when}}),
+    }
+
+
+async def _api(params: dict) -> dict:
+    import httpx
+    from sqlalchemy import insert
+
+    from automa.api.app import app
+    from automa.core.config import settings
+    from automa.core.db import dispose_async_engines, engine, get_session, init_db
+    from automa.core.hashing import shutdown_hasher
+    from automa.domain.models import Agent, Job, Script
+    from automa.domain.repo import ensure_bootstrap_admin
+
+    init_db()
+    with get_session() as session:
+        ensure_bootstrap_admin(session)
+    with engine.begin() as conn:
+        conn.execute(insert(Agent), [{"name": f"agent-{i}", "status": "idle"} for i in range(50)])
+        script_ids = conn.execute(
+            insert(Script).returning(Script.id), [{"name": f"script-{i}", "path": "scripts/dummy.py"} for i in range(50)]
+        ).scalars().all()
+        for start in range(0, params["size"], 10000):
+            conn.execute(
+                insert(Job),
+                [
+                    {"status": ("succeeded", "failed", "pending")[i % 3], "script_id": script_ids[i % 50]}
+                    for i in range(start, min(params["size"], start + 10000))
+                ],
+            )
+
+    results: dict = {}
+    transport = httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", limits=limits) as client:
+        r = await client.post("/api/v1/auth/token", data=LOGIN)
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+        for name, (method, path, kwargs) in _api_workloads(script_ids[6]).items():
+            concurrency = params["concurrency"]
+            if name == "auth":
+                # more concurrent logins than the hashing pool admits would measure 429s
+                concurrency = min(concurrency, settings.password_hash_workers * 2)
+            latencies: list[float] = []
+            errors = 0
+
+            async def worker(deadline: float, record: bool) -> None:
+                nonlocal errors
+                while time.perf_counter() < deadline:
+                    t0 = time.perf_counter()
+                    resp = await client.request(method, path, headers=headers, **kwargs)
+                    if record:
+                        latencies.append((time.perf_counter() - t0) * 1000)
+                        errors += resp.status_code != 200
+
+            warmup = time.perf_counter() + min(0.5, params["seconds"] / 4)
+            await asyncio.gather(*(worker(warmup, False) for _ in range(concurrency)))
+            rounds = []
+            for _ in range(params["rounds"]):
+                latencies.clear()
+                t0 = time.perf_counter()
+                await asyncio.gather(*(worker(t0 + params["seconds"], True) for _ in range(concurrency)))
+                elapsed = time.perf_counter() - t0
+                rounds.append(
+                    {
+                        "requests": len(latencies),
+                        "rps": len(latencies) / elapsed,
+                        "p50_ms": _percentile(latencies, 50),
+                        "p99_ms": _percentile(latencies, 99),
+                    }
+                )
+            # median round per figure: one disturbed round does not move the result
+            results[name] = {
+                key: statistics.median(r[key] for r in rounds) for key in ("requests", "rps", "p50_ms", "p99_ms")
+            }
+            results[name].update(errors=errors, concurrency=concurrency)
+    # pooled aiosqlite connections run on their own threads; close them
+    await dispose_async_engines()
+    shutdown_hasher()
+    return results
+
+
+def _executor(params: dict) -> dict:
+    from sqlalchemy import func, insert
+    from sqlmodel import select
+
+    from automa.core.db import engine, get_session, init_db
+    from automa.domain.models import Job, Script
+    from automa.scheduler.manager import get_run_history, scheduler_add_once, scheduler_shutdown, scheduler_start
+
+    init_db()
+    jobs = params["jobs"]
+    with engine.begin() as conn:
+        script_id = conn.execute(
+            insert(Script).returning(Script.id), [{"name": "bench", "path": os.path.join(ROOT, "scripts", "dummy.py")}]
+        ).scalar_one()
+        ids = conn.execute(
+            insert(Job).returning(Job.id), [{"status": "pending", "script_id": script_id} for _ in range(jobs)]
+        ).scalars().all()
+    scheduler_start()
+    try:
+        # arming cost on its own: far-future entries for ids that never fire,
+        # best of several batches as the jobs below share the CPU afterwards
+        far = datetime(2999, 1, 1, tzinfo=timezone.utc)
+        batches = []
+        for batch in range(5):
+            t0 = time.perf_counter()
+            for i in range(ADD_ONCE_BATCH):
+                scheduler_add_once(10**9 + batch * ADD_ONCE_BATCH + i, far)
+            batches.append(time.perf_counter() - t0)
+        add_once_us = min(batches) / ADD_ONCE_BATCH * 1e6
+
+        t0 = time.perf_counter()
+        for job_id in ids:
+            scheduler_add_once(job_id, None, script_id=script_id)
+        done = 0
+        deadline = t0 + params["timeout"]
+        while done < jobs and time.perf_counter() < deadline:
+            time.sleep(0.02)
+            get_run_history().flush()
+            with get_session(readonly=True) as session:
+                done = session.exec(
+                    select(func.count()).select_from(Job).where(Job.status.in_(("succeeded", "failed")))
+                ).one()
+        elapsed = time.perf_counter() - t0
+    finally:
+        scheduler_shutdown()
+    if done < jobs:
+        raise RuntimeError(f"only {done} of {jobs} runs finished within {params['timeout']}s")
+    with get_session(readonly=True) as session:
+        failed = session.exec(select(func.count()).select_from(Job).where(Job.status == "failed")).one()
+    return {
+        "add_once_us": add_once_us,
+        "runs_per_s": jobs / elapsed,
+        "failed": failed,
+    }
+
+
+def _child(name: str, params: dict) -> None:
+    if name == "cold_start":
+        result = _cold_start(params)
+    elif name == "api":
+        result = asyncio.run(_api(params))
+    else:
+        result = _executor(params)
+    print(json.dumps(result))
+
+
+# -- driver --------------------------------------------------------------------
+def _spawn(name: str, params: dict, env: dict) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        child_env = {
+            **os.environ,
+            # configure before the app (and its settings/engine) is imported
+            "AUTOMA_SQLITE_URL": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            "AUTOMA_DATA_DIR": os.path.join(tmp, "data"),
+            **env,
+        }
+        params = {**params, "spawned_at": time.time()}
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", "--child", name, "--params", json.dumps(params)],
+            cwd=ROOT,
+            env=child_env,
+            capture_output=True,
+            text=True,
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} benchmark failed:\n{proc.stderr[-4000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_suite(args) -> dict:
+    metrics: dict[str, dict] = {}
+    failures: list[str] = []
+    if "cold_start" in args.scenarios:
+        runs = [_spawn("cold_start", {}, {}) for _ in range(args.cold_runs)]
+        for key in ("total_ms", "import_ms", "startup_ms"):
+            metrics[f"cold_start.{key}"] = _metric(statistics.median(r[key] for r in runs), "ms", "lower")
+    if "api" in args.scenarios:
+        for size in args.sizes:
+            params = {"size": size, "seconds": args.seconds, "rounds": args.rounds, "concurrency": args.concurrency}
+            env = {
+                "AUTOMA_DISABLE_SCHED": "1",
+                "AUTOMA_RATE_LIMIT_ENABLED": "false",
+                "AUTOMA_BACKPRESSURE_MAX_PENDING": "0",
+            }
+            for name, result in _spawn("api", params, env).items():
+                prefix = f"api.{name}.jobs_{size}"
+                metrics[f"{prefix}.rps"] = _metric(result["rps"], "req/s", "higher")
+                metrics[f"{prefix}.p50_ms"] = _metric(result["p50_ms"], "ms", "lower")
+                metrics[f"{prefix}.p99_ms"] = _metric(result["p99_ms"], "ms", "lower", noise=2.0)
+                if result["errors"]:
+                    failures.append(f"{prefix}: {result['errors']} of {result['requests']} requests failed")
+    if "executor" in args.scenarios:
+        params = {"jobs": args.executor_jobs, "timeout": args.executor_timeout}
+        result = _spawn("executor", params, {"AUTOMA_SANDBOX_BACKEND": "local", "AUTOMA_SANDBOX_POOL_SIZE": "0"})
+        metrics["executor.add_once_us"] = _metric(result["add_once_us"], "us", "lower")
+        metrics["executor.runs_per_s"] = _metric(result["runs_per_s"], "runs/s", "higher")
+        if result["failed"]:
+            failures.append(f"executor: {result['failed']} of {args.executor_jobs} runs failed")
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "params": {
+            "scenarios": list(args.scenarios),
+            "sizes": args.sizes,
+            "seconds": args.seconds,
+            "rounds": args.rounds,
+            "concurrency": args.concurrency,
+            "executor_jobs": args.executor_jobs,
+            "cold_runs": args.cold_runs,
+        },
+        "metrics": metrics,
+        "failures": failures,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> tuple[list[str], list[str]]:
+    """Returns ``(report lines, regressions)`` for the metrics present in both."""
+    lines: list[str] = []
+    regressions: list[str] = []
+    for key, metric in results["metrics"].items():
+        base = baseline.get("metrics", {}).get(key)
+        if base is None or not base["value"]:
+            lines.append(f"  {key:<48} {metric['value']:>12.3f} {metric['unit']:<7} (no baseline)")
+            continue
+        change = metric["value"] / base["value"] - 1
+        worse = -change if metric["better"] == "higher" else change
+        verdict = "REGRESSED" if worse > tolerance * metric.get("noise", 1.0) else ""
+        if verdict:
+            regressions.append(f"{key}: {metric['value']:.3f} vs baseline {base['value']:.3f} {metric['unit']}")
+        lines.append(
+            f"  {key:<48} {metric['value']:>12.3f} {metric['unit']:<7} {change:+7.1%} vs {base['value']:.3f} {verdict}"
+        )
+    return lines, regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios", default=",".join(SCENARIOS), help="comma-separated subset of " + ", ".join(SCENARIOS)
+    )
+    parser.add_argument("--sizes", default="1000,10000", help="seeded jobs for the api scenario, comma-separated")
+    parser.add_argument("--seconds", type=float, default=2.0, help="length of one api measurement round")
+    parser.add_argument("--rounds", type=int, default=3, help="api rounds per endpoint; the median is reported")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--executor-jobs", type=int, default=200)
+    parser.add_argument("--executor-timeout", type=float, default=300.0)
+    parser.add_argument("--cold-runs", type=int, default=3)
+    parser.add_argument("--output", default=RESULTS, help="where to write the JSON results")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown per metric")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--params", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        _child(args.child, json.loads(args.params))
+        return 0
+
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    results = run_suite(args)
+    with open(args.output, "w") as fh:
+        json.dump(results, fh, indent=2)
+        fh.write("\n")
+    print(f"results written to {args.output}")
+
+    regressions: list[str] = []
+    if args.update_baseline:
+        with open(args.baseline, "w") as fh:
+            json.dump(results, fh, indent=2)
+            fh.write("\n")
+        print(f"baseline updated: {args.baseline}")
+        lines = [f"  {key:<48} {m['value']:>12.3f} {m['unit']}" for key, m in results["metrics"].items()]
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        lines, regressions = compare(results, baseline, args.tolerance)
+        print(f"compared with {args.baseline} (created {baseline.get('created_at')}, tolerance {args.tolerance:.0%})")
+        recorded = baseline.get("params", {})
+        changed = [k for k, v in results["params"].items() if k != "scenarios" and k in recorded and recorded[k] != v]
+        if changed:
+            print(f"  note: baseline was recorded with different {', '.join(changed)}")
+    else:
+        lines = [f"  {key:<48} {m['value']:>12.3f} {m['unit']}" for key, m in results["metrics"].items()]
+        print(f"no baseline at {args.baseline}; run with --update-baseline to create one")
+    print("\n".join(lines))
+
+    problems = results["failures"] + regressions
+    for problem in problems:
+        print(f"FAIL {problem}")
+    print("-> FAIL" if problems else "-> OK")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
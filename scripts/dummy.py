@@ -0,0 +1,3 @@
+"""Minimal job script used by tests and for trying out the sandbox runner."""
+
+print("dummy script ran")
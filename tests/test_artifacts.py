@@ -0,0 +1,115 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from automa.api.app import app
+from automa.core.artifacts import ArtifactStore
+from automa.domain.models import Artifact, Blob
+from automa.scheduler.manager import execute_job, get_run_history
+
+
+def get_token(client: TestClient) -> str:
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _run_output(store: ArtifactStore, run_key: str, files: dict[str, bytes]):
+    directory = store.output_dir(run_key)
+    for name, data in files.items():
+        (directory / name).parent.mkdir(parents=True, exist_ok=True)
+        (directory / name).write_bytes(data)
+    return directory
+
+
+def _refcounts(engine) -> dict[str, int]:
+    with Session(engine) as session:
+        return {b.digest: b.refcount for b in session.exec(select(Blob)).all()}
+
+
+def test_store_deduplicates_and_collects_unreferenced_blobs(tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    store = ArtifactStore(tmp_path, max_files=3)
+
+    directory = _run_output(store, "run1", {"a.csv": b"same", "sub/b.csv": b"same", "c.txt": b"other"})
+    (directory / "link").symlink_to("/etc/hostname")
+    assert store.ingest(engine, 1, "run1", directory) == ["a.csv", "c.txt", "sub/b.csv"]
+    assert not directory.exists()
+    counts = _refcounts(engine)
+    assert sorted(counts.values()) == [1, 2]  # one blob for both "same" files
+    assert len(list(store.blobs.glob("*/*"))) == 2
+    assert store.stats["deduplicated"] == 1
+
+    # the next run replaces a.csv; the "same" blob is still used by sub/b.csv
+    store.ingest(engine, 1, "run2", _run_output(store, "run2", {"a.csv": b"new"}))
+    assert sorted(_refcounts(engine).values()) == [1, 1, 1]
+    store.ingest(engine, 2, "run3", _run_output(store, "run3", {"x": b"other"}))  # shared across jobs
+
+    assert store.delete(engine, 1, ["sub/b.csv"]) == 1  # last reference to "same"
+    assert len(_refcounts(engine)) == 2
+    assert store.delete(engine, 1) == 2
+    with Session(engine) as session:
+        assert [a.name for a in session.exec(select(Artifact)).all()] == ["x"]
+    assert list(_refcounts(engine).values()) == [1]
+    assert len(list(store.blobs.glob("*/*"))) == 1
+
+    orphan = store.blob_path("ff" * 32)
+    orphan.parent.mkdir(parents=True, exist_ok=True)
+    orphan.write_bytes(b"left by a crash")
+    store.output_dir("interrupted")
+    assert store.collect(engine) == 1
+    assert not orphan.exists() and not store.scratch.exists()
+
+
+def test_run_artifacts_are_downloadable_with_ranges(tmp_path):
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    script = tmp_path / "report.py"
+    script.write_text(
+        "import os, pathlib\n"
+        "out = pathlib.Path(os.environ['AUTOMA_OUTPUT_DIR'])\n"
+        "(out / 'report.txt').write_text('0123456789')\n"
+        "(out / 'data').mkdir()\n"
+        "(out / 'data' / 'rows.csv').write_text('a,b\\n1,2\\n')\n"
+    )
+    r = client.post("/api/v1/scripts", json={"name": f"report-{uuid.uuid4().hex[:8]}", "path": str(script)}, headers=headers)
+    when = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    r = client.post("/api/v1/jobs", json={"script_id": r.json()["id"], "when": when}, headers=headers)
+    job_id = r.json()["id"]
+
+    assert execute_job(job_id) == "succeeded"
+    get_run_history().flush()
+    assert client.get(f"/api/v1/jobs/{job_id}/artifacts").status_code == 401
+    listed = client.get(f"/api/v1/jobs/{job_id}/artifacts", headers=headers).json()
+    assert [(a["name"], a["size"]) for a in listed] == [("data/rows.csv", 8), ("report.txt", 10)]
+
+    url = f"/api/v1/jobs/{job_id}/artifacts/report.txt"
+    assert client.get(url).status_code == 401
+    r = client.get(url, headers=headers)
+    assert r.status_code == 200 and r.text == "0123456789"
+    assert r.headers["content-type"].startswith("text/plain")
+    assert r.headers["accept-ranges"] == "bytes"
+    etag = r.headers["etag"]
+    assert etag == f'"{listed[1]["digest"]}"'
+    r = client.get(url, headers={**headers, "Range": "bytes=2-5"})
+    assert r.status_code == 206 and r.text == "2345"
+    assert r.headers["content-range"] == "bytes 2-5/10"
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+    r = client.get(f"/api/v1/jobs/{job_id}/artifacts/data/rows.csv", headers=headers)
+    assert r.status_code == 200 and r.text == "a,b\n1,2\n"
+
+    blob = os.path.join("data", "artifacts", "blobs", listed[1]["digest"][:2], listed[1]["digest"])
+    assert client.delete(url).status_code == 401
+    assert client.delete(url, headers=headers).status_code == 204
+    assert client.get(url, headers=headers).status_code == 404
+    assert client.delete(url, headers=headers).status_code == 404
+    assert not os.path.exists(blob)
@@ -0,0 +1,63 @@
+import json
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from automa.api.app import app
+from automa.core.audit import AuditWriter, get_audit_writer
+from automa.core.db import get_session
+from automa.domain.models import AuditLog, User
+
+
+def get_token(client: TestClient) -> str:
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def test_writer_batches_and_records_overflow():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    writer = AuditWriter(engine, interval=3600, batch_size=2, max_pending=3)
+
+    for i in range(4):
+        writer.submit("create_agent", actor_user_id=None, target_type="agent", target_id=i, detail={"n": i})
+    assert writer.stats["submitted"] == 3 and writer.stats["dropped"] == 1
+    with Session(engine) as session:
+        assert session.exec(select(AuditLog)).all() == []  # nothing written on submit
+
+    assert writer.flush() == 4
+    with Session(engine) as session:
+        rows = session.exec(select(AuditLog).order_by(AuditLog.id)).all()
+    assert [r.target_id for r in rows[:3]] == [0, 1, 2]
+    assert json.loads(rows[0].detail) == {"n": 0}
+    assert rows[3].action == "audit.dropped" and json.loads(rows[3].detail) == {"count": 1}
+    assert writer.flush() == 0
+
+
+def test_state_changing_requests_are_audited():
+    client = TestClient(app)
+    token = get_token(client)
+    name = f"audited-{uuid.uuid4().hex[:8]}"
+    r = client.post("/api/v1/agents", json={"name": name}, headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200, r.text
+    agent_id = r.json()["id"]
+    client.get("/api/v1/agents")
+    get_audit_writer().flush()
+
+    with get_session() as session:
+        admin = session.exec(select(User).where(User.email == "admin@example.com")).one()
+        rows = session.exec(
+            select(AuditLog).where(AuditLog.action == "create_agent", AuditLog.target_id == agent_id)
+        ).all()
+        assert session.exec(select(AuditLog).where(AuditLog.action == "list_agents")).first() is None
+    assert len(rows) == 1
+    assert rows[0].actor_user_id == admin.id and rows[0].target_type == "agent"
+    detail = json.loads(rows[0].detail)
+    assert detail["status"] == 200 and detail["method"] == "POST" and detail["path"] == "/api/v1/agents"
@@ -0,0 +1,117 @@
+import gzip
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from automa.api.app import app
+from automa.core import audit_archive
+from automa.core.audit_archive import AuditArchive
+from automa.core.db import engine as db_engine
+from automa.domain.models import AuditLog, User
+
+
+def get_token(client: TestClient) -> str:
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _rows(start: datetime, n: int, action: str, actors: tuple = (1, 2)) -> list[AuditLog]:
+    return [
+        AuditLog(
+            created_at=start + timedelta(hours=i),
+            actor_user_id=actors[i % 2],
+            action=action if i % 3 else "cancel_job",
+            target_type="job",
+            target_id=i,
+            detail=json.dumps({"n": i}),
+        )
+        for i in range(n)
+    ]
+
+
+def test_archive_moves_old_rows_into_day_segments(tmp_path):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all(_rows(datetime(2024, 3, 1), 36, "create_job"))  # 1 Mar 00:00 .. 2 Mar 11:00
+        session.commit()
+
+    archive = AuditArchive(tmp_path, block_rows=5)
+    assert archive.archive(engine, datetime(2024, 3, 2, 6)) == 30
+    assert archive.archive(engine, datetime(2024, 3, 2, 6)) == 0
+    with Session(engine) as session:
+        assert len(session.exec(select(AuditLog)).all()) == 6
+
+    manifest = archive.manifest()
+    assert sorted(manifest["segments"]) == ["2024-03-01", "2024-03-02"]
+    day1 = manifest["segments"]["2024-03-01"]
+    assert day1["count"] == 24 and len(day1["blocks"]) == 5
+    assert day1["actions"] == ["cancel_job", "create_job"] and day1["actors"] == [1, 2]
+    with gzip.open(tmp_path / day1["file"], "rt") as fh:  # still a plain .jsonl.gz
+        assert len(fh.readlines()) == 24
+
+    rows = archive.query(limit=100)
+    assert [r["id"] for r in rows] == list(range(30, 0, -1))
+    assert json.loads(rows[0]["detail"]) == {"n": 29}
+
+    rows = archive.query(before_id=20, action="cancel_job", actor_user_id=2, limit=100)
+    assert [r["target_id"] for r in rows] == [15, 9, 3]
+    rows = archive.query(since=datetime(2024, 3, 1, 22), until=datetime(2024, 3, 2, 2), limit=100)
+    assert [r["target_id"] for r in rows] == [25, 24, 23, 22]
+    assert archive.query(action="delete_job") == []
+
+    # later batches append to an existing day's segment
+    with Session(engine) as session:
+        session.add_all(_rows(datetime(2024, 3, 2, 20), 1, "create_job"))
+        session.commit()
+    assert archive.archive(engine, datetime(2024, 3, 3)) == 7
+    assert archive.manifest()["segments"]["2024-03-02"]["count"] == 13
+    assert archive.stats()["rows"] == 37
+
+
+def test_audit_api_pages_across_table_and_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(audit_archive, "_archive", AuditArchive(tmp_path, block_rows=2))
+    action = f"archived-{uuid.uuid4().hex[:8]}"
+    client = TestClient(app)
+    r = client.post("/api/v1/auth/register", json={"email": f"{action}@example.com", "password": "pw"})
+    user_token = r.json()["access_token"]
+    with Session(db_engine) as session:
+        admin = session.exec(select(User).where(User.email == "admin@example.com")).one()
+        user = session.exec(select(User).where(User.email == f"{action}@example.com")).one()
+        actors = (admin.id, user.id)
+        session.add_all(_rows(datetime(2000, 1, 1), 6, action, actors))  # targets 1, 2, 4, 5 match
+        session.commit()
+    assert audit_archive.get_audit_archive().archive(db_engine, datetime(2000, 1, 1, 3)) >= 3
+    with Session(db_engine) as session:
+        session.add_all(_rows(datetime.now(timezone.utc).replace(tzinfo=None), 3, action, actors))  # targets 1, 2
+        session.commit()
+
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    seen, cursor = [], None
+    while True:
+        params = {"action": action, "limit": 2, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/api/v1/audit", params=params, headers=headers)
+        assert r.status_code == 200, r.text
+        seen += [(e["target_id"], e["detail"]["n"]) for e in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert seen == [(2, 2), (1, 1), (5, 5), (4, 4), (2, 2), (1, 1)]
+
+    r = client.get(
+        "/api/v1/audit",
+        params={"action": action, "actor": actors[1], "until": "2000-01-02T00:00:00"},
+        headers=headers,
+    )
+    assert [e["target_id"] for e in r.json()] == [5, 1]
+
+    assert client.get("/api/v1/audit", headers={"Authorization": f"Bearer {user_token}"}).status_code == 403
@@ -62,3 +62,43 @@ def test_ui_register_sets_cookie_and_refresh_header():
     with get_session() as session:
         user = session.exec(select(User).where(User.email == email)).first()
         assert user is not None
+
+
+def test_principal_cache_serves_repeat_requests_and_is_invalidated():
+    from automa.core.principal_cache import get_principal_cache
+
+    client = TestClient(app)
+    email = f"user-{uuid4().hex}@example.com"
+    r = client.post("/api/v1/auth/register", json={"email": email, "password": "pw-one"})
+    assert r.status_code == 200, r.text
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": email, "password": "pw-one"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    cache = get_principal_cache()
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    hits = cache.hits
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 200
+    assert cache.hits == hits + 1
+
+    # a password change must not be checked against a stale cached hash
+    r = client.post(
+        "/api/v1/users/me/change_password",
+        json={"old_password": "pw-one", "new_password": "pw-two"},
+        headers=headers,
+    )
+    assert r.status_code == 200
+    r = client.post(
+        "/api/v1/users/me/change_password",
+        json={"old_password": "pw-one", "new_password": "pw-three"},
+        headers=headers,
+    )
+    assert r.status_code == 400
+
+    # the token names the old email, so it stops working after the change
+    r = client.patch("/api/v1/users/me", json={"email": f"new-{email}"}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 401
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.exc import OperationalError
+
+from automa.core.config import settings
+from automa.core.db import _create_engines
+
+# the schema create_all produced before any revision after the baseline
+_BASELINE_SCHEMA = """
+CREATE TABLE user (id INTEGER PRIMARY KEY, email VARCHAR NOT NULL, hashed_password VARCHAR NOT NULL,
+    is_active BOOLEAN NOT NULL, is_admin BOOLEAN NOT NULL, full_name VARCHAR, created_at DATETIME NOT NULL);
+CREATE TABLE agent (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description VARCHAR, status VARCHAR NOT NULL);
+CREATE TABLE script (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, path VARCHAR NOT NULL, description VARCHAR);
+CREATE TABLE job (id INTEGER PRIMARY KEY, agent_id INTEGER REFERENCES agent (id), script_id INTEGER REFERENCES script (id),
+    schedule VARCHAR, status VARCHAR NOT NULL, last_run_at DATETIME, last_exit_code INTEGER, last_error VARCHAR);
+"""
+
+
+def test_production_profile_splits_writer_and_readers(tmp_path):
+    url = f"sqlite:///{tmp_path / 'prod.db'}"
+    writer, reader = _create_engines(url, "production")
+    assert writer is not reader
+    assert writer.pool.size() == 1
+
+    with writer.begin() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        conn.exec_driver_sql("CREATE TABLE t (x INTEGER)")
+        conn.exec_driver_sql("INSERT INTO t VALUES (1)")
+
+    with reader.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        assert conn.exec_driver_sql("SELECT count(*) FROM t").scalar() == 1
+        with pytest.raises(OperationalError):
+            conn.exec_driver_sql("INSERT INTO t VALUES (2)")
+
+    writer.dispose()
+    reader.dispose()
+
+
+def test_default_profile_and_memory_urls_share_one_engine(tmp_path):
+    writer, reader = _create_engines(f"sqlite:///{tmp_path / 'dev.db'}", "default")
+    assert writer is reader
+    writer, reader = _create_engines("sqlite://", "production")
+    assert writer is reader
+
+
+def test_migrations_upgrade_a_baseline_database(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.connection.executescript(_BASELINE_SCHEMA)
+    monkeypatch.setattr(settings, "sqlite_url", url)  # alembic/env.py reads it
+    config = Config()  # no ini file: leave the test run's logging alone
+    config.set_main_option("script_location", str(Path(__file__).resolve().parents[1] / "alembic"))
+    command.stamp(config, "0001_baseline")
+    command.upgrade(config, "head")
+
+    schema = inspect(engine)
+    columns = {c["name"] for c in schema.get_columns("job")}
+    assert {"next_run_at", "workflow_id", "priority", "owner_id"} <= columns
+    assert {"ix_job_status_next_run_at", "ix_job_status_id"} <= {i["name"] for i in schema.get_indexes("job")}
+    assert {"jobrun", "workflow", "jobdependency", "artifact", "blob"} <= set(schema.get_table_names())
+    engine.dispose()
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+import uuid
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from automa.api.app import app
+from automa.core.db import async_engine, async_reader_engine
+from automa.scheduler.manager import get_run_history
+
+
+def get_token(client: TestClient) -> str:
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def test_list_etag_304_without_queries_and_bump_on_create():
+    client = TestClient(app)
+    token = get_token(client)
+
+    r = client.get("/api/v1/agents")
+    assert r.status_code == 200
+    etag = r.headers["ETag"]
+    assert etag.startswith('"') and not etag.startswith('W/')
+
+    statements = []
+
+    def count(*args):
+        statements.append(args[2])
+
+    engines = {e.sync_engine for e in (async_engine, async_reader_engine)}
+    for e in engines:
+        event.listen(e, "before_cursor_execute", count)
+    try:
+        r = client.get("/api/v1/agents", headers={"If-None-Match": etag})
+    finally:
+        for e in engines:
+            event.remove(e, "before_cursor_execute", count)
+    assert r.status_code == 304
+    assert r.headers["ETag"] == etag
+    assert statements == []
+
+    r = client.post(
+        "/api/v1/agents",
+        json={"name": f"etag-{uuid.uuid4().hex[:8]}"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert r.status_code == 200, r.text
+    r = client.get("/api/v1/agents", headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    # other tables are unaffected
+    scripts_etag = client.get("/api/v1/scripts").headers["ETag"]
+    assert client.get("/api/v1/scripts", headers={"If-None-Match": scripts_etag}).status_code == 304
+
+
+def test_job_etag_follows_run_history_flush():
+    client = TestClient(app)
+    token = get_token(client)
+    when = datetime.now(timezone.utc) + timedelta(days=1)
+    r = client.post("/api/v1/jobs", json={"when": when.isoformat()}, headers={"Authorization": f"Bearer {token}"})
+    assert r.status_code == 200, r.text
+    job_id = r.json()["id"]
+
+    etag = client.get("/api/v1/jobs").headers["ETag"]
+    get_run_history().set_next_runs([(job_id, when + timedelta(hours=1))])  # written through when not started
+    assert client.get("/api/v1/jobs", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_partial_etag_depends_on_viewer():
+    client = TestClient(app)
+    anon = client.get("/ui/partials/jobs")
+    assert anon.status_code == 200
+
+    r = client.post("/ui/auth/login", data={"email": "admin@example.com", "password": "admin"})
+    assert r.status_code == 200, r.text
+    admin = client.get("/ui/partials/jobs", headers={"If-None-Match": anon.headers["ETag"]})
+    assert admin.status_code == 200
+    assert "private" in admin.headers["Cache-Control"]
+    again = client.get("/ui/partials/jobs", headers={"If-None-Match": admin.headers["ETag"]})
+    assert again.status_code == 304
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+import asyncio
+import threading
+
+from fastapi.testclient import TestClient
+
+from automa.api.app import app
+from automa.api.routes.ui import _job_events
+from automa.core.events import CLOSED, RESYNC, EventBus, get_event_bus
+
+
+def get_token(client: TestClient) -> str:
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def test_publish_from_other_thread_overflow_and_close():
+    async def main():
+        bus = EventBus(queue_size=2)
+        sub = bus.subscribe()
+        t = threading.Thread(target=bus.publish, args=({"type": "job", "id": 1},))
+        t.start()
+        t.join()
+        assert await sub.get(timeout=1) == {"type": "job", "id": 1}
+        assert await sub.get(timeout=0.01) is None
+
+        for i in range(5):  # more than the queue holds
+            bus.publish({"type": "job", "id": i})
+        await asyncio.sleep(0)
+        assert await sub.get(timeout=1) is RESYNC
+        bus.publish({"type": "job", "id": 9})
+        assert (await sub.get(timeout=1))["id"] == 9
+
+        bus.close()
+        assert await sub.get(timeout=1) is CLOSED
+        assert bus.stats()["subscribers"] == 0
+
+    asyncio.run(main())
+
+
+def test_job_events_stream_format():
+    async def main():
+        bus = EventBus()
+        stream = _job_events(bus, keepalive=0.01)
+        assert await anext(stream) == "retry: 5000\n\n"
+        assert await anext(stream) == ": keep-alive\n\n"
+        bus.publish({"type": "job", "id": 3, "status": "running"})
+        assert await anext(stream) == 'event: job\ndata: {"type":"job","id":3,"status":"running"}\n\n'
+        bus.close()
+        assert [chunk async for chunk in stream] == []
+
+    asyncio.run(main())
+
+
+def test_create_job_publishes_delta():
+    client = TestClient(app)
+    token = get_token(client)
+    when = datetime.utcnow() + timedelta(days=1)
+
+    async def main():
+        sub = get_event_bus().subscribe()
+        try:
+            r = await asyncio.to_thread(
+                client.post,
+                "/api/v1/jobs",
+                json={"when": when.isoformat() + "Z"},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            assert r.status_code == 200, r.text
+            event = await sub.get(timeout=5)
+        finally:
+            sub.close()
+        return r.json()["id"], event
+
+    job_id, event = asyncio.run(main())
+    assert event["type"] == "job" and event["id"] == job_id
+    assert event["status"] == "scheduled" and event["next_run_at"]
+
+
+def test_stream_requires_login():
+    client = TestClient(app)
+    assert client.get("/ui/stream/jobs").status_code == 401
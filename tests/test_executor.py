@@ -0,0 +1,145 @@
+import threading
+import time
+
+from automa.scheduler.executor import ExecutionRequest, JobExecutor
+
+
+def wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_per_agent_cap_does_not_starve_other_agents():
+    release = threading.Event()
+    started: list[int] = []
+
+    def runner(job_id: int) -> None:
+        started.append(job_id)
+        release.wait(2)
+
+    ex = JobExecutor(runner, max_workers=3, max_per_agent=1)
+    try:
+        # agent 1 floods the queue, agent 2 arrives afterwards
+        for job_id in (1, 2, 3):
+            ex.submit(ExecutionRequest(job_id=job_id, agent_id=1))
+        assert ex.submit(ExecutionRequest(job_id=4, agent_id=2)) is True
+
+        assert wait_for(lambda: sorted(started) == [1, 4])
+        snap = ex.snapshot()
+        assert snap["running_by_agent"] == {1: 1, 2: 1}
+        assert [p["job_id"] for p in snap["pending"]] == [2, 3]
+        assert [p["job_id"] for p in ex.snapshot(pending_limit=1)["pending"]] == [2]
+        assert snap["pending_count"] == 2
+
+        release.set()
+        assert wait_for(lambda: len(started) == 4)
+        assert wait_for(lambda: not ex.snapshot()["running"])
+    finally:
+        release.set()
+        ex.shutdown(wait=True)
+
+
+def test_per_script_cap_does_not_hold_back_other_scripts_of_the_agent():
+    release = threading.Event()
+    started: list[int] = []
+
+    def runner(job_id: int) -> None:
+        started.append(job_id)
+        release.wait(2)
+
+    ex = JobExecutor(runner, max_workers=3, max_per_script=1)
+    try:
+        # same owner and agent: script 1 is at its cap, script 2 has a free slot
+        for job_id in (1, 2, 3):
+            ex.submit(ExecutionRequest(job_id=job_id, agent_id=1, script_id=1))
+        assert ex.submit(ExecutionRequest(job_id=4, agent_id=1, script_id=2)) is True
+        assert wait_for(lambda: sorted(started) == [1, 4])
+        assert ex.snapshot()["running_by_script"] == {1: 1, 2: 1}
+    finally:
+        release.set()
+        ex.shutdown(wait=True)
+
+
+def test_global_limit_and_duplicate_submission():
+    release = threading.Event()
+    running = []
+
+    def runner(job_id: int) -> None:
+        running.append(job_id)
+        release.wait(2)
+
+    ex = JobExecutor(runner, max_workers=1)
+    try:
+        assert ex.submit(ExecutionRequest(job_id=10)) is True
+        assert ex.submit(ExecutionRequest(job_id=11)) is False
+        # same job id again is ignored while queued
+        assert ex.submit(ExecutionRequest(job_id=11)) is False
+        assert [p.job_id for p in ex.pending()] == [11]
+        release.set()
+        assert wait_for(lambda: running == [10, 11])
+    finally:
+        release.set()
+        ex.shutdown(wait=True)
+
+
+def _serial_executor(**kwargs):
+    """One worker held on the first job, so everything else queues up."""
+    release = threading.Event()
+    order: list[int] = []
+
+    def runner(job_id: int) -> None:
+        order.append(job_id)
+        if job_id == 0:
+            release.wait(2)
+
+    ex = JobExecutor(runner, max_workers=1, **kwargs)
+    ex.submit(ExecutionRequest(job_id=0))
+    return ex, release, order
+
+
+def test_fair_queuing_across_owners_and_classes():
+    ex, release, order = _serial_executor()
+    try:
+        for job_id in range(1, 41):  # owner 1 floods the queue with normal jobs
+            ex.submit(ExecutionRequest(job_id=job_id, owner_id=1))
+        for job_id in range(101, 106):  # owner 2 arrives later, same class
+            ex.submit(ExecutionRequest(job_id=job_id, owner_id=2))
+        ex.submit(ExecutionRequest(job_id=200, owner_id=3, priority="high"))
+        for job_id in range(301, 311):  # a low-priority backlog
+            ex.submit(ExecutionRequest(job_id=job_id, owner_id=4, priority="low"))
+
+        snap = ex.snapshot()
+        assert snap["pending_by_class"]["normal"]["depth"] == 45
+        assert snap["pending_by_class"]["high"]["depth"] == 1
+        assert snap["pending_by_class"]["low"]["depth"] == 10
+
+        release.set()
+        assert wait_for(lambda: len(order) == 57)
+        assert order[1] == 200  # the urgent job is next, not behind 40 others
+        first = order[1:21]
+        # owner 2 is interleaved with owner 1 instead of waiting for the whole backlog
+        assert set(range(101, 106)) <= set(first)
+        # low gets a share of ~1/9 of the slots (weights 4 + 4 : 1), not zero and not more
+        assert 1 <= sum(job_id > 300 for job_id in first) <= 4
+    finally:
+        release.set()
+        ex.shutdown(wait=True)
+
+
+def test_aged_jobs_jump_the_queue():
+    ex, release, order = _serial_executor(max_wait=60)
+    try:
+        for job_id in range(1, 11):
+            ex.submit(ExecutionRequest(job_id=job_id, priority="high"))
+        # has already waited longer than max_wait (e.g. blocked by a cap meanwhile)
+        ex.submit(ExecutionRequest(job_id=99, priority="low", enqueued_at=time.monotonic() - 120))
+        release.set()
+        assert wait_for(lambda: len(order) == 12)
+        assert order[1] == 99
+    finally:
+        release.set()
+        ex.shutdown(wait=True)
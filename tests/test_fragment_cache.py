@@ -0,0 +1,53 @@
+import uuid
+
+from fastapi.testclient import TestClient
+
+from automa.api.app import app
+from automa.core.fragment_cache import FragmentCache, get_fragment_cache
+
+
+def test_versioned_slots_and_byte_bounded_lru():
+    cache = FragmentCache(max_bytes=10)
+    cache.put("a", 1, b"aaaa")
+    assert cache.get("a", 1) == b"aaaa"
+    assert cache.get("a", 2) is None
+
+    cache.put("a", 2, b"AAAA")  # replaces the stale render in place
+    cache.put("a", 1, b"old")  # a slower, older render does not win
+    assert cache.get("a", 2) == b"AAAA"
+    assert cache.stats()["bytes"] == 4
+
+    cache.put("b", 1, b"bbbb")
+    cache.get("a", 2)  # "b" is now least recently used
+    cache.put("c", 1, b"cccc")
+    assert cache.get("b", 1) is None
+    assert cache.get("a", 2) == b"AAAA" and cache.get("c", 1) == b"cccc"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 8
+
+    cache.put("d", 1, b"x" * 11)  # larger than the whole budget
+    assert cache.get("d", 1) is None
+
+
+def test_partials_served_from_cache_until_table_changes():
+    client = TestClient(app)
+    r = client.post("/ui/auth/login", data={"email": "admin@example.com", "password": "admin"})
+    assert r.status_code == 200, r.text
+    cache = get_fragment_cache()
+
+    first = client.get("/ui/partials/agents")
+    hits = cache.hits
+    second = client.get("/ui/partials/agents")
+    assert second.text == first.text
+    assert cache.hits == hits + 1
+
+    name = f"frag-{uuid.uuid4().hex[:8]}"
+    r = client.post("/ui/agents", data={"name": name})
+    assert r.status_code == 200 and name in r.text
+    hits = cache.hits
+    third = client.get("/ui/partials/agents")  # rendered by the create route
+    assert name in third.text
+    assert cache.hits == hits + 1
+
+    stats = client.get("/api/v1/health/fragments").json()
+    assert stats["entries"] >= 1 and 0 < stats["bytes"] <= stats["max_bytes"]
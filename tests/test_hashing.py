@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from automa.api.app import app
+from automa.core import hashing
+from automa.core.config import settings
+from automa.core.hashing import HasherBusy, PasswordHasher, build_pwd_context
+
+
+def test_verify_and_update_rehashes_on_cost_change(monkeypatch):
+    old_hash = build_pwd_context(4).hash("secret")
+    monkeypatch.setattr(settings, "password_bcrypt_rounds", 5)
+    hasher = PasswordHasher(kind="thread", max_workers=1)
+    try:
+        ok, new_hash = asyncio.run(hasher.verify_and_update("secret", old_hash))
+        assert ok and new_hash is not None and new_hash.startswith("$2b$05$")
+        assert asyncio.run(hasher.verify_and_update("secret", new_hash)) == (True, None)
+        assert asyncio.run(hasher.verify_and_update("wrong", new_hash)) == (False, None)
+        assert asyncio.run(hasher.verify_and_update("secret", "not-a-hash")) == (False, None)
+    finally:
+        hasher.shutdown()
+
+
+def test_admission_control_rejects_when_saturated(monkeypatch):
+    monkeypatch.setattr(settings, "password_bcrypt_rounds", 10)
+    hasher = PasswordHasher(kind="thread", max_workers=1, max_pending=1)
+
+    async def burst():
+        first = asyncio.ensure_future(hasher.hash("a"))
+        await asyncio.sleep(0)  # let the first one take the only slot
+        with pytest.raises(HasherBusy) as exc:
+            await hasher.hash("b")
+        assert exc.value.retry_after >= 1
+        await first
+
+    try:
+        asyncio.run(burst())
+        assert hasher.stats()["rejected"] == 1
+        assert hasher.stats()["in_flight"] == 0
+    finally:
+        hasher.shutdown()
+
+
+def test_login_returns_429_with_retry_after_when_pool_is_full(monkeypatch):
+    monkeypatch.setattr(hashing, "_hasher", PasswordHasher(kind="thread", max_pending=0))
+    client = TestClient(app)
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 1
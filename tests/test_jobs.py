@@ -62,3 +62,148 @@ def test_execute_job_updates_status():
     assert job["last_exit_code"] == 0
     assert job["last_error"] is None
     assert job["last_run_at"] is not None
+
+
+def test_recurring_job_is_validated_and_cancellable():
+    client = TestClient(app)
+    token = get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/api/v1/jobs", json={"schedule": "not a cron"}, headers=headers)
+    assert r.status_code == 422
+
+    r = client.post("/api/v1/jobs", json={"schedule": "@every 10m"}, headers=headers)
+    assert r.status_code == 200, r.text
+    job = r.json()
+    assert job["schedule"] == "@every 10m"
+    assert job["status"] == "scheduled"
+    assert job["next_run_at"] is not None
+
+    r = client.post(f"/api/v1/jobs/{job['id']}/cancel", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["status"] == "cancelled"
+    assert r.json()["next_run_at"] is None
+
+
+def test_execute_job_records_run_history():
+    client = TestClient(app)
+    token = get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/api/v1/scripts", json={"name": "script-history", "path": "scripts/dummy.py"}, headers=headers)
+    assert r.status_code == 200, r.text
+    r = client.post("/api/v1/jobs", json={"script_id": r.json()["id"]}, headers=headers)
+    assert r.status_code == 200, r.text
+    job_id = r.json()["id"]
+
+    from automa.scheduler.manager import execute_job
+
+    assert execute_job(job_id) == "succeeded"
+    assert execute_job(job_id) == "succeeded"
+
+    assert client.get(f"/api/v1/jobs/{job_id}/runs").status_code == 401
+    r = client.get(f"/api/v1/jobs/{job_id}/runs", headers=headers)
+    assert r.status_code == 200
+    runs = r.json()
+    assert len(runs) == 2
+    assert runs[0]["id"] > runs[1]["id"]
+    assert all(run["status"] == "succeeded" and run["exit_code"] == 0 for run in runs)
+    assert runs[0]["finished_at"] is not None
+    assert runs[0]["stdout_bytes"] > 0
+
+    assert client.get("/api/v1/jobs/999999/runs", headers=headers).status_code == 404
+
+
+def test_list_jobs_keyset_pagination_and_filters():
+    client = TestClient(app)
+    token = get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/api/v1/scripts", json={"name": "script-paging", "path": "scripts/dummy.py"}, headers=headers)
+    assert r.status_code == 200, r.text
+    script_id = r.json()["id"]
+    when = (datetime.utcnow() + timedelta(days=1)).isoformat() + "Z"
+    created = []
+    for _ in range(5):
+        r = client.post("/api/v1/jobs", json={"script_id": script_id, "when": when}, headers=headers)
+        assert r.status_code == 200, r.text
+        created.append(r.json()["id"])
+
+    seen, pages = [], 0
+    params = {"script_id": script_id, "limit": 2}
+    while True:
+        r = client.get("/api/v1/jobs", params=params)
+        assert r.status_code == 200, r.text
+        seen += [j["id"] for j in r.json()]
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            assert "Link" not in r.headers
+            break
+        assert 'rel="next"' in r.headers["Link"]
+        params["cursor"] = cursor
+    assert seen == sorted(created, reverse=True)
+    assert pages == 3
+
+    r = client.get("/api/v1/jobs", params={"script_id": script_id, "order": "asc", "status": "pending,scheduled"})
+    assert [j["id"] for j in r.json()] == created
+    r = client.get("/api/v1/jobs", params={"script_id": script_id, "status": "succeeded"})
+    assert r.json() == []
+
+    assert client.get("/api/v1/jobs", params={"cursor": "not-a-cursor"}).status_code == 400
+
+
+def test_batch_create_reports_each_item():
+    client = TestClient(app)
+    token = get_token(client)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    r = client.post("/api/v1/scripts", json={"name": "script-batch", "path": "scripts/dummy.py"}, headers=headers)
+    assert r.status_code == 200, r.text
+    script_id = r.json()["id"]
+    when = (datetime.utcnow() + timedelta(days=1)).isoformat() + "Z"
+    jobs = [
+        {"script_id": script_id, "when": when},
+        {"script_id": 999999, "when": when},
+        {"script_id": script_id, "schedule": "not a cron"},
+        {"script_id": script_id, "schedule": "@every 10m"},
+    ]
+    r = client.post("/api/v1/jobs/batch", json={"jobs": jobs}, headers=headers)
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["created"] == 2 and body["failed"] == 2
+    results = body["results"]
+    assert [item["index"] for item in results] == [0, 1, 2, 3]
+    assert [item["ok"] for item in results] == [True, False, False, True]
+    assert results[1]["status_code"] == 404 and results[1]["detail"] == "Script not found"
+    assert results[2]["status_code"] == 422
+    assert results[3]["job"]["schedule"] == "@every 10m"
+
+    from automa.scheduler.manager import get_scheduler
+
+    ids = [results[0]["job"]["id"], results[3]["job"]["id"]]
+    assert all(job_id in get_scheduler() for job_id in ids)
+    listed = [j["id"] for j in client.get("/api/v1/jobs", params={"script_id": script_id}).json()]
+    assert sorted(listed) == sorted(ids)
+    for job_id in ids:
+        client.post(f"/api/v1/jobs/{job_id}/cancel", headers=headers)
+
+
+def test_job_priority_and_owner():
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    when = (datetime.utcnow() + timedelta(days=1)).isoformat() + "Z"
+
+    r = client.post("/api/v1/jobs", json={"when": when, "priority": "urgent"}, headers=headers)
+    assert r.status_code == 422
+    r = client.post("/api/v1/jobs", json={"when": when, "priority": "high"}, headers=headers)
+    assert r.status_code == 200, r.text
+    job = r.json()
+    assert job["priority"] == "high"
+    assert job["owner_id"] is not None  # the submitting user
+
+    assert client.get("/api/v1/jobs/queue").status_code == 401
+    snapshot = client.get("/api/v1/jobs/queue", params={"limit": 0}, headers=headers).json()
+    assert snapshot["weights"]["high"] > snapshot["weights"]["low"]
+    assert snapshot["pending"] == []
+    client.post(f"/api/v1/jobs/{job['id']}/cancel", headers=headers)
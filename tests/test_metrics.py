@@ -0,0 +1,119 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from automa.api.app import app
+from automa.core.metrics import DB_CONNECTION_WAIT, Counter, Gauge, Histogram, instrument_engine
+from automa.scheduler.executor import ExecutionRequest, JobExecutor
+
+
+def get_token(client: TestClient) -> str:
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _samples(text: str) -> dict[str, float]:
+    return {
+        line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1])
+        for line in text.splitlines()
+        if line and not line.startswith("#")
+    }
+
+
+def test_values_recorded_from_many_threads_add_up():
+    counter = Counter("test_events", "Events", ("kind",))
+    histogram = Histogram("test_wait_seconds", "Waits", buckets=(0.1, 1.0))
+
+    def work() -> None:
+        for _ in range(1000):
+            counter.labels("a").inc()
+            histogram.observe(0.5)
+        counter.labels('b"\n').inc(2)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    samples = _samples(counter.render() + "\n" + histogram.render())
+    assert samples['test_events_total{kind="a"}'] == 8000
+    assert samples['test_events_total{kind="b\\"\\n"}'] == 16
+    assert samples['test_wait_seconds_bucket{le="0.1"}'] == 0
+    assert samples['test_wait_seconds_bucket{le="1"}'] == 8000
+    assert samples['test_wait_seconds_bucket{le="+Inf"}'] == 8000
+    assert samples["test_wait_seconds_sum"] == 4000
+    gauge = Gauge("test_depth", "Depth", lambda: {("x",): 3}, ("queue",))
+    assert gauge.render().endswith('test_depth{queue="x"} 3')
+
+
+def test_pool_wait_is_timed_until_a_connection_frees_up(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'wait.db'}", poolclass=QueuePool, pool_size=1, max_overflow=0)
+    instrument_engine(engine, "test_wait")
+    held = engine.connect()
+    threading.Timer(0.3, held.close).start()
+    with engine.connect():  # blocks until the timer returns the only connection
+        pass
+    engine.dispose()
+
+    counts, total = DB_CONNECTION_WAIT.labels("test_wait").totals()
+    assert sum(counts) == 2
+    assert total >= 0.25
+
+
+def test_executor_reports_start_lag_and_queue_depth():
+    release = threading.Event()
+    lags = []
+    ex = JobExecutor(
+        lambda job_id: release.wait(2),
+        max_workers=1,
+        on_start=lambda req: lags.append(time.time() - req.due_at),
+    )
+    try:
+        ex.submit(ExecutionRequest(job_id=1, due_at=time.time() - 5))
+        ex.submit(ExecutionRequest(job_id=2, priority="low"))
+        assert ex.running_count() == 1
+        assert ex.pending_by_class() == {"low": 1}
+        release.set()
+        deadline = time.monotonic() + 2
+        while len(lags) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert lags[0] >= 5 and lags[1] < 5
+    finally:
+        release.set()
+        ex.shutdown()
+
+
+def test_metrics_endpoint_exposes_requests_jobs_and_queries():
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    r = client.post("/api/v1/scripts", json={"name": f"m-{uuid.uuid4().hex[:8]}", "path": "scripts/dummy.py"}, headers=headers)
+    when = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    job_id = client.post("/api/v1/jobs", json={"script_id": r.json()["id"], "when": when}, headers=headers).json()["id"]
+    client.get(f"/api/v1/jobs/{job_id}/runs", headers=headers)
+    client.get("/no/such/page")
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    samples = _samples(r.text)
+    route = 'method="GET",route="/api/v1/jobs/{job_id}/runs",status="200"'
+    assert samples[f"automa_http_request_duration_seconds_count{{{route}}}"] >= 1
+    assert 'route="<unmatched>",status="404"' in r.text
+    assert f"/api/v1/jobs/{job_id}/runs" not in r.text  # raw paths never become labels
+    assert "automa_job_start_lag_seconds_count" in samples
+    assert "automa_jobs_running" in samples
+    selects = [v for k, v in samples.items() if k.startswith("automa_db_queries_total") and 'statement="SELECT"' in k]
+    assert sum(selects) > 0
+    assert any(k.startswith("automa_db_connection_hold_seconds_count") for k in samples)
+    assert any(k.startswith("automa_db_connection_wait_seconds_count") for k in samples)
@@ -0,0 +1,77 @@
+import threading
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+
+from automa.api.app import app
+from automa.core.db import engine as db_engine
+from automa.core.profiling import Profiler, get_profiler
+
+
+def get_token(client: TestClient) -> str:
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def test_hooks_are_only_attached_while_switched_on():
+    profiler = Profiler()
+    assert not profiler.active
+    assert not event.contains(db_engine, "after_cursor_execute", profiler._after)
+
+    profiler.configure(slow_queries=True, slow_query_ms=0)
+    assert profiler.active
+    assert event.contains(db_engine, "after_cursor_execute", profiler._after)
+
+    def background() -> None:
+        with db_engine.connect() as conn:
+            conn.execute(text("SELECT :secret"), {"secret": "hunter2"})
+
+    thread = threading.Thread(target=background, name="automa-test-worker")
+    thread.start()
+    thread.join()
+    query = next(q for q in profiler.queries if q["statement"] == "SELECT ?")
+    assert query["parameters"] == ["str"]  # the shape, never the values
+    assert query["route"] is None and query["thread"] == "automa-test-worker"
+
+    profiler.configure(slow_queries=False)
+    assert not profiler.active
+    assert not event.contains(db_engine, "after_cursor_execute", profiler._after)
+
+
+def test_profiled_requests_get_server_timing_breakdown():
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    assert "server-timing" not in client.get("/api/v1/jobs", headers=headers).headers
+
+    r = client.post("/api/v1/auth/register", json={"email": "profiling@example.com", "password": "pw"})
+    other = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    assert client.patch("/api/v1/debug/profiling", json={"requests": True}, headers=other).status_code == 403
+
+    r = client.patch(
+        "/api/v1/debug/profiling",
+        json={"requests": True, "paths": ["/api/v1/users", "/api/v1/auth"], "slow_queries": True, "slow_query_ms": 0},
+        headers=headers,
+    )
+    assert r.status_code == 200 and r.json()["requests"] is True
+    try:
+        r = client.post("/api/v1/auth/register", json={"email": "profiled@example.com", "password": "pw"})
+        fresh = {"Authorization": f"Bearer {r.json()['access_token']}"}  # not in the principal cache yet
+        r = client.get("/api/v1/users/me", headers=fresh)
+        timing = r.headers["server-timing"]
+        assert timing.startswith("jwt;dur=") and "db;dur=" in timing and "app;dur=" in timing
+        assert "server-timing" not in client.get("/api/v1/jobs", headers=headers).headers  # outside paths
+
+        state = client.get("/api/v1/debug/profiling", headers=headers).json()
+        register = next(p for p in state["profiles"] if p["route"] == "POST /api/v1/auth/register")
+        assert register["spans"]["hash"]["count"] == 1
+        assert state["profiles"][0]["route"] == "GET /api/v1/users/me"
+        assert any(q["route"] == "GET /api/v1/jobs" for q in state["slow_queries"])  # logged, not profiled
+    finally:
+        client.patch("/api/v1/debug/profiling", json={"requests": False, "slow_queries": False}, headers=headers)
+    assert not get_profiler().active
+    assert "server-timing" not in client.get("/api/v1/jobs", headers=headers).headers
@@ -0,0 +1,137 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from automa.api.app import app
+from automa.core import ratelimit
+from automa.core.config import settings
+from automa.core.ratelimit import MemoryBuckets, RateLimiter, SqliteBuckets
+from automa.scheduler.manager import get_executor
+
+
+def get_token(client: TestClient) -> str:
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_bucket_allows_burst_then_refills_at_rate():
+    clock = Clock()
+    limiter = RateLimiter({"create_job": (2.0, 3)}, MemoryBuckets(), clock=clock)
+    assert [limiter.check("create_job", 1) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.check("create_job", 1) == 0.5
+    assert limiter.check("create_job", 2) == 0.0  # buckets are per user
+    assert limiter.check("other", 1) == 0.0  # unlisted endpoints are not limited
+    clock.now += 0.25
+    assert limiter.check("create_job", 1) == 0.25
+    clock.now += 0.25
+    assert limiter.check("create_job", 1) == 0.0
+    clock.now += 60
+    assert [limiter.check("create_job", 1) for _ in range(4)].count(0.0) == 3  # never above burst
+    assert limiter.stats()["refused"] == {"create_job": 3}
+
+
+def test_sqlite_buckets_are_shared_between_limiters(tmp_path):
+    url = f"sqlite:///{tmp_path / 'ratelimit.db'}"
+    clock = Clock()
+    first = RateLimiter({"create_job": (1.0, 2)}, SqliteBuckets(url), clock=clock)
+    second = RateLimiter({"create_job": (1.0, 2)}, SqliteBuckets(url), clock=clock)  # another worker
+    assert first.check("create_job", 7) == 0.0
+    assert second.check("create_job", 7) == 0.0
+    assert first.check("create_job", 7) == 1.0
+    clock.now += 1
+    assert second.check("create_job", 7) == 0.0
+    assert first.stats()["buckets"] == 1
+
+
+def test_create_job_is_refused_with_retry_after(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_limiter", RateLimiter({"create_job": (0.01, 2)}, MemoryBuckets()))
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    when = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    script = f"rl-{uuid.uuid4().hex[:8]}"
+    r = client.post("/api/v1/scripts", json={"name": script, "path": "scripts/dummy.py"}, headers=headers)
+    payload = {"script_id": r.json()["id"], "when": when}
+
+    # refused as invalid: no tokens spent
+    assert client.post("/api/v1/jobs", json={**payload, "schedule": "nope"}, headers=headers).status_code == 422
+    assert client.post("/api/v1/jobs", json={**payload, "script_id": 999999}, headers=headers).status_code == 404
+    for _ in range(2):
+        assert client.post("/api/v1/jobs", json=payload, headers=headers).status_code == 200
+    r = client.post("/api/v1/jobs", json=payload, headers=headers)
+    assert r.status_code == 429
+    assert int(r.headers["Retry-After"]) >= 90
+    listed = client.get("/api/v1/jobs", params={"script_id": payload["script_id"]}).json()
+    assert len(listed) == 2  # nothing was written for the refused request
+
+    r = client.post("/api/v1/auth/register", json={"email": f"{script}@example.com", "password": "pw"})
+    other = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    assert client.post("/api/v1/jobs", json=payload, headers=other).status_code == 200
+    assert client.get("/api/v1/health/ratelimit").json()["refused"] == {"create_job": 1}
+
+
+def test_backpressure_refuses_jobs_while_queue_is_deep(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_limiter", RateLimiter({}, MemoryBuckets()))
+    monkeypatch.setattr(settings, "backpressure_max_pending", 100)
+    monkeypatch.setattr(get_executor(), "pending_count", lambda: 150)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    r = client.post("/api/v1/jobs/batch", json={"jobs": [{}]}, headers=headers)
+    assert r.status_code == 429
+    assert r.json()["detail"].startswith("Job queue is full")
+    assert int(r.headers["Retry-After"]) >= 1
+    r = client.post("/api/v1/workflows", json={"name": "x", "nodes": [{"key": "a"}]}, headers=headers)
+    assert r.status_code == 429
+
+    monkeypatch.setattr(get_executor(), "pending_count", lambda: 0)
+    r = client.post("/api/v1/jobs/batch", json={"jobs": [{"when": "2999-01-01T00:00:00Z"}]}, headers=headers)
+    assert r.status_code == 200, r.text
+
+
+def test_requests_spend_a_token_per_job(tmp_path):
+    clock = Clock()
+    for buckets in (MemoryBuckets(), SqliteBuckets(f"sqlite:///{tmp_path / 'ratelimit.db'}")):
+        limiter = RateLimiter({"create_jobs": (2.0, 10)}, buckets, clock=clock)
+        assert limiter.check("create_jobs", 1, 8) == 0.0
+        assert limiter.check("create_jobs", 1, 4) == 1.0  # 2 left, 2 more take a second
+        assert limiter.check("create_jobs", 2, 50) == 0.0  # capped at burst
+        assert limiter.check("create_jobs", 2) == 0.5
+
+
+def test_batch_near_the_limit_is_refused(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_limiter", RateLimiter({"create_jobs": (0.01, 3)}, MemoryBuckets()))
+    monkeypatch.setattr(settings, "backpressure_max_pending", 100)
+    monkeypatch.setattr(get_executor(), "pending_count", lambda: 98)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    job = {"when": "2999-01-01T00:00:00Z"}
+
+    r = client.post("/api/v1/jobs/batch", json={"jobs": [job] * 3}, headers=headers)
+    assert r.status_code == 429
+    assert r.json()["detail"].startswith("Job queue is full")
+    nodes = [{"key": key} for key in "abc"]
+    assert client.post("/api/v1/workflows", json={"name": "x", "nodes": nodes}, headers=headers).status_code == 429
+
+    monkeypatch.setattr(get_executor(), "pending_count", lambda: 0)
+    r = client.post("/api/v1/jobs/batch", json={"jobs": [job] * 2}, headers=headers)
+    assert r.status_code == 200, r.text
+    ids = [item["job"]["id"] for item in r.json()["results"]]
+    # one token left in the bucket, the next batch needs two
+    r = client.post("/api/v1/jobs/batch", json={"jobs": [job] * 2}, headers=headers)
+    assert r.status_code == 429
+    assert r.json()["detail"] == "Rate limit exceeded"
+    for job_id in ids:
+        client.post(f"/api/v1/jobs/{job_id}/cancel", headers=headers)
@@ -0,0 +1,106 @@
+from datetime import datetime
+
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from automa.domain.models import Job, JobRun
+from automa.scheduler.history import RunHistoryWriter
+
+
+def make_engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add_all([Job(id=1, status="pending"), Job(id=2, status="pending")])
+        session.commit()
+    return engine
+
+
+def test_transitions_are_coalesced_into_one_flush():
+    engine = make_engine()
+    writer = RunHistoryWriter(engine, interval=3600)  # only explicit flushes
+    writer.start()
+    t0 = datetime(2024, 1, 1, 12, 0, 0)
+
+    writer.run_started("a", 1, t0)
+    writer.run_started("b", 2, t0)
+    writer.run_finished("a", 1, status="succeeded", job_status="succeeded", started_at=t0, finished_at=t0, exit_code=0)
+    writer.set_next_runs([(2, t0)])
+
+    with Session(engine) as session:
+        assert session.exec(select(JobRun)).all() == []
+
+    assert writer.flush() == 5  # 2 run inserts, 2 job updates, 1 next_run
+    assert writer.stats["flushes"] == 1
+
+    with Session(engine) as session:
+        runs = {r.run_key: r for r in session.exec(select(JobRun))}
+        assert runs["a"].status == "succeeded" and runs["a"].finished_at is not None
+        assert runs["b"].status == "running"
+        assert session.get(Job, 1).status == "succeeded"
+        assert session.get(Job, 1).last_exit_code == 0
+        job2 = session.get(Job, 2)
+        assert job2.status == "running" and job2.next_run_at == t0
+
+    # "b" was inserted as running, so its finish becomes an update
+    writer.run_finished("b", 2, status="failed", job_status="failed", started_at=t0, finished_at=t0, exit_code=3, error="boom")
+    writer.flush()
+    assert writer.stats["runs_updated"] == 1
+    with Session(engine) as session:
+        run = session.exec(select(JobRun).where(JobRun.run_key == "b")).one()
+        assert (run.status, run.exit_code, run.error) == ("failed", 3, "boom")
+        assert session.get(Job, 2).last_error == "boom"
+    writer.shutdown()
+
+
+def test_last_run_at_is_the_start_whether_or_not_it_was_flushed():
+    engine = make_engine()
+    writer = RunHistoryWriter(engine, interval=3600)
+    writer.start()
+    t0, t1 = datetime(2024, 1, 1, 12, 0, 0), datetime(2024, 1, 1, 12, 5, 0)
+
+    writer.run_started("e", 1, t0)
+    writer.flush()  # the finish below becomes an update of the running row
+    writer.run_finished("e", 1, status="succeeded", job_status="succeeded", started_at=t0, finished_at=t1)
+    writer.run_started("f", 2, t0)
+    writer.run_finished("f", 2, status="succeeded", job_status="succeeded", started_at=t0, finished_at=t1)
+    writer.flush()
+
+    with Session(engine) as session:
+        assert session.get(Job, 1).last_run_at == t0
+        assert session.get(Job, 2).last_run_at == t0
+        run = session.exec(select(JobRun).where(JobRun.run_key == "e")).one()
+        assert (run.started_at, run.finished_at) == (t0, t1)
+    writer.shutdown()
+
+
+def test_cancellation_is_not_overwritten():
+    engine = make_engine()
+    writer = RunHistoryWriter(engine)  # not started: write-through
+    t0 = datetime(2024, 1, 1)
+
+    writer.run_started("c", 1, t0)
+    with Session(engine) as session:
+        job = session.get(Job, 1)
+        job.status = "cancelled"
+        session.add(job)
+        session.commit()
+    writer.run_finished("c", 1, status="succeeded", job_status="succeeded", started_at=t0, finished_at=t0, exit_code=0)
+
+    with Session(engine) as session:
+        job = session.get(Job, 1)
+        assert job.status == "cancelled"
+        assert job.last_exit_code == 0
+
+
+def test_background_flush_and_shutdown():
+    engine = make_engine()
+    writer = RunHistoryWriter(engine, interval=0.01)
+    writer.start()
+    try:
+        writer.run_started("d", 1, datetime(2024, 1, 1))
+    finally:
+        writer.shutdown()
+    assert not writer.running
+    with Session(engine) as session:
+        assert session.exec(select(JobRun).where(JobRun.run_key == "d")).one().status == "running"
@@ -0,0 +1,121 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session
+
+from automa.api.app import app
+from automa.core.config import settings
+from automa.core.db import engine as db_engine
+from automa.domain.models import JobRun
+from automa.sandbox.logs import FileLogSink, LogIndex, line_offset, tail_offset
+from automa.scheduler.manager import execute_job, get_run_history
+
+
+def get_token(client: TestClient) -> str:
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def _job(client: TestClient, headers: dict, path: str) -> int:
+    r = client.post("/api/v1/scripts", json={"name": f"log-{uuid.uuid4().hex[:8]}", "path": path}, headers=headers)
+    when = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    return client.post("/api/v1/jobs", json={"script_id": r.json()["id"], "when": when}, headers=headers).json()["id"]
+
+
+def test_line_index_finds_lines_without_scanning_the_log(tmp_path):
+    path = tmp_path / "run.log"
+    sink = FileLogSink(path, index_interval=3)
+    text = b"".join(b"line %d\n" % i for i in range(20)) + b"partial"
+    for i in range(0, len(text), 5):  # lines split across chunks
+        sink.write("stdout", text[i:i + 5])
+    assert not LogIndex(path).closed
+    sink.close()
+
+    index = LogIndex(path)
+    assert index.closed and index.lines == 20 and index.entries == 6
+    assert index.floor(10) == (9, text.index(b"line 9\n"))
+    starts = [0] + [i + 1 for i, c in enumerate(text) if c == ord("\n")]
+    assert [line_offset(path, n) for n in range(21)] == starts
+    assert line_offset(path, 500) == len(text)
+    assert text[tail_offset(path, 1):] == b"partial"
+    assert text[tail_offset(path, 3):] == b"line 18\nline 19\npartial"
+    assert tail_offset(path, 100) == 0
+
+    unindexed = tmp_path / "unindexed.log"  # interval 0: no line records, still the completion marker
+    sink = FileLogSink(unindexed, index_interval=0)
+    sink.write("stdout", b"a\nb\n")
+    assert not LogIndex(unindexed).closed
+    sink.close()
+    index = LogIndex(unindexed)
+    assert index.closed and index.lines == 2 and index.entries == 0
+    assert line_offset(unindexed, 1) == 2
+
+    plain = tmp_path / "plain.log"  # no index: logs from before indexing
+    plain.write_bytes(b"a\nb\nc\n")
+    assert LogIndex(plain).closed and line_offset(plain, 2) == 4
+    assert tail_offset(plain, 1) == 4 and tail_offset(plain, 0) == 6
+
+
+def test_log_endpoint_reads_requested_region(tmp_path):
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    script = tmp_path / "chatty.py"
+    script.write_text("for i in range(5000):\n    print(f'row {i}')\n")
+    job_id = _job(client, headers, str(script))
+    assert execute_job(job_id) == "succeeded"
+    get_run_history().flush()
+
+    url = f"/api/v1/jobs/{job_id}/log"
+    assert client.get(url, params={"tail": 2}).status_code == 401
+    r = client.get(url, params={"tail": 2}, headers=headers)
+    assert r.status_code == 200 and r.text == "row 4998\nrow 4999\n"
+    assert r.headers["x-log-complete"] == "true"
+    size = int(r.headers["x-log-size"])
+    assert int(r.headers["x-log-offset"]) == size - len(r.content)
+
+    r = client.get(url, params={"line": 2500, "length": 18}, headers=headers)
+    assert r.text == "row 2500\nrow 2501\n"
+    offset = int(r.headers["x-log-offset"])
+    r = client.get(url, params={"offset": offset + 4, "length": 4}, headers=headers)
+    assert r.text == "2500"
+    assert len(client.get(url, headers=headers).content) == size
+    assert client.get(url, params={"tail": 1, "line": 3}, headers=headers).status_code == 422
+    runs = client.get(f"/api/v1/jobs/{job_id}/runs", headers=headers).json()
+    assert client.get(url, params={"run_id": runs[0]["id"], "tail": 1}, headers=headers).text == "row 4999\n"
+    assert client.get(url, params={"run_id": 10**9}, headers=headers).status_code == 404
+
+
+@pytest.mark.parametrize("interval", [10, 0])
+def test_follow_streams_until_the_run_closes_its_log(tmp_path, monkeypatch, interval):
+    monkeypatch.setattr(settings, "log_follow_poll_seconds", 0.02)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    job_id = _job(client, headers, "scripts/dummy.py")
+    path = tmp_path / "live.log"
+    sink = FileLogSink(path, index_interval=interval)
+    sink.write("stdout", b"first\n")
+    with Session(db_engine) as session:
+        session.add(JobRun(run_key=uuid.uuid4().hex, job_id=job_id, started_at=datetime.now(), log_path=str(path)))
+        session.commit()
+
+    def writer() -> None:
+        for i in range(5):
+            time.sleep(0.05)
+            sink.write("stdout", b"more %d\n" % i)
+        sink.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    r = client.get(f"/api/v1/jobs/{job_id}/log", params={"tail": 1, "follow": True}, headers=headers)
+    thread.join()
+    assert r.headers["x-log-complete"] == "false"
+    assert r.text == "first\n" + "".join(f"more {i}\n" for i in range(5))
@@ -0,0 +1,95 @@
+from pathlib import Path
+import os
+import sys
+import time
+
+import pytest
+
+from automa.sandbox.docker_runner import ContainerBackend, LocalBackend
+from automa.sandbox.logs import FileLogSink
+
+
+def write_script(tmp_path, body: str) -> str:
+    path = tmp_path / "job.py"
+    path.write_text(body)
+    return str(path)
+
+
+def test_local_backend_streams_output_to_sink(tmp_path):
+    script = write_script(
+        tmp_path,
+        "import sys\n"
+        "for _ in range(64):\n"
+        "    sys.stdout.write('x' * 65535 + '\\n')\n"
+        "sys.stderr.write('boom\\n')\n"
+        "sys.exit(3)\n",
+    )
+    sink = FileLogSink(tmp_path / "run.log")
+    result = LocalBackend(python=sys.executable).run(script, sink=sink, timeout=30)
+    sink.close()
+
+    assert result.exit_code == 3
+    assert result.stdout_bytes == 64 * 65536
+    assert result.stderr_bytes == 5
+    assert result.stderr_tail == "boom\n"
+    assert (tmp_path / "run.log").stat().st_size == 64 * 65536 + 5
+
+
+def test_local_backend_timeout_kills_child(tmp_path):
+    script = write_script(tmp_path, "import time\ntime.sleep(30)\n")
+    result = LocalBackend().run(script, timeout=0.5)
+    assert result.timed_out is True
+    assert result.ok is False
+    assert result.duration_seconds < 10
+
+
+def test_local_backend_timeout_without_process_groups(tmp_path, monkeypatch):
+    # the Windows path: no killpg, taskkill (missing here) and then proc.kill()
+    monkeypatch.delattr(os, "killpg")
+    script = write_script(tmp_path, "import time\ntime.sleep(30)\n")
+    result = LocalBackend().run(script, timeout=0.5)
+    assert result.timed_out is True
+    assert result.duration_seconds < 10
+
+
+@pytest.mark.skipif(not Path("/proc").is_dir(), reason="checks the grandchild through /proc")
+def test_local_backend_timeout_kills_grandchildren(tmp_path):
+    # the grandchild inherits stdout/stderr; left alive it would keep the log pumps waiting
+    script = write_script(
+        tmp_path,
+        "import subprocess, sys, time\n"
+        "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)'])\n"
+        f"open({str(tmp_path / 'pid')!r}, 'w').write(str(child.pid))\n"
+        "time.sleep(30)\n",
+    )
+    result = LocalBackend().run(script, timeout=1)
+    assert result.timed_out is True
+    assert result.duration_seconds < 10
+
+    stat = Path(f"/proc/{(tmp_path / 'pid').read_text()}/stat")
+    for _ in range(50):
+        if not stat.exists() or stat.read_text().rsplit(")", 1)[1].split()[0] == "Z":
+            break
+        time.sleep(0.1)
+    else:
+        raise AssertionError("grandchild survived the timeout")
+
+
+def test_local_backend_hides_app_settings(tmp_path, monkeypatch):
+    monkeypatch.setenv("AUTOMA_SECRET_KEY", "s3cret")
+    script = write_script(tmp_path, "import os, sys\nsys.exit(1 if 'AUTOMA_SECRET_KEY' in os.environ else 0)\n")
+    assert LocalBackend().run(script, timeout=30).exit_code == 0
+
+
+def test_container_command_is_locked_down():
+    cmd = ContainerBackend(runtime="podman", image="python:3.13-slim").command("/srv/scripts/job.py", ["--x"])
+    assert cmd[:3] == ["podman", "run", "--rm"]
+    for flag in ("--read-only", "--cap-drop", "no-new-privileges", "--pids-limit", "--memory"):
+        assert flag in cmd
+    assert cmd[cmd.index("--network") + 1] == "none"
+    assert "/srv/scripts:/work:ro" in cmd
+    assert cmd[-3:] == ["-u", "/work/job.py", "--x"]
+
+    cmd = ContainerBackend(runtime="podman").command("/srv/scripts/job.py", [], output_dir="/data/artifacts/tmp/r1")
+    assert "/data/artifacts/tmp/r1:/out" in cmd
+    assert cmd[cmd.index("-e") + 1] == "AUTOMA_OUTPUT_DIR=/out"
@@ -0,0 +1,63 @@
+import os
+
+from automa.sandbox.docker_runner import LocalBackend
+from automa.sandbox.pool import SandboxPool
+
+
+def test_pool_hits_after_warmup_and_resets_between_runs(tmp_path):
+    script = tmp_path / "job.py"
+    script.write_text("import os\nopen('leftover.txt', 'w').write('x')\nprint(len(os.listdir('.')))\n")
+    pool = SandboxPool(LocalBackend(), min_idle=1, max_size=4, max_uses=10)
+    try:
+        # first run is a cold miss; maintenance then keeps a spare warm
+        with pool.lease("local") as sandbox:
+            assert sandbox.run(str(script), None, None, 30).exit_code == 0
+        pool.maintain()
+        with pool.lease("local") as sandbox:
+            workdir = sandbox.workdir
+            assert sandbox.run(str(script), None, None, 30).ok
+        # scratch dir was emptied by reset()
+        assert os.listdir(workdir) == []
+
+        stats = pool.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 1
+        assert stats["recycled"] == 2
+        assert stats["profiles"]["local"] == {"idle": 1, "busy": 0}
+    finally:
+        pool.shutdown()
+
+
+def test_pool_scales_with_queue_depth_and_evicts_idle():
+    depth = {"local": 3}
+    pool = SandboxPool(LocalBackend(), min_idle=1, max_size=3, idle_ttl=60, queue_depth=lambda: dict(depth))
+    try:
+        pool.release(pool.acquire("local"))
+        pool.release(pool.acquire("other"))
+        pool.maintain()
+        profiles = pool.stats()["profiles"]
+        assert profiles["local"]["idle"] == 3  # capped by max_size
+        assert profiles["other"]["idle"] == 1  # no queued jobs need it
+
+        depth.clear()
+        pool.maintain()
+        assert pool.stats()["profiles"]["local"]["idle"] == 1
+
+        pool.idle_ttl = 0
+        pool.maintain()
+        stats = pool.stats()
+        assert stats["evicted"] == 4
+        assert stats["profiles"] == {}
+    finally:
+        pool.shutdown()
+
+
+def test_sandbox_is_discarded_after_max_uses(tmp_path):
+    pool = SandboxPool(LocalBackend(), min_idle=0, max_uses=1)
+    try:
+        sandbox = pool.acquire("local")
+        pool.release(sandbox)
+        assert not os.path.exists(sandbox.workdir)
+        assert pool.stats()["destroyed"] == 1
+    finally:
+        pool.shutdown()
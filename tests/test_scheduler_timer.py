@@ -0,0 +1,53 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from automa.domain.models import Job
+from automa.scheduler.jobstore import rehydrate_jobs
+from automa.scheduler.timer import JobTimer
+
+
+def test_timer_fires_in_due_order_and_honours_cancel():
+    fired: list[int] = []
+    done = threading.Event()
+
+    def callback(batch):
+        fired.extend(key for key, _, _ in batch)
+        if len(fired) == 2:
+            done.set()
+
+    timer = JobTimer(callback)
+    now = datetime.now(timezone.utc)
+    timer.schedule(1, now + timedelta(milliseconds=150))
+    timer.schedule_many([(2, now + timedelta(milliseconds=50), None), (3, now + timedelta(milliseconds=100), None)])
+    timer.cancel(3)
+    # rescheduling replaces the previous entry for the key
+    timer.schedule(1, now + timedelta(milliseconds=80))
+    assert len(timer) == 2
+    timer.start()
+    try:
+        assert done.wait(2)
+        time.sleep(0.1)
+        assert fired == [2, 1]
+        assert len(timer) == 0
+    finally:
+        timer.shutdown()
+
+
+def test_rehydrate_loads_only_waiting_jobs():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    soon = datetime.now(timezone.utc) + timedelta(hours=1)
+    with Session(engine) as session:
+        session.add(Job(status="scheduled", next_run_at=soon, agent_id=None, script_id=None))
+        session.add(Job(status="pending"))
+        session.add(Job(status="scheduled", schedule=soon.isoformat()))
+        session.add(Job(status="succeeded", next_run_at=soon))
+        session.commit()
+
+        timer = JobTimer(lambda batch: None)
+        assert rehydrate_jobs(session, timer) == 3
+    assert 4 not in timer
+    assert abs(timer.next_fire_time().timestamp() - time.time()) < 5  # the pending job runs asap
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from automa.scheduler.triggers import is_recurring, next_fire_time, parse_schedule
+
+
+def test_cron_interval_and_shortcuts():
+    base = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+    assert next_fire_time(parse_schedule("*/5 * * * *"), base) == base + timedelta(minutes=5)
+    assert next_fire_time(parse_schedule("@hourly"), base) == base + timedelta(hours=1)
+    assert next_fire_time(parse_schedule("@every 1h30m"), base) == base + timedelta(minutes=90)
+    # parsed once, then served from cache
+    assert parse_schedule("@every 30s") is parse_schedule("@every 30s")
+
+
+@pytest.mark.parametrize("expr", ["", "99 * * * *", "@yearly-ish", "@every 0s", "* * *"])
+def test_invalid_expressions(expr):
+    with pytest.raises(ValueError):
+        parse_schedule(expr)
+
+
+def test_iso_timestamps_are_one_off():
+    assert is_recurring("2026-01-01T00:00:00+00:00") is False
+    assert is_recurring(None) is False
+    assert is_recurring("0 0 * * *") is True
@@ -0,0 +1,161 @@
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from automa.api.app import app
+from automa.scheduler.manager import dispatch_job, get_run_history, get_workflow_engine, scheduler_cancel
+from automa.scheduler.workflows import WorkflowEngine
+
+
+def get_token(client: TestClient) -> str:
+    r = client.post(
+        "/api/v1/auth/token",
+        data={"username": "admin@example.com", "password": "admin"},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+    assert r.status_code == 200, r.text
+    return r.json()["access_token"]
+
+
+def test_engine_runs_ready_nodes_and_applies_edge_policies():
+    engine = WorkflowEngine()
+    # 1 -> 2, 1 -> 3, (2, 3) -> 4; 5 runs if 2 fails; 6 always runs after 4
+    jobs = [(1, "scheduled")] + [(n, "waiting") for n in (2, 3, 4, 5, 6)]
+    edges = [(2, 1, "on_success"), (3, 1, "on_success"), (4, 2, "on_success"), (4, 3, "on_success"),
+             (5, 2, "on_failure"), (6, 4, "always")]
+    assert not engine.add(7, jobs, edges)
+
+    t = engine.job_finished(1, "succeeded")
+    assert sorted(t.ready) == [2, 3]  # both branches at once
+    t = engine.job_finished(3, "succeeded")
+    assert not t  # 4 still waits for 2
+    t = engine.job_finished(2, "failed")
+    assert t.skipped == [4]
+    assert sorted(t.ready) == [5, 6]  # 6 follows the skipped 4 ("always")
+    t = engine.job_finished(5, "succeeded")
+    assert t.finished == []
+    t = engine.job_finished(5, "succeeded")  # duplicate completions are ignored
+    assert not t
+    t = engine.job_finished(6, "succeeded")
+    assert t.finished == [(7, "failed")]
+    assert 7 not in engine and engine.stats() == {"workflows": 0, "jobs": 0}
+
+
+def test_engine_resumes_from_persisted_statuses():
+    engine = WorkflowEngine()
+    # crashed after 1 failed but before its dependents were decided
+    jobs = [(1, "failed"), (2, "waiting"), (3, "waiting")]
+    t = engine.add(1, jobs, [(2, 1, "on_success"), (3, 2, "on_success")])
+    assert sorted(t.skipped) == [2, 3] and t.ready == []
+    assert t.finished == [(1, "failed")]
+
+
+def test_engine_settles_a_job_cancelled_while_waiting_once():
+    engine = WorkflowEngine()
+    engine.add(1, [(1, "scheduled"), (2, "waiting"), (3, "waiting")], [(2, 1, "on_success"), (3, 2, "always")])
+    t = engine.job_finished(2, None)  # cancelled before its upstream finished
+    assert t.ready == [3]  # follows the cancelled 2 ("always")
+    assert not engine.job_finished(1, "succeeded")  # 2 is not decided again
+    t = engine.job_finished(3, "succeeded")
+    assert t.finished == [(1, "succeeded")]
+
+
+def test_workflow_runs_dependents_as_soon_as_upstream_finishes(tmp_path):
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    failing = tmp_path / "fail.py"
+    failing.write_text("import sys\nsys.exit(1)\n")
+    suffix = uuid.uuid4().hex[:8]
+    r = client.post("/api/v1/scripts", json={"name": f"wf-ok-{suffix}", "path": "scripts/dummy.py"}, headers=headers)
+    ok = r.json()["id"]
+    r = client.post("/api/v1/scripts", json={"name": f"wf-fail-{suffix}", "path": str(failing)}, headers=headers)
+    bad = r.json()["id"]
+
+    payload = {
+        "name": "etl",
+        "nodes": [
+            {"key": "fetch", "script_id": ok},
+            {"key": "transform", "script_id": bad, "depends_on": ["fetch"]},
+            {"key": "index", "script_id": ok, "depends_on": ["fetch"]},
+            {"key": "email", "script_id": ok, "depends_on": ["transform", "index"]},
+            {"key": "cleanup", "script_id": ok, "depends_on": [{"key": "transform", "policy": "on_failure"}]},
+            {"key": "report", "script_id": ok, "depends_on": [{"key": "email", "policy": "always"}]},
+        ],
+    }
+    r = client.post("/api/v1/workflows", json=payload, headers=headers)
+    assert r.status_code == 200, r.text
+    workflow = r.json()
+    ids = workflow["jobs"]
+    assert workflow["status"] == "running"
+
+    # drive the root through the executor directly instead of waiting for the timer
+    scheduler_cancel(ids["fetch"])
+    dispatch_job(ids["fetch"], None, ok)
+    deadline = time.monotonic() + 60
+    while workflow["status"] == "running" and time.monotonic() < deadline:
+        time.sleep(0.05)
+        workflow = client.get(f"/api/v1/workflows/{workflow['id']}").json()
+    get_run_history().flush()
+
+    workflow = client.get(f"/api/v1/workflows/{workflow['id']}").json()
+    assert workflow["status"] == "failed"
+    status = {job["id"]: job["status"] for job in workflow["jobs"]}
+    assert {key: status[job_id] for key, job_id in ids.items()} == {
+        "fetch": "succeeded",
+        "transform": "failed",
+        "index": "succeeded",
+        "email": "skipped",
+        "cleanup": "succeeded",
+        "report": "succeeded",
+    }
+    assert len(workflow["dependencies"]) == 6
+
+
+def test_workflow_validation_and_cancel():
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+
+    cycle = {"name": "cycle", "nodes": [{"key": "a", "depends_on": ["b"]}, {"key": "b", "depends_on": ["a"]}]}
+    r = client.post("/api/v1/workflows", json=cycle, headers=headers)
+    assert r.status_code == 422 and "cycle" in r.json()["detail"]
+    unknown = {"name": "x", "nodes": [{"key": "a", "depends_on": ["zz"]}]}
+    assert client.post("/api/v1/workflows", json=unknown, headers=headers).status_code == 422
+    missing = {"name": "x", "nodes": [{"key": "a", "script_id": 999999}]}
+    assert client.post("/api/v1/workflows", json=missing, headers=headers).status_code == 404
+
+    when = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    payload = {"name": "later", "when": when, "nodes": [{"key": "a"}, {"key": "b", "depends_on": ["a"]}]}
+    r = client.post("/api/v1/workflows", json=payload, headers=headers)
+    assert r.status_code == 200, r.text
+    workflow_id = r.json()["id"]
+    assert workflow_id in get_workflow_engine()
+
+    r = client.post(f"/api/v1/workflows/{workflow_id}/cancel", headers=headers)
+    assert r.status_code == 200, r.text
+    assert r.json()["status"] == "cancelled"
+    assert {job["status"] for job in r.json()["jobs"]} == {"cancelled"}
+    assert workflow_id not in get_workflow_engine()
+    assert client.post(f"/api/v1/workflows/{workflow_id}/cancel", headers=headers).status_code == 409
+
+    r = client.get("/api/v1/workflows", params={"status": "cancelled", "limit": 1})
+    assert r.status_code == 200 and r.json()[0]["id"] == workflow_id
+
+
+def test_cancelling_a_workflow_job_settles_its_dependents():
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    when = (datetime.now(timezone.utc) + timedelta(days=1)).isoformat()
+    payload = {"name": "partial", "when": when, "nodes": [{"key": "a"}, {"key": "b", "depends_on": ["a"]}]}
+    r = client.post("/api/v1/workflows", json=payload, headers=headers)
+    assert r.status_code == 200, r.text
+    workflow = r.json()
+
+    r = client.post(f"/api/v1/jobs/{workflow['jobs']['a']}/cancel", headers=headers)
+    assert r.status_code == 200, r.text
+    assert workflow["id"] not in get_workflow_engine()
+
+    workflow = client.get(f"/api/v1/workflows/{workflow['id']}").json()
+    assert workflow["status"] != "running" and workflow["finished_at"] is not None
+    assert {job["status"] for job in workflow["jobs"]} == {"cancelled", "skipped"}